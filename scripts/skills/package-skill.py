@@ -9,7 +9,7 @@ import pathlib
 import subprocess
 import zipfile
 
-EXCLUDE_DIRS = {"__pycache__", "runs", ".tokens"}
+EXCLUDE_DIRS = {"__pycache__", "runs", ".tokens", ".cache"}
 EXCLUDE_SUFFIXES = {".pyc", ".pyo"}
 
 CODEX_HOME = pathlib.Path(os.getenv("CODEX_HOME", str(pathlib.Path.home() / ".codex")))
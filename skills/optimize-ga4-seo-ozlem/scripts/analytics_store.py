@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Day-partitioned SQLite store for GA4 metrics, event counts and GSC rows."""
+
+from __future__ import annotations
+
+import datetime as dt
+import pathlib
+import sqlite3
+from typing import Any, Iterable
+
+from common import RUNS_ROOT, utc_now_iso
+from response_cache import is_provisional
+
+STORE_PATH = RUNS_ROOT / "analytics.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partitions (
+    source TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    date TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    provisional INTEGER NOT NULL,
+    PRIMARY KEY (source, scope, date)
+);
+CREATE TABLE IF NOT EXISTS ga4_daily (
+    property_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sessions REAL NOT NULL,
+    total_users REAL NOT NULL,
+    new_users REAL NOT NULL,
+    engaged_sessions REAL NOT NULL,
+    PRIMARY KEY (property_id, date)
+);
+CREATE TABLE IF NOT EXISTS ga4_events (
+    property_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    event_name TEXT NOT NULL,
+    event_count REAL NOT NULL,
+    PRIMARY KEY (property_id, date, event_name)
+);
+CREATE TABLE IF NOT EXISTS gsc_rows (
+    site_url TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    date TEXT NOT NULL,
+    key TEXT NOT NULL,
+    clicks REAL NOT NULL,
+    impressions REAL NOT NULL,
+    position REAL NOT NULL,
+    PRIMARY KEY (site_url, dimension, date, key)
+);
+"""
+
+
+def _days(start: str, end: str) -> list[str]:
+    first = dt.date.fromisoformat(start)
+    last = dt.date.fromisoformat(end)
+    return [(first + dt.timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+
+
+def _contiguous(dates: Iterable[str]) -> list[tuple[str, str]]:
+    ranges: list[tuple[str, str]] = []
+    for day in sorted(dates):
+        if ranges and dt.date.fromisoformat(day) - dt.date.fromisoformat(ranges[-1][1]) == dt.timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def ga4_date(value: str) -> str:
+    """GA4 returns the ``date`` dimension as ``YYYYMMDD``."""
+    return f"{value[:4]}-{value[4:6]}-{value[6:8]}" if len(value) == 8 and value.isdigit() else value
+
+
+class AnalyticsStore:
+    """Per-day partitions of analytics data; windows are aggregated locally.
+
+    A partition is a (source, scope, date) triple recording that a day was
+    fetched. Days that are missing, or were fetched while still provisional,
+    are reported by ``missing_ranges`` as contiguous date ranges to refetch.
+    """
+
+    def __init__(self, path: pathlib.Path = STORE_PATH) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def missing_ranges(self, source: str, scope: str, start: str, end: str) -> list[tuple[str, str]]:
+        rows = self._db.execute(
+            "SELECT date, provisional FROM partitions WHERE source = ? AND scope = ? AND date BETWEEN ? AND ?",
+            (source, scope, start, end),
+        ).fetchall()
+        settled = {date for date, provisional in rows if not provisional}
+        return _contiguous(day for day in _days(start, end) if day not in settled)
+
+    def _mark(self, source: str, scope: str, start: str, end: str) -> None:
+        fetched_at = utc_now_iso()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO partitions (source, scope, date, fetched_at, provisional) VALUES (?, ?, ?, ?, ?)",
+            [(source, scope, day, fetched_at, int(is_provisional(day))) for day in _days(start, end)],
+        )
+
+    def record_ga4_sessions(
+        self,
+        property_id: str,
+        start: str,
+        end: str,
+        rows: list[tuple[str, float, float, float, float]],
+    ) -> None:
+        """Store ``(date, sessions, total_users, new_users, engaged_sessions)`` rows."""
+        with self._db:
+            self._db.execute(
+                "DELETE FROM ga4_daily WHERE property_id = ? AND date BETWEEN ? AND ?",
+                (property_id, start, end),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO ga4_daily VALUES (?, ?, ?, ?, ?, ?)",
+                [(property_id, *row) for row in rows],
+            )
+            self._mark("ga4_sessions", property_id, start, end)
+
+    def record_ga4_events(self, property_id: str, start: str, end: str, rows: list[tuple[str, str, float]]) -> None:
+        with self._db:
+            self._db.execute(
+                "DELETE FROM ga4_events WHERE property_id = ? AND date BETWEEN ? AND ?",
+                (property_id, start, end),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO ga4_events VALUES (?, ?, ?, ?)",
+                [(property_id, date, name, count) for date, name, count in rows],
+            )
+            self._mark("ga4_events", property_id, start, end)
+
+    def record_gsc(self, site_url: str, dimension: str, start: str, end: str, rows: list[dict[str, Any]]) -> None:
+        """Store GSC rows fetched with dimensions ``["date", <dimension>]``."""
+        with self._db:
+            self._db.execute(
+                "DELETE FROM gsc_rows WHERE site_url = ? AND dimension = ? AND date BETWEEN ? AND ?",
+                (site_url, dimension, start, end),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO gsc_rows VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (site_url, dimension, row["date"], row["key"], row["clicks"], row["impressions"], row["position"])
+                    for row in rows
+                ],
+            )
+            self._mark(f"gsc_{dimension}", site_url, start, end)
+
+    def ga4_totals(self, property_id: str, start: str, end: str) -> dict[str, float]:
+        """Sum the additive daily GA4 metrics; users are not additive across days and are left out."""
+        row = self._db.execute(
+            "SELECT COALESCE(SUM(sessions), 0), COALESCE(SUM(engaged_sessions), 0) "
+            "FROM ga4_daily WHERE property_id = ? AND date BETWEEN ? AND ?",
+            (property_id, start, end),
+        ).fetchone()
+        sessions, engaged = row
+        return {
+            "sessions": sessions,
+            "engaged_sessions": engaged,
+            "engagement_rate": engaged / sessions if sessions else 0.0,
+        }
+
+    def event_counts(self, property_id: str, start: str, end: str) -> dict[str, float]:
+        rows = self._db.execute(
+            "SELECT event_name, SUM(event_count) FROM ga4_events "
+            "WHERE property_id = ? AND date BETWEEN ? AND ? GROUP BY event_name",
+            (property_id, start, end),
+        ).fetchall()
+        return {name: count for name, count in rows}
+
+    def gsc_top(self, site_url: str, dimension: str, start: str, end: str, limit: int = 25) -> list[dict[str, Any]]:
+        """Aggregate GSC rows over a window with an impression-weighted average position."""
+        rows = self._db.execute(
+            "SELECT key, SUM(clicks), SUM(impressions), SUM(position * impressions) FROM gsc_rows "
+            "WHERE site_url = ? AND dimension = ? AND date BETWEEN ? AND ? "
+            "GROUP BY key ORDER BY SUM(clicks) DESC, SUM(impressions) DESC, key LIMIT ?",
+            (site_url, dimension, start, end, limit),
+        ).fetchall()
+        return [
+            {
+                "keys": [key],
+                "clicks": clicks,
+                "impressions": impressions,
+                "ctr": clicks / impressions if impressions else 0.0,
+                "position": weighted / impressions if impressions else 0.0,
+            }
+            for key, clicks, impressions, weighted in rows
+        ]
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OAuth, GA4 Data, Search Console and Tag Manager endpoints autopilot calls.
+
+Point the scripts at it with ``AUTOPILOT_GOOGLE_API_BASE`` (every
+``*.googleapis.com`` URL is rewritten to that base) and ``SITE_URL`` for
+postcheck. Responses are generated, not stored, so row counts and GTM
+fan-out can be scaled freely.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from common import env_optional
+
+DEFAULT_CONFIG: dict[str, Any] = {
+    "gsc_rows": 25,
+    "accounts": 1,
+    "containers_per_account": 1,
+    "latency_ms": 0.0,
+    "public_id": "GTM-STANDIN",
+    "workspace_changes": 1,
+    "html_growth": 2,
+    # Workspace changes to built-in variables, which the entity lists do not show.
+    "builtin_changes": 0,
+    # Entities per page of a workspace list (0 serves one page).
+    "gtm_page_size": 0,
+    "site_pages": 20,
+    "site_broken": 0,
+    "site_body_kb": 32,
+}
+
+# Search Console serves 1,000 rows when a request sets no rowLimit.
+GSC_DEFAULT_ROW_LIMIT = 1000
+
+
+def _days(start: str, end: str) -> list[str]:
+    try:
+        first = dt.date.fromisoformat(start)
+        last = dt.date.fromisoformat(end)
+    except ValueError:
+        return [dt.date.today().isoformat()]
+    return [(first + dt.timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+
+
+def _ga4_report(request: dict[str, Any]) -> dict[str, Any]:
+    dimensions = [item.get("name", "") for item in request.get("dimensions", [])]
+    metric_count = len(request.get("metrics", [])) or 1
+    date_range = (request.get("dateRanges") or [{}])[0]
+    events = (
+        request.get("dimensionFilter", {}).get("filter", {}).get("inListFilter", {}).get("values", ["page_view"])
+    )
+    days = _days(date_range.get("startDate", ""), date_range.get("endDate", "")) if "date" in dimensions else [""]
+    rows = []
+    for day in days:
+        for event in events if "eventName" in dimensions else [""]:
+            values = {"date": day.replace("-", ""), "eventName": event}
+            rows.append(
+                {
+                    "dimensionValues": [{"value": values.get(name, "")} for name in dimensions],
+                    "metricValues": [{"value": str(10 * (index + 1))} for index in range(metric_count)],
+                }
+            )
+    return {"rows": rows, "rowCount": len(rows)}
+
+
+def _gsc_key(dimension: str, index: int, request: dict[str, Any]) -> str:
+    if dimension == "date":
+        return request.get("startDate", "")
+    if dimension == "page":
+        return f"https://ozlemmurzoglu.com/sayfa-{index}"
+    if dimension in {"device", "country"}:
+        for group in request.get("dimensionFilterGroups", []):
+            for item in group.get("filters", []):
+                if item.get("dimension") == dimension and item.get("operator", "equals") == "equals":
+                    return item.get("expression", "")
+        return "other"
+    return f"sorgu {index}"
+
+
+def _gsc_rows(request: dict[str, Any], total: int) -> dict[str, Any]:
+    start = int(request.get("startRow", 0))
+    limit = int(request.get("rowLimit", GSC_DEFAULT_ROW_LIMIT))
+    dimensions = request.get("dimensions", [])
+    rows = []
+    for index in range(start, min(start + limit, total)):
+        impressions = 10 + (total - index) % 1000
+        clicks = impressions // (3 + index % 7)
+        rows.append(
+            {
+                "keys": [_gsc_key(dimension, index, request) for dimension in dimensions],
+                "clicks": clicks,
+                "impressions": impressions,
+                "ctr": clicks / impressions,
+                "position": 1 + index % 50,
+            }
+        )
+    return {"rows": rows} if rows else {}
+
+
+class StandIn:
+    """Threaded HTTP server answering like Google for the endpoints the scripts use.
+
+    ``config`` may be changed between runs; ``counts`` tallies requests per
+    API (``oauth``, ``ga4``, ``gsc``, ``gtm``, ``site``).
+    """
+
+    def __init__(self, config: dict[str, Any] | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self) -> None:
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = self.rfile.read(length) if length else b""
+                status, content_type, payload = standin.route(self.command, self.path, body)
+                if standin.config["latency_ms"]:
+                    time.sleep(float(standin.config["latency_ms"]) / 1000)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandIn":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self) -> dict[str, int]:
+        with self._lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+    def _count(self, api: str) -> None:
+        with self._lock:
+            self.counts[api] = self.counts.get(api, 0) + 1
+
+    def route(self, method: str, path: str, body: bytes) -> tuple[int, str, bytes]:
+        parts = urllib.parse.urlsplit(path)
+        path = parts.path
+        try:
+            request = json.loads(body.decode("utf-8")) if body and method == "POST" else {}
+        except ValueError:
+            request = {}
+        if path.startswith("/site"):
+            self._count("site")
+            if path.endswith("/sitemap.xml"):
+                return 200, "application/xml", self._sitemap().encode("utf-8")
+            if "/kirik-" in path:
+                return 404, "text/html; charset=utf-8", b"<html><head><title>404</title></head></html>"
+            return 200, "text/html; charset=utf-8", self._site_html().encode("utf-8")
+        if path == "/token":
+            self._count("oauth")
+            payload: dict[str, Any] = {"access_token": "standin-token", "expires_in": 3600, "token_type": "Bearer"}
+        elif path.endswith(":batchRunReports"):
+            self._count("ga4")
+            payload = {"reports": [_ga4_report(item) for item in request.get("requests", [])]}
+        elif path.endswith("/searchAnalytics/query"):
+            self._count("gsc")
+            payload = _gsc_rows(request, int(self.config["gsc_rows"]))
+        elif path.startswith("/tagmanager/v2/"):
+            self._count("gtm")
+            payload = self._gtm(method, path[len("/tagmanager/v2/") :], urllib.parse.parse_qs(parts.query))
+            if payload is None:
+                return 404, "application/json", b'{"error": {"code": 404, "message": "Not found"}}'
+        else:
+            return 404, "application/json", b'{"error": {"code": 404, "message": "Not found"}}'
+        return 200, "application/json", json.dumps(payload).encode("utf-8")
+
+    def _container(self, account: int, index: int) -> dict[str, Any]:
+        # The configured container sits last in the last account: worst case for discovery.
+        target = account == int(self.config["accounts"]) and index == int(self.config["containers_per_account"]) - 1
+        return {
+            "containerId": str(account * 1000 + index),
+            "publicId": self.config["public_id"] if target else f"GTM-{account}X{index}",
+            "name": f"container {account}/{index}",
+        }
+
+    def _entities(self, kind: str, workspace: bool) -> list[dict[str, Any]]:
+        # Two of each entity; in the workspace the first ``workspace_changes`` tags grow their custom HTML.
+        edited = int(self.config["workspace_changes"]) if workspace and kind == "tag" else 0
+        entities = []
+        for index in range(2):
+            entity: dict[str, Any] = {f"{kind}Id": str(index + 1), "name": f"{kind} {index + 1}"}
+            if kind == "tag":
+                html = "<script>/* standin */</script>" * (int(self.config["html_growth"]) if index < edited else 1)
+                entity["type"] = "html"
+                entity["parameter"] = [{"type": "template", "key": "html", "value": html}]
+                entity["firingTriggerId"] = ["2147479553"]
+            entity["fingerprint"] = "2" if index < edited else "1"
+            entities.append(entity)
+        return entities
+
+    def _gtm(self, method: str, path: str, query: dict[str, list[str]]) -> dict[str, Any] | None:
+        accounts = int(self.config["accounts"])
+        per_account = int(self.config["containers_per_account"])
+        if path == "accounts":
+            return {"account": [{"accountId": str(index + 1)} for index in range(accounts)]}
+        match = re.fullmatch(r"accounts/(\d+)/containers", path)
+        if match:
+            account = int(match.group(1))
+            return {"container": [self._container(account, index) for index in range(per_account)]}
+        match = re.fullmatch(r"accounts/(\d+)/containers/(\d+)", path)
+        if match:
+            return self._container(int(match.group(1)), int(match.group(2)) % 1000)
+        if re.fullmatch(r"accounts/\d+/containers/\d+/workspaces/\d+", path):
+            fingerprint = "ws-" + "-".join(
+                str(self.config[name]) for name in ("workspace_changes", "html_growth", "builtin_changes")
+            )
+            return {"workspaceId": path.rsplit("/", 1)[1], "name": "Default Workspace", "fingerprint": fingerprint}
+        match = re.fullmatch(r"accounts/\d+/containers/\d+/workspaces/\d+/(tag|trigger|variable)s", path)
+        if match:
+            entities = self._entities(match.group(1), workspace=True)
+            size = int(self.config["gtm_page_size"])
+            if not size:
+                return {match.group(1): entities}
+            start = int(query.get("pageToken", ["0"])[0])
+            page: dict[str, Any] = {match.group(1): entities[start : start + size]}
+            if start + size < len(entities):
+                page["nextPageToken"] = str(start + size)
+            return page
+        if re.fullmatch(r"accounts/\d+/containers/\d+/versions/\d+", path) and method == "GET":
+            return {kind: self._entities(kind, workspace=False) for kind in ("tag", "trigger", "variable")}
+        if path.endswith("/workspaces"):
+            workspaces = [{"workspaceId": "2", "name": "Yeni"}, {"workspaceId": "1", "name": "Default Workspace"}]
+            return {"workspace": workspaces}
+        if path.endswith("/status"):
+            changes = [
+                {"tag": {"tagId": str(index + 1)}, "changeStatus": "updated"}
+                for index in range(int(self.config["workspace_changes"]))
+            ]
+            changes += [
+                {"builtInVariable": {"type": "pageUrl", "name": "Page URL"}, "changeStatus": "added"}
+                for _ in range(int(self.config["builtin_changes"]))
+            ]
+            return {"workspaceChange": changes}
+        if path.endswith("/environments/live"):
+            return {"containerVersionId": "41", "path": f"{path.rsplit('/environments', 1)[0]}/environments/1"}
+        if path.endswith(":create_version") and method == "POST":
+            container_path = path.split("/workspaces/", 1)[0]
+            return {"containerVersion": {"path": f"{container_path}/versions/42", "containerVersionId": "42"}}
+        if path.endswith(":publish") and method == "POST":
+            return {"containerVersion": {"path": path.rsplit(":", 1)[0]}}
+        return None
+
+    def _sitemap(self) -> str:
+        # Production URLs, as in the real sitemap; the last ``site_broken`` pages answer 404.
+        pages = int(self.config["site_pages"])
+        broken = int(self.config["site_broken"])
+        paths = [f"/kaynaklar/sayfa-{index}" for index in range(pages - broken)]
+        paths += [f"/kaynaklar/kirik-{index}" for index in range(broken)]
+        urls = "".join(f"<url><loc>https://ozlemmurzoglu.com{path}</loc></url>" for path in paths)
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        )
+
+    def _site_html(self) -> str:
+        return (
+            "<!doctype html><html><head>"
+            '<meta name="description" content="Cocuk sagligi ve hastaliklari uzmani">'
+            '<meta name="keywords" content="cocuk doktoru, pediatri">'
+            '<link rel="canonical" href="https://ozlemmurzoglu.com/">'
+            '<link rel="alternate" hreflang="tr" href="https://ozlemmurzoglu.com/">'
+            f"<script>(function(){{/* {self.config['public_id']} */}})();</script>"
+            f"</head><body>{'<p>icerik</p>' * (int(self.config['site_body_kb']) * 1024 // 13)}</body></html>"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Google APIs autopilot calls.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--gsc-rows", type=int, default=DEFAULT_CONFIG["gsc_rows"])
+    parser.add_argument("--accounts", type=int, default=DEFAULT_CONFIG["accounts"])
+    parser.add_argument("--containers-per-account", type=int, default=DEFAULT_CONFIG["containers_per_account"])
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    args = parser.parse_args()
+
+    standin = StandIn(
+        {
+            "gsc_rows": args.gsc_rows,
+            "accounts": args.accounts,
+            "containers_per_account": args.containers_per_account,
+            "latency_ms": args.latency_ms,
+            "public_id": env_optional("GTM_CONTAINER_ID", DEFAULT_CONFIG["public_id"]),
+        },
+        port=args.port,
+    )
+    print(f"Serving Google API stand-in at {standin.base_url} (AUTOPILOT_GOOGLE_API_BASE={standin.base_url})")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,15 @@ from typing import Any
 from common import (
     REPO_ROOT,
     RUNS_ROOT,
+    StepError,
     backup_file,
     env_optional,
     env_required,
-    fail,
     load_json,
     parse_bool,
     read_text,
     regex_replace_once,
+    run_cli_step,
     success,
     utc_now_iso,
     validate_whitelist,
@@ -90,27 +91,33 @@ def _make_diff(path: pathlib.Path, original: str, updated: str) -> str:
     return "".join(lines)
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Apply SEO patches to whitelisted files")
-    parser.add_argument("--plan", required=True)
-    parser.add_argument("--run-id", default="")
-    parser.add_argument("--output", default="")
-    parser.add_argument("--dry-run", default="true")
-    args = parser.parse_args()
+def _output_path(run_id: str, output: str) -> pathlib.Path:
+    return pathlib.Path(output).resolve() if output else RUNS_ROOT / run_id / "execution-report.json"
+
 
+def run_step(
+    *,
+    plan: str = "",
+    run_id: str = "",
+    output: str = "",
+    dry_run: str | bool = True,
+    plan_data: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Patch whitelisted files from a plan file (or in-memory ``plan_data``) and return the execution report."""
     try:
         env = env_required(["GA4_MEASUREMENT_ID", "GTM_CONTAINER_ID"])
     except RuntimeError as exc:
-        fail(str(exc))
+        raise StepError(str(exc)) from exc
 
-    plan = load_json(pathlib.Path(args.plan).resolve())
-    run_id = args.run_id.strip() or plan.get("run_id", "")
+    if plan_data is None:
+        plan_data = load_json(pathlib.Path(plan).resolve())
+    run_id = run_id.strip() or plan_data.get("run_id", "")
     if not run_id:
-        fail("run_id is missing. Provide --run-id or include run_id in plan.")
+        raise StepError("run_id is missing. Provide --run-id or include run_id in plan.")
 
-    dry_run = parse_bool(args.dry_run)
+    dry_run = parse_bool(dry_run)
     run_dir = RUNS_ROOT / run_id
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "execution-report.json"
+    output_path = _output_path(run_id, output)
 
     index_path = (REPO_ROOT / "src/index.html").resolve()
     seo_config_path = (REPO_ROOT / "src/app/config/seo.config.ts").resolve()
@@ -119,9 +126,9 @@ def main() -> None:
     try:
         validate_whitelist(targets)
     except Exception as exc:  # noqa: BLE001
-        fail(str(exc))
+        raise StepError(str(exc)) from exc
 
-    patch = plan.get("autopilot_patch", {})
+    patch = plan_data.get("autopilot_patch", {})
     index_patch = patch.get("index_html", {})
     description = index_patch.get("description_tr") or "Atasehir cocuk doktoru ve pediatri klinigi."
     keywords = index_patch.get("keywords") or "atasehir cocuk doktoru, pediatri"
@@ -145,7 +152,7 @@ def main() -> None:
             gsc_code=gsc_code,
         )
     except Exception as exc:  # noqa: BLE001
-        fail("Failed to generate SEO patches.", {"reason": str(exc)})
+        raise StepError("Failed to generate SEO patches.", {"reason": str(exc)}) from exc
 
     changes: list[dict[str, Any]] = []
     backups: list[dict[str, str]] = []
@@ -185,12 +192,30 @@ def main() -> None:
     }
 
     write_json(output_path, report)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply SEO patches to whitelisted files")
+    parser.add_argument("--plan", required=True)
+    parser.add_argument("--run-id", default="")
+    parser.add_argument("--output", default="")
+    parser.add_argument("--dry-run", default="true")
+    args = parser.parse_args()
+
+    report = run_cli_step(
+        run_step,
+        plan=args.plan,
+        run_id=args.run_id,
+        output=args.output,
+        dry_run=args.dry_run,
+    )
     success(
         {
-            "run_id": run_id,
-            "execution_report": str(output_path),
-            "changed_files": [item["file"] for item in changes],
-            "dry_run": dry_run,
+            "run_id": report["run_id"],
+            "execution_report": str(_output_path(report["run_id"], args.output)),
+            "changed_files": [item["file"] for item in report["changes"]],
+            "dry_run": report["dry_run"],
         }
     )
 
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Time autopilot scripts and the full pipeline against the local Google API stand-in."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+import apply_seo
+import fetch_ga4_gsc
+import generate_plan
+import postcheck
+import publish_gtm
+import rollback
+from api_standin import StandIn
+from common import REPO_ROOT, RUNS_ROOT, load_json, success, utc_now_iso, write_json
+
+DEFAULT_SIZES = "25,1000,25000,100000,500000"
+SCRIPTS = ("fetch_ga4_gsc", "generate_plan", "apply_seo", "publish_gtm", "postcheck", "rollback")
+PUBLIC_ID = "GTM-STANDIN"
+
+# Every variable a step could use to reach real services is pinned to the stand-in.
+BENCH_ENV = {
+    "GA4_PROPERTY_ID": "123456",
+    "GA4_MEASUREMENT_ID": "G-STANDIN",
+    "GSC_SITE_URL": "https://ozlemmurzoglu.com/",
+    "GTM_CONTAINER_ID": PUBLIC_ID,
+    "GOOGLE_CLIENT_ID": "standin-client",
+    "GOOGLE_CLIENT_SECRET": "standin-secret",
+    "GOOGLE_REFRESH_TOKEN": "standin-refresh",
+    "FIREBASE_PROJECT_ID": "standin-project",
+    "AUTOPILOT_TOKEN_CACHE": "false",
+    "AUTOPILOT_RESPONSE_CACHE": "false",
+    "AUTOPILOT_GTM_CACHE": "false",
+    "AUTOPILOT_CASSETTE_MODE": "off",
+    "AUTOPILOT_GA4_QPM": "0",
+    "AUTOPILOT_GSC_QPM": "0",
+    "AUTOPILOT_GTM_QPM": "0",
+}
+
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=False
+        )
+    except OSError:
+        return ""
+    return result.stdout.strip()
+
+
+def _timed(step: Callable[[], Any]) -> tuple[float, Any]:
+    started = time.perf_counter()
+    result = step()
+    return time.perf_counter() - started, result
+
+
+def _summary(samples: list[float]) -> dict[str, Any]:
+    return {
+        "samples": [round(value, 4) for value in samples],
+        "min_seconds": round(min(samples), 4),
+        "median_seconds": round(statistics.median(samples), 4),
+        "max_seconds": round(max(samples), 4),
+    }
+
+
+def _bench_scripts(standin: StandIn, run_id: str) -> dict[str, dict[str, Any]]:
+    """Run each script once in-process and return ``{script: {"seconds", "requests"}}``."""
+    run_dir = RUNS_ROOT / run_id
+    results: dict[str, dict[str, Any]] = {}
+
+    def record(name: str, step: Callable[[], Any]) -> Any:
+        standin.reset_counts()
+        seconds, report = _timed(step)
+        results[name] = {"seconds": seconds, "requests": standin.reset_counts()}
+        return report
+
+    analysis = record("fetch_ga4_gsc", lambda: fetch_ga4_gsc.run_step(run_id=run_id, gsc_paginate=True))
+    plan = record("generate_plan", lambda: generate_plan.run_step(analysis_data=analysis))
+    record("apply_seo", lambda: apply_seo.run_step(run_id=run_id, dry_run=True, plan_data=plan))
+    gtm = record("publish_gtm", lambda: publish_gtm.run_step(run_id=run_id, dry_run=False))
+    record("postcheck", lambda: postcheck.run_step(run_id=run_id))
+
+    write_json(
+        run_dir / "rollback-manifest.json",
+        {
+            "run_id": run_id,
+            "created_at": utc_now_iso(),
+            "file_backups": [],
+            "deploy": {"enabled": False},
+            "gtm": {"previous_live_version_path": gtm.get("live_before", {}).get("version_path", "")},
+        },
+    )
+    record("rollback", lambda: rollback.run_step(run_id=run_id))
+    return results
+
+
+def _bench_pipeline(standin: StandIn, runner: str) -> dict[str, Any]:
+    """Run ``run_autopilot`` as a child process (publish path, dry-run) and time it end to end."""
+    cmd = [
+        sys.executable,
+        str(pathlib.Path(__file__).resolve().parent / "run_autopilot.py"),
+        "--publish",
+        "true",
+        "--dry-run",
+        "true",
+        "--gsc-paginate",
+        "true",
+        "--runner",
+        runner,
+    ]
+    standin.reset_counts()
+    seconds, result = _timed(lambda: subprocess.run(cmd, capture_output=True, text=True, check=False))
+    entry: dict[str, Any] = {"seconds": seconds, "requests": standin.reset_counts(), "return_code": result.returncode}
+    try:
+        run_report = load_json(pathlib.Path(json.loads(result.stdout)["run_report"]))
+    except (KeyError, OSError, ValueError):
+        entry["error"] = (result.stderr or result.stdout)[-2000:]
+        return entry
+    entry["run_id"] = run_report["run_id"]
+    entry["critical_path"] = run_report.get("critical_path", [])
+    entry["steps"] = {step.get("step", ""): step.get("duration_seconds") for step in run_report.get("steps", [])}
+    return entry
+
+
+def _compare(results: list[dict[str, Any]], baseline_path: pathlib.Path) -> list[dict[str, Any]]:
+    baseline = {
+        (item["size"], item["target"]): item["median_seconds"] for item in load_json(baseline_path)["results"]
+    }
+    rows = []
+    for item in results:
+        before = baseline.get((item["size"], item["target"]))
+        if before:
+            rows.append(
+                {
+                    "size": item["size"],
+                    "target": item["target"],
+                    "baseline_median_seconds": before,
+                    "median_seconds": item["median_seconds"],
+                    "ratio": round(item["median_seconds"] / before, 3),
+                }
+            )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark autopilot scripts against a local Google API stand-in.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated GSC row counts.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per script and size.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stand-in latency added to every request.")
+    parser.add_argument("--accounts", type=int, default=3, help="GTM accounts listed by the stand-in.")
+    parser.add_argument("--containers-per-account", type=int, default=5)
+    parser.add_argument("--pipeline", default="true", help="Also time the full run_autopilot pipeline.")
+    parser.add_argument("--runner", choices=["inprocess", "subprocess"], default="inprocess")
+    parser.add_argument("--compare", default="", help="Earlier benchmark JSON to compute median ratios against.")
+    parser.add_argument("--keep-runs", default="false", help="Keep the run directories the benchmark creates.")
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+
+    sizes = [int(item) for item in args.sizes.split(",") if item.strip()]
+    standin = StandIn(
+        {
+            "accounts": args.accounts,
+            "containers_per_account": args.containers_per_account,
+            "latency_ms": args.latency_ms,
+            "public_id": PUBLIC_ID,
+        }
+    ).start()
+    os.environ.update(BENCH_ENV)
+    os.environ["AUTOPILOT_GOOGLE_API_BASE"] = standin.base_url
+    os.environ["SITE_URL"] = f"{standin.base_url}/site/"
+
+    stamp = utc_now_iso().replace(":", "").replace("-", "")
+    created: list[str] = []
+    results: list[dict[str, Any]] = []
+    try:
+        for size in sizes:
+            standin.config["gsc_rows"] = size
+            samples: dict[str, list[dict[str, Any]]] = {}
+            for attempt in range(max(args.repeat, 1)):
+                run_id = f"bench-{stamp}-{size}-{attempt}"
+                created.append(run_id)
+                for name, sample in _bench_scripts(standin, run_id).items():
+                    samples.setdefault(name, []).append(sample)
+                if args.pipeline.strip().lower() == "true":
+                    sample = _bench_pipeline(standin, args.runner)
+                    if sample.get("run_id"):
+                        created.append(sample["run_id"])
+                    samples.setdefault("pipeline", []).append(sample)
+            for target, items in samples.items():
+                results.append(
+                    {
+                        "size": size,
+                        "target": target,
+                        **_summary([item["seconds"] for item in items]),
+                        "requests": items[-1]["requests"],
+                        **({"last_run": items[-1]} if target == "pipeline" else {}),
+                    }
+                )
+    finally:
+        standin.stop()
+        if args.keep_runs.strip().lower() != "true":
+            for run_id in created:
+                shutil.rmtree(RUNS_ROOT / run_id, ignore_errors=True)
+
+    output_path = (
+        pathlib.Path(args.output).resolve() if args.output else RUNS_ROOT / "benchmarks" / f"benchmark-{stamp}.json"
+    )
+    payload: dict[str, Any] = {
+        "generated_at": utc_now_iso(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+            "accounts": args.accounts,
+            "containers_per_account": args.containers_per_account,
+            "runner": args.runner,
+            "scripts": list(SCRIPTS),
+        },
+        "results": results,
+    }
+    if args.compare:
+        payload["comparison"] = _compare(results, pathlib.Path(args.compare).resolve())
+    write_json(output_path, payload)
+
+    success(
+        {
+            "benchmark": str(output_path),
+            "median_seconds": {f"{item['target']}@{item['size']}": item["median_seconds"] for item in results},
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Content-hash cache of the Angular build output and snapshots of deployed hosting trees."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import shutil
+import tarfile
+import time
+from typing import Any, Iterator
+
+from common import (
+    REPO_ROOT,
+    SKILL_ROOT,
+    env_optional,
+    file_digest,
+    file_lock,
+    load_json,
+    parse_bool,
+    utc_now_iso,
+    write_json_atomic,
+)
+
+CACHE_ROOT = SKILL_ROOT / ".cache" / "build"
+SNAPSHOT_ROOT = SKILL_ROOT / ".cache" / "deploys"
+# Everything `npm run build` reads; angular.json copies assets from public/ and src/assets/.
+BUILD_INPUTS = (
+    "src",
+    "public",
+    "angular.json",
+    "package.json",
+    "package-lock.json",
+    "tsconfig.json",
+    "tsconfig.app.json",
+)
+# Shipped by `firebase deploy --only hosting` next to the tree (headers, rewrites, redirects) but not
+# read by the build, so they count for the deploy-skip decision and not for the build-cache key.
+HOSTING_CONFIG = ("firebase.json", ".firebaserc")
+DEFAULT_DIST = "dist/angular-app/browser"
+DEFAULT_KEEP = 3
+DEFAULT_SNAPSHOT_KEEP = 5
+
+
+def dist_dir(root: pathlib.Path = REPO_ROOT) -> pathlib.Path:
+    """Hosting ``public`` directory from firebase.json (the build output that gets deployed)."""
+    try:
+        public = load_json(root / "firebase.json").get("hosting", {}).get("public", DEFAULT_DIST)
+    except (OSError, ValueError):
+        public = DEFAULT_DIST
+    return root / public
+
+
+def _walk(root: pathlib.Path, entries: tuple[str, ...] | None = None) -> Iterator[tuple[str, pathlib.Path]]:
+    """Yield ``(relative posix path, path)`` for every file under ``entries`` of ``root``, sorted."""
+    tops = [root / entry for entry in entries] if entries is not None else [root]
+    files: list[tuple[str, pathlib.Path]] = []
+    for top in tops:
+        if top.is_file():
+            files.append((top.relative_to(root).as_posix(), top))
+        elif top.is_dir():
+            for dirpath, _, filenames in os.walk(top):
+                for name in filenames:
+                    path = pathlib.Path(dirpath) / name
+                    files.append((path.relative_to(root).as_posix(), path))
+    yield from sorted(files)
+
+
+def input_digest(root: pathlib.Path = REPO_ROOT, state_path: pathlib.Path = CACHE_ROOT / "inputs.json") -> str:
+    """Hash the path and content of every build input.
+
+    File digests are remembered by size and mtime in ``state_path``, so only
+    files touched since the last deploy are re-read.
+    """
+    try:
+        known = load_json(state_path)
+    except (OSError, ValueError):
+        known = {}
+    seen: dict[str, list[Any]] = {}
+    digest = hashlib.sha256()
+    for relative, path in _walk(root, BUILD_INPUTS):
+        stat = path.stat()
+        entry = known.get(relative)
+        if not entry or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            entry = [stat.st_size, stat.st_mtime_ns, file_digest(path)]
+        seen[relative] = entry
+        digest.update(f"{relative}\0{entry[2]}\n".encode("utf-8"))
+    write_json_atomic(state_path, seen)
+    return digest.hexdigest()
+
+
+def config_digest(root: pathlib.Path = REPO_ROOT) -> str:
+    """Hash the hosting config files deployed alongside the built tree."""
+    digest = hashlib.sha256()
+    for relative, path in _walk(root, HOSTING_CONFIG):
+        digest.update(f"{relative}\0{file_digest(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def tree_digest(directory: pathlib.Path) -> str:
+    """Hash the relative paths and contents of every file under ``directory``."""
+    digest = hashlib.sha256()
+    for relative, path in _walk(directory):
+        digest.update(f"{relative}\0{file_digest(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _extract(archive: pathlib.Path, target: pathlib.Path) -> None:
+    """Unpack ``archive`` next to ``target`` and swap it in, so a failed restore leaves ``target`` intact."""
+    staging = target.with_name(f".{target.name}.{os.getpid()}.restore")
+    shutil.rmtree(staging, ignore_errors=True)
+    with tarfile.open(archive, "r:gz") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(staging, filter="data")
+        else:  # pragma: no cover - Python without tar extraction filters
+            tar.extractall(staging)
+    previous = target.with_name(f".{target.name}.{os.getpid()}.old")
+    if target.exists():
+        os.replace(target, previous)
+    os.replace(staging, target)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def _archive(source: pathlib.Path, archive: pathlib.Path) -> None:
+    tmp = archive.with_name(f".{archive.name}.{os.getpid()}.tmp")
+    with tarfile.open(tmp, "w:gz", compresslevel=6) as tar:
+        for relative, path in _walk(source):
+            tar.add(path, arcname=relative)
+    os.replace(tmp, archive)
+
+
+class BuildCache:
+    """Build outputs stored as ``dist-<tree digest>.tar.gz`` with an index from input hash to archive.
+
+    Identical outputs share one archive. Only the ``keep`` most recently
+    used input hashes are kept; unreferenced archives are deleted.
+    """
+
+    def __init__(self, root: pathlib.Path = CACHE_ROOT, *, keep: int = DEFAULT_KEEP, enabled: bool = True) -> None:
+        self.root = root
+        self.keep = keep
+        self.enabled = enabled
+        self.index_path = root / "index.json"
+
+    @classmethod
+    def from_env(cls) -> "BuildCache":
+        try:
+            keep = int(env_optional("AUTOPILOT_BUILD_CACHE_KEEP", str(DEFAULT_KEEP)))
+        except ValueError:
+            keep = DEFAULT_KEEP
+        return cls(keep=keep, enabled=parse_bool(env_optional("AUTOPILOT_BUILD_CACHE", "true")))
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            index = load_json(self.index_path)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("stats", {"hits": 0, "misses": 0, "saved_seconds": 0.0})
+        return index
+
+    def archive_path(self, dist_digest: str) -> pathlib.Path:
+        return self.root / f"dist-{dist_digest}.tar.gz"
+
+    def restore(self, input_hash: str, target: pathlib.Path) -> dict[str, Any] | None:
+        """Restore the output cached for ``input_hash`` into ``target``; None (a miss) when there is none."""
+        with file_lock(self.root / ".lock"):
+            index = self._load()
+            entry = index["entries"].get(input_hash)
+            if entry is None or not self.archive_path(entry["dist_digest"]).exists():
+                index["stats"]["misses"] += 1
+                write_json_atomic(self.index_path, index)
+                return None
+            started = time.monotonic()
+            _extract(self.archive_path(entry["dist_digest"]), target)
+            restore_seconds = time.monotonic() - started
+            saved = max(entry["build_seconds"] - restore_seconds, 0.0)
+            entry["last_used"] = utc_now_iso()
+            index["stats"]["hits"] += 1
+            index["stats"]["saved_seconds"] = round(index["stats"]["saved_seconds"] + saved, 3)
+            write_json_atomic(self.index_path, index)
+        return {**entry, "restore_seconds": round(restore_seconds, 3), "saved_seconds": round(saved, 3)}
+
+    def store(self, input_hash: str, source: pathlib.Path, build_seconds: float) -> dict[str, Any]:
+        """Archive ``source`` (fresh build output) under its tree digest and index it by ``input_hash``."""
+        dist_digest = tree_digest(source)
+        with file_lock(self.root / ".lock"):
+            archive = self.archive_path(dist_digest)
+            if not archive.exists():
+                _archive(source, archive)
+            index = self._load()
+            entry = {
+                "dist_digest": dist_digest,
+                "build_seconds": round(build_seconds, 3),
+                "archive_bytes": archive.stat().st_size,
+                "created_at": utc_now_iso(),
+                "last_used": utc_now_iso(),
+            }
+            index["entries"][input_hash] = entry
+            self._prune(index)
+            write_json_atomic(self.index_path, index)
+        return entry
+
+    def _prune(self, index: dict[str, Any]) -> None:
+        entries = index["entries"]
+        for stale in sorted(entries, key=lambda key: entries[key]["last_used"], reverse=True)[max(self.keep, 1) :]:
+            del entries[stale]
+        referenced = {self.archive_path(entry["dist_digest"]).name for entry in entries.values()}
+        for archive in self.root.glob("dist-*.tar.gz"):
+            if archive.name not in referenced:
+                archive.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        return dict(self._load()["stats"])
+
+
+class DeploySnapshots:
+    """Compressed, content-addressed copies of every deployed tree, plus ``live.json`` naming the current one.
+
+    ``deploy_hosting`` records a snapshot after each successful deploy, so
+    rollback can redeploy the tree that was live before a run without
+    rebuilding. The ``keep`` most recently deployed snapshots are kept.
+    """
+
+    def __init__(self, root: pathlib.Path = SNAPSHOT_ROOT, *, keep: int = DEFAULT_SNAPSHOT_KEEP) -> None:
+        self.root = root
+        self.keep = keep
+
+    @classmethod
+    def from_env(cls) -> "DeploySnapshots":
+        try:
+            keep = int(env_optional("AUTOPILOT_DEPLOY_SNAPSHOTS_KEEP", str(DEFAULT_SNAPSHOT_KEEP)))
+        except ValueError:
+            keep = DEFAULT_SNAPSHOT_KEEP
+        return cls(keep=keep)
+
+    def archive_path(self, digest: str) -> pathlib.Path:
+        return self.root / f"{digest}.tar.gz"
+
+    def has(self, digest: str) -> bool:
+        return bool(digest) and self.archive_path(digest).exists()
+
+    def live(self) -> dict[str, Any]:
+        """Snapshot of the tree currently deployed from this machine, or ``{}`` when none was recorded."""
+        try:
+            return load_json(self.root / "live.json")
+        except (OSError, ValueError):
+            return {}
+
+    def record(
+        self,
+        source: pathlib.Path,
+        run_id: str,
+        digest: str = "",
+        reuse: pathlib.Path | None = None,
+        input_hash: str = "",
+        config_hash: str = "",
+    ) -> dict[str, Any]:
+        """Snapshot ``source`` as the live tree.
+
+        ``reuse`` is an existing archive of the same tree to link instead of
+        compressing again; ``input_hash`` is the build-input hash it came from
+        and ``config_hash`` the hosting config deployed with it.
+        """
+        digest = digest or tree_digest(source)
+        with file_lock(self.root / ".lock"):
+            archive = self.archive_path(digest)
+            if not archive.exists():
+                if reuse is not None and reuse.exists():
+                    tmp = archive.with_name(f".{archive.name}.{os.getpid()}.tmp")
+                    try:
+                        os.link(reuse, tmp)
+                    except OSError:
+                        shutil.copyfile(reuse, tmp)
+                    os.replace(tmp, archive)
+                else:
+                    _archive(source, archive)
+            # mtime marks when the tree was last deployed, for pruning.
+            os.utime(archive)
+            snapshot = {
+                "digest": digest,
+                "input_hash": input_hash,
+                "config_hash": config_hash,
+                "archive": str(archive),
+                "archive_bytes": archive.stat().st_size,
+                "run_id": run_id,
+                "deployed_at": utc_now_iso(),
+            }
+            write_json_atomic(self.root / "live.json", snapshot)
+            archives = sorted(self.root.glob("*.tar.gz"), key=lambda path: path.stat().st_mtime, reverse=True)
+            for stale in archives[max(self.keep, 1) :]:
+                stale.unlink(missing_ok=True)
+        return snapshot
+
+    def restore(self, digest: str, target: pathlib.Path) -> float:
+        """Unpack snapshot ``digest`` into ``target``; returns the seconds it took."""
+        started = time.monotonic()
+        _extract(self.archive_path(digest), target)
+        return time.monotonic() - started
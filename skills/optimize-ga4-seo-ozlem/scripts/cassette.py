@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Record/replay cassettes for the Google API, OAuth and postcheck traffic of autopilot scripts."""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+import time
+import urllib.parse
+from typing import Any, Callable
+
+MODES = ("off", "record", "replay")
+# Search Console serves 1,000 rows when a request sets no rowLimit.
+GSC_DEFAULT_ROW_LIMIT = 1000
+REPLAY_TOKEN = "cassette-replay-token"
+
+_SECRET_FIELDS = ("access_token", "refresh_token", "id_token")
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class CassetteMiss(RuntimeError):
+    """Replay found no recording for a request."""
+
+
+def _parse_json(raw: bytes | None) -> Any:
+    if not raw:
+        return None
+    try:
+        return json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def _is_oauth(url: str) -> bool:
+    return urllib.parse.urlsplit(url).hostname == "oauth2.googleapis.com"
+
+
+def _is_gsc_query(url: str) -> bool:
+    return url.endswith("/searchAnalytics/query")
+
+
+def _key(method: str, url: str, request: Any, *, paged: bool = False) -> str:
+    if paged and isinstance(request, dict):
+        request = {name: value for name, value in request.items() if name not in {"startRow", "rowLimit"}}
+    return "\n".join([method.upper(), url, json.dumps(request, sort_keys=True, separators=(",", ":"))])
+
+
+def _parse_errors(spec: str) -> list[list[Any]]:
+    """Parse ``<url substring>=<status>[x<count>]`` rules separated by commas."""
+    rules: list[list[Any]] = []
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        needle, _, rest = item.strip().partition("=")
+        status, _, count = rest.partition("x")
+        try:
+            rules.append([needle, int(status), int(count) if count else 1])
+        except ValueError:
+            continue
+    return rules
+
+
+def _inflate(rows: list[dict[str, Any]], count: int) -> list[dict[str, Any]]:
+    """Repeat recorded rows up to ``count``, suffixing the keys of copies so every row stays distinct."""
+    inflated = []
+    for index in range(count):
+        row = rows[index % len(rows)]
+        copy = index // len(rows)
+        keys = row.get("keys", [])
+        inflated.append({**row, "keys": [f"{key} #{copy}" for key in keys] if copy else keys})
+    return inflated
+
+
+class Cassette:
+    """JSONL cassette of normalized requests and responses.
+
+    Requests are keyed by method, URL and canonical JSON body; form bodies
+    (OAuth) and headers are never stored, and token fields in OAuth
+    responses are redacted. Replay serves repeated requests in recorded
+    order, repeating the last answer once a key runs out. Search Console
+    queries are matched without ``startRow``/``rowLimit`` and re-sliced, so
+    replay pages correctly even when ``gsc_rows`` inflates the row count.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        mode: str,
+        *,
+        latency_ms: str = "",
+        errors: str = "",
+        gsc_rows: int = 0,
+    ) -> None:
+        if mode not in MODES[1:]:
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.gsc_rows = gsc_rows
+        self._errors = _parse_errors(errors)
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0, "injected_errors": 0}
+        self._exact: dict[str, list[dict[str, Any]]] = {}
+        self._paged: dict[str, list[dict[str, Any]]] = {}
+        self._served: dict[str, int] = {}
+        self._rows: dict[str, list[dict[str, Any]]] = {}
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except OSError as exc:
+            raise CassetteMiss(f"Cassette not found: {self.path}") from exc
+        for line in lines:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            self._exact.setdefault(_key(entry["method"], entry["url"], entry["request"]), []).append(entry)
+            if _is_gsc_query(entry["url"]):
+                self._paged.setdefault(_key(entry["method"], entry["url"], entry["request"], paged=True), []).append(
+                    entry
+                )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None,
+        send: Callable[[], tuple[int, dict[str, str], bytes]],
+    ) -> tuple[int, dict[str, str], bytes]:
+        request = None if _is_oauth(url) else _parse_json(body)
+        if self.mode == "record":
+            return self._record(method, url, request, send)
+        return self._replay(method, url, request)
+
+    def _record(
+        self,
+        method: str,
+        url: str,
+        request: Any,
+        send: Callable[[], tuple[int, dict[str, str], bytes]],
+    ) -> tuple[int, dict[str, str], bytes]:
+        started = time.monotonic()
+        status, headers, content = send()
+        elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        response = _parse_json(content)
+        if response is None:
+            response = content.decode("utf-8", errors="replace")
+        elif isinstance(response, dict) and _is_oauth(url):
+            response = {name: "redacted" if name in _SECRET_FIELDS else value for name, value in response.items()}
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "request": request,
+            "status": status,
+            "headers": {name: headers[name] for name in _KEPT_HEADERS if name in headers},
+            "response": response,
+            "elapsed_ms": elapsed_ms,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+            self._stats["recorded"] += 1
+        return status, headers, content
+
+    def _injected_error(self, url: str) -> int | None:
+        with self._lock:
+            for rule in self._errors:
+                needle, status, remaining = rule
+                if remaining > 0 and needle in url:
+                    rule[2] -= 1
+                    self._stats["injected_errors"] += 1
+                    return status
+        return None
+
+    def _next(self, key: str, entries: list[dict[str, Any]]) -> dict[str, Any]:
+        with self._lock:
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        return entries[min(index, len(entries) - 1)]
+
+    def _gsc_rows(self, key: str, entries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        with self._lock:
+            if key not in self._rows:
+                pages = {(entry["request"] or {}).get("startRow", 0): entry for entry in entries}
+                rows = [row for start in sorted(pages) for row in (pages[start]["response"] or {}).get("rows", [])]
+                self._rows[key] = _inflate(rows, self.gsc_rows) if self.gsc_rows and rows else rows
+            return self._rows[key]
+
+    def _gsc_page(self, method: str, url: str, request: dict[str, Any]) -> dict[str, Any] | None:
+        key = _key(method, url, request, paged=True)
+        entries = self._paged.get(key)
+        if not entries:
+            return None
+        rows = self._gsc_rows(key, entries)
+        start = int(request.get("startRow", 0))
+        limit = int(request.get("rowLimit", GSC_DEFAULT_ROW_LIMIT))
+        page = rows[start : start + limit]
+        return {
+            "status": 200,
+            "headers": {},
+            "response": {"rows": page} if page else {},
+            "elapsed_ms": entries[0]["elapsed_ms"],
+        }
+
+    def _replay(self, method: str, url: str, request: Any) -> tuple[int, dict[str, str], bytes]:
+        status = self._injected_error(url)
+        if status is not None:
+            payload = {"error": {"code": status, "message": "Injected by cassette replay."}}
+            return status, {"content-type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+        if _is_oauth(url):
+            entry: dict[str, Any] | None = {
+                "status": 200,
+                "headers": {},
+                "response": {"access_token": REPLAY_TOKEN, "expires_in": 3600, "token_type": "Bearer"},
+                "elapsed_ms": 0,
+            }
+        elif _is_gsc_query(url) and isinstance(request, dict):
+            entry = self._gsc_page(method, url, request)
+        else:
+            key = _key(method, url, request)
+            entries = self._exact.get(key)
+            entry = self._next(key, entries) if entries else None
+        if entry is None:
+            self._count("misses")
+            raise CassetteMiss(f"Cassette {self.path} has no recording for {method.upper()} {url}")
+        self._count("replayed")
+
+        if self.latency_ms == "recorded":
+            time.sleep(float(entry.get("elapsed_ms", 0)) / 1000)
+        elif self.latency_ms:
+            time.sleep(float(self.latency_ms) / 1000)
+        response = entry["response"]
+        content = response.encode("utf-8") if isinstance(response, str) else json.dumps(response).encode("utf-8")
+        return entry["status"], dict(entry["headers"]), content
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": str(self.path), **self._stats}
+
+
+_ACTIVE: dict[tuple[str, ...], Cassette] = {}
+_ACTIVE_LOCK = threading.Lock()
+
+
+def active() -> Cassette | None:
+    """Cassette selected by ``AUTOPILOT_CASSETTE_MODE`` / ``AUTOPILOT_CASSETTE``, or None when off."""
+    mode = os.getenv("AUTOPILOT_CASSETTE_MODE", "off").strip().lower() or "off"
+    if mode == "off":
+        return None
+    path = os.getenv("AUTOPILOT_CASSETTE", "").strip()
+    if not path:
+        raise RuntimeError("AUTOPILOT_CASSETTE must point at a cassette file when AUTOPILOT_CASSETTE_MODE is set.")
+    config = (
+        mode,
+        str(pathlib.Path(path).resolve()),
+        os.getenv("AUTOPILOT_CASSETTE_LATENCY_MS", "").strip(),
+        os.getenv("AUTOPILOT_CASSETTE_ERRORS", "").strip(),
+        os.getenv("AUTOPILOT_CASSETTE_GSC_ROWS", "").strip(),
+    )
+    with _ACTIVE_LOCK:
+        if config not in _ACTIVE:
+            _ACTIVE[config] = Cassette(
+                pathlib.Path(config[1]),
+                mode,
+                latency_ms=config[2],
+                errors=config[3],
+                gsc_rows=int(config[4] or 0),
+            )
+        return _ACTIVE[config]
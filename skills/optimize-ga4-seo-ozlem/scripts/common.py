@@ -3,7 +3,16 @@
 
 from __future__ import annotations
 
+import codecs
+import collections
+import contextlib
+import contextvars
+import cProfile
 import datetime as dt
+import functools
+import gzip
+import hashlib
+import http.client
 import json
 import os
 import pathlib
@@ -11,15 +20,49 @@ import re
 import shutil
 import subprocess
 import sys
-import urllib.error
+import threading
+import time
+import tracemalloc
 import urllib.parse
-import urllib.request
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, NoReturn, TypeVar
+
+import cassette
+import http_pool
+import rate_limit
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts fall back to thread-only locking
+    fcntl = None  # type: ignore[assignment]
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - child CPU time is not reported on non-POSIX hosts
+    resource = None  # type: ignore[assignment]
 
 SCRIPT_PATH = pathlib.Path(__file__).resolve()
 SKILL_ROOT = SCRIPT_PATH.parents[1]
 REPO_ROOT = SCRIPT_PATH.parents[3]
 RUNS_ROOT = SKILL_ROOT / "runs"
+TOKENS_ROOT = SKILL_ROOT / ".tokens"
+
+OAUTH_SCOPES = [
+    "https://www.googleapis.com/auth/analytics.readonly",
+    "https://www.googleapis.com/auth/webmasters.readonly",
+    "https://www.googleapis.com/auth/tagmanager.edit.containers",
+    "https://www.googleapis.com/auth/tagmanager.publish",
+    "https://www.googleapis.com/auth/firebase",
+    "https://www.googleapis.com/auth/cloud-platform",
+]
+
+DEFAULT_FETCH_CONCURRENCY = 8
+
+# Output kept in memory and in reports per stream of a ``run_command`` child; the full output goes to its log.
+COMMAND_TAIL_LINES = 200
+COMMAND_TAIL_BYTES = 64 * 1024
+
+T = TypeVar("T")
 
 WHITELIST_PATHS = {
     (REPO_ROOT / "src/index.html").resolve(),
@@ -27,6 +70,155 @@ WHITELIST_PATHS = {
 }
 
 
+class StepError(RuntimeError):
+    """Step failure carrying the structured details that ``fail`` reports."""
+
+    def __init__(self, message: str, details: dict[str, Any] | None = None, exit_code: int = 1) -> None:
+        super().__init__(message)
+        self.details = details or {}
+        self.exit_code = exit_code
+
+
+class ConcurrentRequestError(RuntimeError):
+    """Raised when one or more tasks of a concurrent fan-out fail; ``errors`` maps task name to reason."""
+
+    def __init__(self, errors: dict[str, str], completed: list[str]) -> None:
+        names = ", ".join(sorted(errors))
+        super().__init__(f"{len(errors)} of {len(errors) + len(completed)} requests failed: {names}")
+        self.errors = errors
+        self.completed = completed
+
+
+class Span:
+    """One traced operation; ``set`` attaches attributes, ``add`` bumps byte and retry counters."""
+
+    recording = True
+
+    def __init__(self, name: str, kind: str, span_id: str, parent_id: str, attrs: dict[str, Any]) -> None:
+        self.name = name
+        self.kind = kind
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, *, bytes_in: int = 0, bytes_out: int = 0, retries: int = 0) -> None:
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.retries += retries
+
+
+class _NoopSpan(Span):
+    recording = False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def add(self, *, bytes_in: int = 0, bytes_out: int = 0, retries: int = 0) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan("", "noop", "", "", {})
+_SPAN: contextvars.ContextVar[Span | None] = contextvars.ContextVar("autopilot_span", default=None)
+_TRACE_LOCK = threading.Lock()
+
+
+def current_span() -> Span:
+    return _SPAN.get() or _NOOP_SPAN
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str = "internal", **attrs: Any) -> Iterator[Span]:
+    """Time a block as a span appended to ``AUTOPILOT_TRACE`` (JSONL); a no-op when that is unset.
+
+    Spans nest through a context variable, so work on ``run_concurrently``
+    threads lands under its caller. Child processes started by
+    ``run_command`` parent their root spans to the span that launched them
+    via ``AUTOPILOT_TRACE_PARENT``.
+    """
+    trace_path = os.getenv("AUTOPILOT_TRACE", "").strip()
+    if not trace_path:
+        yield _NOOP_SPAN
+        return
+    parent = _SPAN.get()
+    parent_id = parent.span_id if parent else os.getenv("AUTOPILOT_TRACE_PARENT", "")
+    current = Span(name, kind, os.urandom(8).hex(), parent_id, attrs)
+    token = _SPAN.set(current)
+    started = time.time()
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    status = "ok"
+    try:
+        yield current
+    except BaseException as exc:
+        status = "error"
+        current.attrs.setdefault("error", f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        _SPAN.reset(token)
+        record = {
+            "span_id": current.span_id,
+            "parent_id": current.parent_id,
+            "name": name,
+            "kind": kind,
+            "status": status,
+            "start": round(started, 6),
+            "wall_seconds": round(time.perf_counter() - wall, 6),
+            "cpu_seconds": round(time.thread_time() - cpu, 6),
+            "bytes_in": current.bytes_in,
+            "bytes_out": current.bytes_out,
+            "retries": current.retries,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+            "attrs": current.attrs,
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with _TRACE_LOCK:
+            path = pathlib.Path(trace_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+
+
+@contextlib.contextmanager
+def profiled(name: str) -> Iterator[dict[str, Any]]:
+    """With ``AUTOPILOT_PROFILE_DIR`` set, cProfile the block and record its tracemalloc peak.
+
+    Writes ``<dir>/<name>.prof`` and yields a dict that is filled with the
+    profile path and ``tracemalloc_peak_bytes`` on exit (also set on the
+    current span). tracemalloc is process-wide, so peaks of steps running
+    concurrently include each other's allocations.
+    """
+    directory = os.getenv("AUTOPILOT_PROFILE_DIR", "").strip()
+    info: dict[str, Any] = {}
+    if not directory:
+        yield info
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler: cProfile.Profile | None = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is already active on this interpreter
+        profiler = None
+    try:
+        yield info
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            prof_path = ensure_dir(pathlib.Path(directory)) / f"{name}.prof"
+            profiler.dump_stats(str(prof_path))
+            info["cprofile"] = str(prof_path)
+        info["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        current_span().set(**info)
+
+
 def ensure_dir(path: pathlib.Path) -> pathlib.Path:
     path.mkdir(parents=True, exist_ok=True)
     return path
@@ -52,24 +244,36 @@ def parse_bool(value: str | bool) -> bool:
 
 
 def read_text(path: pathlib.Path) -> str:
-    return path.read_text(encoding="utf-8")
+    with span(f"read {path.name}", "file", path=str(path)) as current:
+        content = path.read_text(encoding="utf-8")
+        current.add(bytes_in=len(content))
+        return content
 
 
 def write_text(path: pathlib.Path, content: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
+    with span(f"write {path.name}", "file", path=str(path)) as current:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+        current.add(bytes_out=len(content))
 
 
 def load_json(path: pathlib.Path) -> dict[str, Any]:
-    with path.open("r", encoding="utf-8") as fh:
-        return json.load(fh)
+    with span(f"read {path.name}", "file", path=str(path)) as current:
+        with path.open("r", encoding="utf-8") as fh:
+            payload = json.load(fh)
+        if current.recording:
+            current.add(bytes_in=path.stat().st_size)
+        return payload
 
 
 def write_json(path: pathlib.Path, payload: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as fh:
-        json.dump(payload, fh, indent=2, ensure_ascii=False)
-        fh.write("\n")
+    with span(f"write {path.name}", "file", path=str(path)) as current:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as fh:
+            json.dump(payload, fh, indent=2, ensure_ascii=False)
+            fh.write("\n")
+        if current.recording:
+            current.add(bytes_out=path.stat().st_size)
 
 
 def env_required(names: list[str]) -> dict[str, str]:
@@ -91,18 +295,170 @@ def env_optional(name: str, default: str = "") -> str:
     return os.getenv(name, default).strip()
 
 
-def run_command(cmd: list[str], cwd: pathlib.Path | None = None) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(
-        cmd,
-        cwd=str(cwd or REPO_ROOT),
-        text=True,
-        capture_output=True,
-        check=False,
-        env=os.environ.copy(),
-    )
+def _children_cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class OutputTail:
+    """Last ``max_lines`` lines of a stream, also capped at ``max_bytes``; counts everything seen.
+
+    Text is appended in chunks that need not end at a newline: a chunk continues the previous line
+    until one does. A single line longer than ``max_bytes`` (``\r`` progress output) keeps its end.
+    """
+
+    def __init__(self, max_lines: int = COMMAND_TAIL_LINES, max_bytes: int = COMMAND_TAIL_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.lines: collections.deque[str] = collections.deque(maxlen=max_lines)
+        self.total_bytes = 0
+        self.total_lines = 0
+        self._bytes = 0
+        self._cut = False
+
+    def append(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.total_bytes += len(chunk.encode("utf-8"))
+        if self.lines and not self.lines[-1].endswith("\n"):
+            last = self.lines.pop()
+            self._bytes -= len(last.encode("utf-8"))
+            chunk = last + chunk
+        else:
+            self.total_lines += 1
+            if len(self.lines) == self.lines.maxlen:
+                self._bytes -= len(self.lines[0].encode("utf-8"))
+        encoded = chunk.encode("utf-8")
+        if len(encoded) > self.max_bytes:
+            encoded = encoded[-self.max_bytes :]
+            chunk = encoded.decode("utf-8", errors="ignore")
+            self._cut = True
+        self.lines.append(chunk)
+        self._bytes += len(chunk.encode("utf-8"))
+        while self._bytes > self.max_bytes and len(self.lines) > 1:
+            self._bytes -= len(self.lines.popleft().encode("utf-8"))
+
+    @property
+    def truncated(self) -> bool:
+        return self._cut or self.total_lines > len(self.lines)
+
+    def text(self) -> str:
+        return "".join(self.lines)
+
+
+class CommandResult:
+    """``run_command`` outcome: ``stdout``/``stderr`` hold only the bounded tails of each stream."""
+
+    def __init__(self, cmd: list[str], returncode: int, stdout: OutputTail, stderr: OutputTail, log: str) -> None:
+        self.args = cmd
+        self.returncode = returncode
+        self.stdout = stdout.text()
+        self.stderr = stderr.text()
+        self.log = log
+        self.output = {
+            name: {"bytes": tail.total_bytes, "lines": tail.total_lines, "truncated": tail.truncated}
+            for name, tail in (("stdout", stdout), ("stderr", stderr))
+        }
+
+    def record(self) -> dict[str, Any]:
+        """Report fields for this command: return code, tails, output sizes and the log path."""
+        record: dict[str, Any] = {"return_code": self.returncode, "stdout": self.stdout, "stderr": self.stderr}
+        record["output"] = self.output
+        if self.log:
+            record["log"] = self.log
+        return record
 
 
-def fail(message: str, details: dict[str, Any] | None = None, exit_code: int = 1) -> None:
+def parse_json_output(text: str) -> Any:
+    """Parse the JSON document a script printed last (``success``/``fail``); None when there is none."""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    # Pretty-printed documents start with an unindented brace; try the last one.
+    start = text.rfind("\n{")
+    if start < 0:
+        return None
+    try:
+        return json.loads(text[start + 1 :])
+    except ValueError:
+        return None
+
+
+def _pump(
+    stream: Any,
+    tail: OutputTail,
+    log: Any,
+    log_lock: threading.Lock,
+    prefix: bytes,
+) -> None:
+    # Bounded reads: output without newlines (``\r`` progress bars) must not be buffered whole.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    at_line_start = True
+    for raw in iter(functools.partial(stream.readline, COMMAND_TAIL_BYTES), b""):
+        if log is not None:
+            with log_lock:
+                log.write(prefix + raw if at_line_start else raw)
+        at_line_start = raw.endswith(b"\n")
+        tail.append(decoder.decode(raw))
+    rest = decoder.decode(b"", final=True)
+    if rest:
+        tail.append(rest)
+    stream.close()
+
+
+def run_command(
+    cmd: list[str],
+    cwd: pathlib.Path | None = None,
+    log_path: pathlib.Path | None = None,
+) -> CommandResult:
+    """Run ``cmd``, streaming its output to ``log_path`` (gzip) and keeping only bounded tails in memory.
+
+    stdout and stderr are drained on two threads as lines arrive; in the
+    log, stderr lines are prefixed with ``[stderr] `` so the interleaving
+    is kept.
+    """
+    with span(f"exec {pathlib.Path(cmd[0]).name}", "subprocess", command=cmd) as current:
+        env = os.environ.copy()
+        if current.recording:
+            env["AUTOPILOT_TRACE_PARENT"] = current.span_id
+        child_cpu = _children_cpu_seconds()
+        stdout, stderr = OutputTail(), OutputTail()
+        log_lock = threading.Lock()
+        with contextlib.ExitStack() as stack:
+            log = None
+            if log_path is not None:
+                ensure_dir(log_path.parent)
+                log = stack.enter_context(gzip.open(log_path, "wb"))
+            process = subprocess.Popen(
+                cmd,
+                cwd=str(cwd or REPO_ROOT),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+            )
+            pumps = [
+                threading.Thread(target=_pump, args=(process.stdout, stdout, log, log_lock, b""), daemon=True),
+                threading.Thread(target=_pump, args=(process.stderr, stderr, log, log_lock, b"[stderr] "), daemon=True),
+            ]
+            for pump in pumps:
+                pump.start()
+            for pump in pumps:
+                pump.join()
+            returncode = process.wait()
+        result = CommandResult(cmd, returncode, stdout, stderr, str(log_path) if log_path is not None else "")
+        # Children reaped concurrently by other threads are included in this delta.
+        current.set(return_code=returncode, child_cpu_seconds=round(_children_cpu_seconds() - child_cpu, 6))
+        current.add(bytes_in=stdout.total_bytes + stderr.total_bytes)
+        return result
+
+
+def fail(message: str, details: dict[str, Any] | None = None, exit_code: int = 1) -> NoReturn:
     payload: dict[str, Any] = {"ok": False, "error": message}
     if details:
         payload["details"] = details
@@ -115,7 +471,23 @@ def success(payload: dict[str, Any]) -> None:
     sys.stdout.write(json.dumps(out, indent=2, ensure_ascii=False) + "\n")
 
 
+def run_cli_step(step: Any, **kwargs: Any) -> dict[str, Any]:
+    """Call a step entry point from a script ``main``, turning ``StepError`` into ``fail``."""
+    # Scripts run as ``__main__``; name the span after the file instead.
+    name = pathlib.Path(getattr(sys.modules.get(step.__module__), "__file__", None) or "step").stem
+    try:
+        with span(name, "script"), profiled(name):
+            return step(**kwargs)
+    except StepError as exc:
+        fail(str(exc), exc.details or None, exit_code=exc.exit_code)
+
+
 def refresh_access_token() -> dict[str, Any]:
+    with span("oauth refresh", "oauth"):
+        return _refresh_access_token()
+
+
+def _refresh_access_token() -> dict[str, Any]:
     creds = env_required(
         ["GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "GOOGLE_REFRESH_TOKEN"]
     )
@@ -127,26 +499,227 @@ def refresh_access_token() -> dict[str, Any]:
             "grant_type": "refresh_token",
         }
     ).encode("utf-8")
-    req = urllib.request.Request(
-        "https://oauth2.googleapis.com/token",
-        method="POST",
-        data=body,
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-    )
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            token_payload = json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as exc:
-        content = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"OAuth token refresh failed: {exc.code} {content}") from exc
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"OAuth token refresh failed: {exc.reason}") from exc
+        status, _, content = http_request(
+            "POST",
+            "https://oauth2.googleapis.com/token",
+            body=body,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=30,
+        )
+    except OSError as exc:
+        raise RuntimeError(f"OAuth token refresh failed: {exc}") from exc
+    if status >= 400:
+        raise RuntimeError(f"OAuth token refresh failed: {status} {content.decode('utf-8', errors='replace')}")
+    token_payload = json.loads(content.decode("utf-8"))
 
     if "access_token" not in token_payload:
         raise RuntimeError(f"OAuth token refresh response missing access_token: {token_payload}")
     return token_payload
 
 
+_TOKEN_LOCK = threading.Lock()
+_TOKEN_STATE: dict[str, Any] = {}
+TOKEN_EXPIRY_MARGIN_SECONDS = 120
+
+
+@contextlib.contextmanager
+def file_lock(path: pathlib.Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``path`` (no-op where ``fcntl`` is unavailable)."""
+    ensure_dir(path.parent)
+    with path.open("a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def file_digest(path: pathlib.Path) -> str:
+    """SHA-256 of a file's bytes, or an empty string when it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return ""
+    return digest.hexdigest()
+
+
+def write_json_atomic(path: pathlib.Path, payload: dict[str, Any], mode: int | None = None) -> None:
+    """Write JSON via a temp file + rename so concurrent readers never see a partial file."""
+    ensure_dir(path.parent)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
+    if mode is not None:
+        os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def _token_cache_path(client_id: str, refresh_token: str) -> pathlib.Path:
+    scopes = env_optional("GOOGLE_OAUTH_SCOPES") or " ".join(OAUTH_SCOPES)
+    key_material = "\n".join([client_id, refresh_token, " ".join(sorted(scopes.split()))])
+    key = hashlib.sha256(key_material.encode("utf-8")).hexdigest()[:16]
+    return TOKENS_ROOT / f"access-token-{key}.json"
+
+
+def _cached_token(path: pathlib.Path) -> dict[str, Any] | None:
+    try:
+        cached = load_json(path)
+    except (OSError, ValueError):
+        return None
+    if cached.get("access_token") and time.time() < float(cached.get("expires_at", 0)) - TOKEN_EXPIRY_MARGIN_SECONDS:
+        return cached
+    return None
+
+
+def access_token() -> str:
+    """Return a bearer token, refreshing only when the cached one nears expiry.
+
+    Tokens are memoized in-process and cached under ``.tokens/`` keyed by
+    client ID, refresh token and scope set. A file lock makes concurrent
+    refreshes single-flight across threads and processes. Set
+    ``AUTOPILOT_TOKEN_CACHE=false`` to keep the cache in memory only.
+    """
+    with _TOKEN_LOCK:
+        if _TOKEN_STATE.get("access_token") and time.time() < _TOKEN_STATE["expires_at"] - TOKEN_EXPIRY_MARGIN_SECONDS:
+            return _TOKEN_STATE["access_token"]
+
+        creds = env_required(["GOOGLE_CLIENT_ID", "GOOGLE_REFRESH_TOKEN"])
+        tape = cassette.active()
+        use_disk = parse_bool(env_optional("AUTOPILOT_TOKEN_CACHE", "true"))
+        # Replayed tokens are fake; keep them out of the on-disk cache.
+        use_disk = use_disk and not (tape is not None and tape.mode == "replay")
+        cache_path = _token_cache_path(creds["GOOGLE_CLIENT_ID"], creds["GOOGLE_REFRESH_TOKEN"])
+
+        lock = file_lock(cache_path.with_suffix(".lock")) if use_disk else contextlib.nullcontext()
+        with lock:
+            cached = _cached_token(cache_path) if use_disk else None
+            if cached is None:
+                token_payload = refresh_access_token()
+                expires_in = float(token_payload.get("expires_in", 3600) or 3600)
+                cached = {
+                    "access_token": token_payload["access_token"],
+                    "expires_at": time.time() + expires_in,
+                    "scope": token_payload.get("scope", ""),
+                    "refreshed_at": utc_now_iso(),
+                }
+                if use_disk:
+                    write_json_atomic(cache_path, cached, mode=0o600)
+
+        _TOKEN_STATE.update(access_token=cached["access_token"], expires_at=float(cached["expires_at"]))
+        return cached["access_token"]
+
+
+def _api_url(url: str) -> str:
+    """Point ``*.googleapis.com`` URLs at ``AUTOPILOT_GOOGLE_API_BASE`` (e.g. a local stand-in) when set."""
+    base = env_optional("AUTOPILOT_GOOGLE_API_BASE")
+    if not base:
+        return url
+    parsed = urllib.parse.urlsplit(url)
+    if not (parsed.hostname or "").endswith(".googleapis.com"):
+        return url
+    return base.rstrip("/") + urllib.parse.urlunsplit(("", "", parsed.path, parsed.query, ""))
+
+
+def http_request(
+    method: str,
+    url: str,
+    *,
+    body: bytes | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 60,
+) -> tuple[int, dict[str, str], bytes]:
+    """Send a request over the shared keep-alive pool; returns ``(status, headers, body)``.
+
+    HTTP error statuses are returned, not raised; transport failures raise ``OSError``.
+    When ``AUTOPILOT_CASSETTE_MODE`` is ``record`` or ``replay`` the exchange
+    is written to, or served from, the active cassette.
+    """
+
+    def send() -> tuple[int, dict[str, str], bytes]:
+        try:
+            return http_pool.shared_pool().request(
+                method.upper(), _api_url(url), body=body, headers=headers, timeout=timeout
+            )
+        except http.client.HTTPException as exc:
+            raise OSError(f"{type(exc).__name__}: {exc}") from exc
+
+    parsed = urllib.parse.urlsplit(url)
+    with span(f"{method.upper()} {parsed.hostname}{parsed.path}", "http", method=method.upper(), url=url) as current:
+        current.add(bytes_out=len(body or b""))
+        tape = cassette.active()
+        if tape is None:
+            status, response_headers, content = send()
+        else:
+            status, response_headers, content = tape.request(method, url, body, send)
+        current.set(status=status)
+        current.add(bytes_in=len(content))
+        return status, response_headers, content
+
+
+def http_pool_stats() -> dict[str, Any]:
+    return http_pool.shared_pool().stats()
+
+
+http_stats_scope = http_pool.stats_scope
+
+
+def _limited_request(
+    api: str,
+    method: str,
+    url: str,
+    data: bytes | None,
+    headers: dict[str, str],
+) -> tuple[int, bytes]:
+    """Send through ``api``'s token bucket, retrying 429s (and, for read-only APIs, 5xx/transport errors)."""
+    limiter = rate_limit.shared_limiter()
+    retry_server_errors = method.upper() == "GET" or api in rate_limit.READ_ONLY_APIS
+    tape = cassette.active()
+    # Replayed traffic spends no real quota, and bucket waits would make replay timing non-deterministic;
+    # replayed 429s back off without jitter and never touch the bucket files real runs share.
+    paced = tape is None or tape.mode != "replay"
+    attempt = 0
+    throttled = 0.0
+    with span(f"api {api}", "api", api=api) as current:
+        while True:
+            if paced:
+                throttled += limiter.acquire(api)
+            current.set(throttled_seconds=round(throttled, 6))
+            try:
+                status, response_headers, content = http_request(method, url, body=data, headers=headers, timeout=60)
+            except OSError as exc:
+                if not retry_server_errors or attempt >= limiter.max_retries:
+                    raise RuntimeError(f"Google API request failed for {url}: {exc}") from exc
+                throttled += limiter.backoff(api, attempt, jitter=paced)
+                attempt += 1
+                current.add(retries=1)
+                continue
+            retryable = status == 429 or (retry_server_errors and status in rate_limit.RETRY_STATUSES)
+            if not retryable or attempt >= limiter.max_retries:
+                current.set(status=status)
+                return status, content
+            retry_after = rate_limit.retry_after_seconds(response_headers.get("retry-after"))
+            if status == 429:
+                block_seconds = retry_after if retry_after is not None else rate_limit.backoff_seconds(attempt)
+                limiter.block(api, block_seconds, shared=paced)
+            throttled += limiter.backoff(api, attempt, retry_after, jitter=paced)
+            attempt += 1
+            current.add(retries=1)
+
+
+def rate_limit_stats() -> dict[str, Any]:
+    return rate_limit.shared_limiter().stats()
+
+
+rate_limit_scope = rate_limit.stats_scope
+
+
 def google_api_request(
     url: str,
     *,
@@ -163,19 +736,52 @@ def google_api_request(
         data = json.dumps(payload).encode("utf-8")
         headers["Content-Type"] = "application/json"
 
-    req = urllib.request.Request(url, method=method.upper(), data=data, headers=headers)
-
+    api = rate_limit.api_for_url(url)
+    if api is None:
+        try:
+            status, _, content = http_request(method, url, body=data, headers=headers, timeout=60)
+        except OSError as exc:
+            raise RuntimeError(f"Google API request failed for {url}: {exc}") from exc
+    else:
+        status, content = _limited_request(api, method, url, data, headers)
+    if status >= 400:
+        raise RuntimeError(
+            f"Google API request failed ({status}) for {url}: {content.decode('utf-8', errors='replace')}"
+        )
+    if not content:
+        return {}
+    return json.loads(content.decode("utf-8"))
+
+
+def fetch_concurrency() -> int:
+    raw = env_optional("AUTOPILOT_FETCH_CONCURRENCY", str(DEFAULT_FETCH_CONCURRENCY))
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            body = resp.read().decode("utf-8")
-            if not body:
-                return {}
-            return json.loads(body)
-    except urllib.error.HTTPError as exc:
-        content = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Google API request failed ({exc.code}) for {url}: {content}") from exc
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"Google API request failed for {url}: {exc.reason}") from exc
+        return max(int(raw), 1)
+    except ValueError:
+        return DEFAULT_FETCH_CONCURRENCY
+
+
+def run_concurrently(tasks: dict[str, Callable[[], T]], max_workers: int | None = None) -> dict[str, T]:
+    """Run named zero-argument callables on a bounded thread pool and merge their results.
+
+    Every task runs to completion; if any raised, a single
+    ``ConcurrentRequestError`` reports the reason per failed task name.
+    """
+    if not tasks:
+        return {}
+    workers = min(max_workers or fetch_concurrency(), len(tasks))
+    results: dict[str, T] = {}
+    errors: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+        futures = {name: pool.submit(contextvars.copy_context().run, task) for name, task in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as exc:  # noqa: BLE001
+                errors[name] = str(exc)
+    if errors:
+        raise ConcurrentRequestError(errors, sorted(results))
+    return results
 
 
 def validate_whitelist(paths: list[pathlib.Path]) -> None:
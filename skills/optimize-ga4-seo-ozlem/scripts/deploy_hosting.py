@@ -5,30 +5,95 @@ from __future__ import annotations
 
 import argparse
 import pathlib
+import time
 from typing import Any
 
-from common import REPO_ROOT, RUNS_ROOT, env_optional, fail, parse_bool, run_command, success, utc_now_iso, write_json
+import build_cache
+from common import (
+    REPO_ROOT,
+    RUNS_ROOT,
+    CommandResult,
+    StepError,
+    env_optional,
+    parse_bool,
+    run_cli_step,
+    run_command,
+    success,
+    utc_now_iso,
+    write_json,
+)
 
 
-def _record_step(name: str, result: Any) -> dict[str, Any]:
-    return {
-        "step": name,
-        "return_code": result.returncode,
-        "stdout": result.stdout,
-        "stderr": result.stderr,
-    }
+def _record_step(name: str, result: CommandResult) -> dict[str, Any]:
+    return {"step": name, **result.record()}
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Build + deploy Firebase hosting")
-    parser.add_argument("--run-id", required=True)
-    parser.add_argument("--output", default="")
-    parser.add_argument("--dry-run", default="false")
-    args = parser.parse_args()
+def _output_path(run_id: str, output: str) -> pathlib.Path:
+    return pathlib.Path(output).resolve() if output else RUNS_ROOT / run_id / "deploy-report.json"
 
-    dry_run = parse_bool(args.dry_run)
-    run_dir = RUNS_ROOT / args.run_id
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "deploy-report.json"
+
+def _build(report: dict[str, Any], log_dir: pathlib.Path, output_path: pathlib.Path, input_hash: str) -> None:
+    """Restore the cached build for unchanged inputs, otherwise run ``npm run build`` and cache its output."""
+    cache = build_cache.BuildCache.from_env()
+    dist = build_cache.dist_dir()
+    cached = cache.restore(input_hash, dist) if cache.enabled else None
+    if cached is not None:
+        report["steps"].append(
+            {
+                "step": "build",
+                "return_code": 0,
+                "stdout": f"Restored {dist} from the build cache ({cached['dist_digest'][:12]}).",
+                "stderr": "",
+            }
+        )
+        report["build_cache"] = {"enabled": True, "hit": True, **cached}
+    else:
+        started = time.monotonic()
+        build = run_command(["npm", "run", "build"], cwd=REPO_ROOT, log_path=log_dir / "build.log.gz")
+        build_seconds = time.monotonic() - started
+        report["steps"].append(_record_step("build", build))
+        report["build_cache"] = {
+            "enabled": cache.enabled,
+            "hit": False,
+            "build_seconds": round(build_seconds, 3),
+        }
+        if build.returncode != 0:
+            write_json(output_path, report)
+            raise StepError("Build failed during deploy pipeline.", {"report": str(output_path)})
+        if cache.enabled:
+            report["build_cache"].update(cache.store(input_hash, dist, build_seconds))
+    if cache.enabled:
+        report["build_cache"]["totals"] = cache.stats()
+
+
+def _skip(report: dict[str, Any], output_path: pathlib.Path, reason: str, detail: str) -> dict[str, Any]:
+    report["skipped"] = {"reason": reason, "detail": detail}
+    report["steps"].append(
+        {"step": "firebase_deploy", "return_code": 0, "skipped": True, "stdout": detail, "stderr": ""}
+    )
+    write_json(output_path, report)
+    return report
+
+
+def run_step(
+    *,
+    run_id: str,
+    output: str = "",
+    dry_run: str | bool = False,
+    snapshot: str = "",
+    force: str | bool = False,
+) -> dict[str, Any]:
+    """Build and deploy hosting (unless dry-run) and return the deploy report.
+
+    With ``snapshot`` (a deploy snapshot digest) the stored tree is deployed
+    as-is and nothing is built. Otherwise the deploy is skipped, unless
+    ``force``, when the build inputs or the built tree, together with
+    ``firebase.json``/``.firebaserc``, match the live snapshot; ``skipped``
+    in the report says why.
+    """
+    force = parse_bool(force)
+    dry_run = parse_bool(dry_run)
+    output_path = _output_path(run_id, output)
 
     project_id = env_optional("FIREBASE_PROJECT_ID")
     deploy_cmd = ["firebase", "deploy", "--only", "hosting"]
@@ -36,7 +101,7 @@ def main() -> None:
         deploy_cmd.extend(["--project", project_id])
 
     report: dict[str, Any] = {
-        "run_id": args.run_id,
+        "run_id": run_id,
         "generated_at": utc_now_iso(),
         "dry_run": dry_run,
         "project_id": project_id,
@@ -53,23 +118,86 @@ def main() -> None:
             }
         )
         write_json(output_path, report)
-        success({"run_id": args.run_id, "deploy_report": str(output_path), "dry_run": True})
-        return
-
-    build = run_command(["npm", "run", "build"], cwd=REPO_ROOT)
-    report["steps"].append(_record_step("build", build))
-    if build.returncode != 0:
-        write_json(output_path, report)
-        fail("Build failed during deploy pipeline.", {"report": str(output_path)})
-
-    deploy = run_command(deploy_cmd, cwd=REPO_ROOT)
+        return report
+
+    log_dir = RUNS_ROOT / run_id / "logs"
+    snapshots = build_cache.DeploySnapshots.from_env()
+    dist = build_cache.dist_dir()
+    live = snapshots.live()
+    report["previous_snapshot"] = live
+    input_hash = ""
+    digest = snapshot
+    # firebase.json (headers, rewrites, redirects) ships with the tree, so a config-only change still deploys.
+    config_hash = build_cache.config_digest()
+    report["config_hash"] = config_hash
+    config_unchanged = live.get("config_hash") == config_hash
+    if snapshot:
+        if not snapshots.has(snapshot):
+            write_json(output_path, report)
+            raise StepError("Deploy snapshot not found.", {"snapshot": snapshot, "report": str(output_path)})
+        restore_seconds = snapshots.restore(snapshot, dist)
+        report["steps"].append(
+            {
+                "step": "restore_snapshot",
+                "return_code": 0,
+                "stdout": f"Restored {dist} from deploy snapshot {snapshot[:12]} in {restore_seconds:.3f}s.",
+                "stderr": "",
+            }
+        )
+    else:
+        input_hash = build_cache.input_digest()
+        report["input_hash"] = input_hash
+        if not force and config_unchanged and live.get("input_hash") == input_hash:
+            detail = (
+                f"Build inputs and hosting config match the live deploy {live['digest'][:12]}; "
+                "nothing to build or upload."
+            )
+            return _skip(report, output_path, "inputs_unchanged", detail)
+        _build(report, log_dir, output_path, input_hash)
+        digest = report["build_cache"].get("dist_digest") or build_cache.tree_digest(dist)
+        report["dist_digest"] = digest
+        if not force and config_unchanged and live.get("digest") == digest:
+            detail = f"Built tree and hosting config match the live deploy {digest[:12]}."
+            return _skip(report, output_path, "dist_unchanged", detail)
+
+    deploy = run_command(deploy_cmd, cwd=REPO_ROOT, log_path=log_dir / "firebase-deploy.log.gz")
     report["steps"].append(_record_step("firebase_deploy", deploy))
     if deploy.returncode != 0:
         write_json(output_path, report)
-        fail("Firebase deploy failed.", {"report": str(output_path)})
+        raise StepError("Firebase deploy failed.", {"report": str(output_path)})
 
+    cache = build_cache.BuildCache.from_env()
+    report["snapshot"] = snapshots.record(
+        dist, run_id, digest, reuse=cache.archive_path(digest), input_hash=input_hash, config_hash=config_hash
+    )
     write_json(output_path, report)
-    success({"run_id": args.run_id, "deploy_report": str(output_path), "dry_run": False})
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build + deploy Firebase hosting")
+    parser.add_argument("--run-id", required=True)
+    parser.add_argument("--output", default="")
+    parser.add_argument("--dry-run", default="false")
+    parser.add_argument("--snapshot", default="", help="Deploy this stored snapshot digest instead of building.")
+    parser.add_argument("--force", default="false", help="Deploy even when nothing changed since the live deploy.")
+    args = parser.parse_args()
+
+    report = run_cli_step(
+        run_step,
+        run_id=args.run_id,
+        output=args.output,
+        dry_run=args.dry_run,
+        snapshot=args.snapshot,
+        force=args.force,
+    )
+    success(
+        {
+            "run_id": args.run_id,
+            "deploy_report": str(_output_path(args.run_id, args.output)),
+            "dry_run": report["dry_run"],
+        }
+    )
 
 
 if __name__ == "__main__":
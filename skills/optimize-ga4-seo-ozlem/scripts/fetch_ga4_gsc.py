@@ -4,21 +4,64 @@
 from __future__ import annotations
 
 import argparse
+import datetime as dt
+import functools
+import gzip
+import heapq
+import json
 import pathlib
-from typing import Any
+from typing import Any, Callable, Iterator
 
 from common import (
     RUNS_ROOT,
+    ConcurrentRequestError,
+    StepError,
+    access_token,
     date_window,
+    ensure_dir,
     env_required,
-    fail,
     google_api_request,
     make_run_id,
-    refresh_access_token,
+    parse_bool,
+    run_cli_step,
+    run_concurrently,
     success,
     utc_now_iso,
     write_json,
 )
+from analytics_store import AnalyticsStore, ga4_date
+from gsc_shards import fetch_sharded
+from response_cache import ResponseCache
+
+SESSION_METRICS = [
+    {"name": "sessions"},
+    {"name": "totalUsers"},
+    {"name": "newUsers"},
+    {"name": "engagedSessions"},
+    {"name": "engagementRate"},
+]
+
+APPOINTMENT_EVENTS = ["phone_click", "whatsapp_click", "form_submit", "contact_click"]
+
+GSC_PAGE_SIZE = 25000
+
+# batchRunReports accepts up to five report requests per call.
+GA4_BATCH_LIMIT = 5
+
+EVENT_FILTER = {"filter": {"fieldName": "eventName", "inListFilter": {"values": APPOINTMENT_EVENTS}}}
+
+
+def _ga4_reports(date_ranges: list[dict[str, str]]) -> dict[str, dict[str, Any]]:
+    """GA4 report definitions for a run; all of them go out in one batchRunReports call."""
+    return {
+        "ga4_sessions": {"dateRanges": date_ranges, "metrics": SESSION_METRICS},
+        "ga4_events": {
+            "dateRanges": date_ranges,
+            "dimensions": [{"name": "eventName"}],
+            "metrics": [{"name": "eventCount"}],
+            "dimensionFilter": EVENT_FILTER,
+        },
+    }
 
 
 def _metric_value(row: dict[str, Any], index: int = 0, default: float = 0.0) -> float:
@@ -31,41 +74,331 @@ def _metric_value(row: dict[str, Any], index: int = 0, default: float = 0.0) ->
         return default
 
 
-def _run_ga4_report(property_id: str, token: str, payload: dict[str, Any]) -> dict[str, Any]:
-    url = f"https://analyticsdata.googleapis.com/v1beta/properties/{property_id}:runReport"
-    return google_api_request(url, method="POST", token=token, payload=payload)
-
-
-def _query_gsc(site_url: str, token: str, payload: dict[str, Any]) -> dict[str, Any]:
+def _run_ga4_batch(
+    property_id: str,
+    token: str,
+    reports: dict[str, dict[str, Any]],
+    cache: ResponseCache | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Send named GA4 report requests through ``batchRunReports`` and return responses by name.
+
+    The API answers in request order and accepts at most ``GA4_BATCH_LIMIT``
+    requests per call, so larger sets are split into consecutive batches.
+    """
+    url = f"https://analyticsdata.googleapis.com/v1beta/properties/{property_id}:batchRunReports"
+    names = list(reports)
+    responses: dict[str, dict[str, Any]] = {}
+    for offset in range(0, len(names), GA4_BATCH_LIMIT):
+        chunk = names[offset : offset + GA4_BATCH_LIMIT]
+        payload = {"requests": [reports[name] for name in chunk]}
+        fetch = functools.partial(google_api_request, url, method="POST", token=token, payload=payload)
+        result = fetch() if cache is None else cache.get_or_fetch(f"ga4:{property_id}", payload, fetch)
+        batch = result.get("reports", [])
+        if len(batch) != len(chunk):
+            raise RuntimeError(f"GA4 batchRunReports returned {len(batch)} reports for {len(chunk)} requests.")
+        responses.update(zip(chunk, batch))
+    return responses
+
+
+def _query_gsc(
+    site_url: str,
+    token: str,
+    payload: dict[str, Any],
+    cache: ResponseCache | None = None,
+) -> dict[str, Any]:
     encoded = site_url if site_url.endswith("/") else f"{site_url}/"
     encoded = encoded.replace("://", "%3A%2F%2F").replace("/", "%2F")
     url = f"https://searchconsole.googleapis.com/webmasters/v3/sites/{encoded}/searchAnalytics/query"
-    return google_api_request(url, method="POST", token=token, payload=payload)
+    fetch = functools.partial(google_api_request, url, method="POST", token=token, payload=payload)
+    if cache is None:
+        return fetch()
+    return cache.get_or_fetch(f"gsc:{site_url}", payload, fetch)
+
+
+def _gsc_value(row: dict[str, Any], name: str) -> float:
+    try:
+        return float(row.get(name, 0.0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _gsc_row(row: dict[str, Any]) -> dict[str, Any]:
+    # Search Console returns clicks/impressions/ctr/position as top-level row fields.
+    return {
+        "keys": row.get("keys", []),
+        "clicks": _gsc_value(row, "clicks"),
+        "impressions": _gsc_value(row, "impressions"),
+        "ctr": _gsc_value(row, "ctr"),
+        "position": _gsc_value(row, "position"),
+    }
 
 
 def _extract_rows(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    extracted: list[dict[str, Any]] = []
-    for row in rows:
-        extracted.append(
-            {
-                "keys": row.get("keys", []),
-                "clicks": _metric_value(row, 0),
-                "impressions": _metric_value(row, 1),
-                "ctr": _metric_value(row, 2),
-                "position": _metric_value(row, 3),
-            }
-        )
-    return extracted
+    return [_gsc_row(row) for row in rows]
+
+
+def _iter_gsc_rows(
+    site_url: str,
+    token: str,
+    payload: dict[str, Any],
+    page_size: int = GSC_PAGE_SIZE,
+) -> Iterator[list[dict[str, Any]]]:
+    """Yield GSC result pages, walking ``startRow`` until a short page ends the result set."""
+    start_row = 0
+    while True:
+        response = _query_gsc(site_url, token, {**payload, "rowLimit": page_size, "startRow": start_row})
+        rows = response.get("rows", [])
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        start_row += len(rows)
+
+
+def _gsc_rows(site_url: str, token: str, payload: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    for page in _iter_gsc_rows(site_url, token, payload):
+        yield from map(_gsc_row, page)
+
+
+def _stream_gsc(
+    site_url: str,
+    token: str,
+    payload: dict[str, Any],
+    path: pathlib.Path,
+    top_n: int = 25,
+) -> dict[str, Any]:
+    """Stream every GSC row for ``payload`` to gzipped JSONL and return a bounded summary.
+
+    Only one result page and the running top ``top_n`` rows (by clicks, then
+    impressions) are held in memory, whatever the total row count.
+    """
+    ensure_dir(path.parent)
+    top: list[tuple[float, float, int, dict[str, Any]]] = []
+    summary = {"path": str(path), "rows": 0, "pages": 0, "clicks": 0.0, "impressions": 0.0}
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        for page in _iter_gsc_rows(site_url, token, payload):
+            summary["pages"] += 1
+            for raw in page:
+                row = _gsc_row(raw)
+                fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                summary["rows"] += 1
+                summary["clicks"] += row["clicks"]
+                summary["impressions"] += row["impressions"]
+                item = (row["clicks"], row["impressions"], -summary["rows"], row)
+                if len(top) < top_n:
+                    heapq.heappush(top, item)
+                elif item[:3] > top[0][:3]:
+                    heapq.heapreplace(top, item)
+    summary["top"] = [item[3] for item in sorted(top, key=lambda item: item[:3], reverse=True)]
+    return summary
+
+
+def _report_tasks(
+    env: dict[str, str],
+    token: str,
+    start_date: str,
+    end_date: str,
+    cache: ResponseCache | None = None,
+) -> dict[str, Callable[[], dict[str, Any]]]:
+    """Name every GA4/GSC fetch this run needs; they are fetched concurrently.
+
+    GA4 reports share a single ``ga4`` task whose result maps report names to
+    responses.
+    """
+    date_ranges = [{"startDate": start_date, "endDate": end_date}]
+    gsc = functools.partial(_query_gsc, env["GSC_SITE_URL"], token, cache=cache)
+    return {
+        "ga4": functools.partial(
+            _run_ga4_batch, env["GA4_PROPERTY_ID"], token, _ga4_reports(date_ranges), cache=cache
+        ),
+        "gsc_queries": functools.partial(
+            gsc,
+            {"startDate": start_date, "endDate": end_date, "dimensions": ["query"], "rowLimit": 25},
+        ),
+        "gsc_pages": functools.partial(
+            gsc,
+            {"startDate": start_date, "endDate": end_date, "dimensions": ["page"], "rowLimit": 25},
+        ),
+    }
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Fetch GA4 + GSC and write analysis JSON.")
-    parser.add_argument("--window", choices=["28d", "90d"], default="28d")
-    parser.add_argument("--run-id", default="")
-    parser.add_argument("--output", default="")
-    parser.add_argument("--goal", default="appointment_conversion")
-    args = parser.parse_args()
+def _session_metrics(response: dict[str, Any]) -> dict[str, float]:
+    session_row = (response.get("rows") or [{}])[0]
+    return {
+        "sessions": _metric_value(session_row, 0, 0),
+        "total_users": _metric_value(session_row, 1, 0),
+        "new_users": _metric_value(session_row, 2, 0),
+        "engaged_sessions": _metric_value(session_row, 3, 0),
+        "engagement_rate": _metric_value(session_row, 4, 0.0),
+    }
+
+
+def _event_totals(response: dict[str, Any]) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for row in response.get("rows", []):
+        keys = row.get("dimensionValues", [])
+        if keys:
+            totals[keys[0].get("value", "")] = _metric_value(row, 0, 0)
+    return totals
+
 
+def _collect_gsc_pages(site_url: str, token: str, payload: dict[str, Any]) -> dict[str, Any]:
+    return {"rows": [row for page in _iter_gsc_rows(site_url, token, payload) for row in page]}
+
+
+def _fetch_incremental(
+    env: dict[str, str],
+    token: str,
+    start_date: str,
+    end_date: str,
+) -> tuple[dict[str, float], dict[str, float], list[dict[str, Any]], list[dict[str, Any]], dict[str, Any]]:
+    """Fetch only missing or provisional days into the local store, then aggregate the window from it."""
+    property_id = env["GA4_PROPERTY_ID"]
+    site_url = env["GSC_SITE_URL"]
+    store = AnalyticsStore()
+    try:
+        gaps = {
+            "ga4_sessions": store.missing_ranges("ga4_sessions", property_id, start_date, end_date),
+            "ga4_events": store.missing_ranges("ga4_events", property_id, start_date, end_date),
+            "gsc_query": store.missing_ranges("gsc_query", site_url, start_date, end_date),
+            "gsc_page": store.missing_ranges("gsc_page", site_url, start_date, end_date),
+        }
+
+        tasks: dict[str, Callable[[], dict[str, Any]]] = {}
+        ga4_reports: dict[str, dict[str, Any]] = {}
+        for source, ranges in gaps.items():
+            for start, end in ranges:
+                name = f"{source}|{start}|{end}"
+                date_ranges = [{"startDate": start, "endDate": end}]
+                if source == "ga4_sessions":
+                    ga4_reports[name] = {
+                        "dateRanges": date_ranges,
+                        "dimensions": [{"name": "date"}],
+                        "metrics": SESSION_METRICS[:4],
+                        "limit": 100000,
+                    }
+                elif source == "ga4_events":
+                    ga4_reports[name] = {
+                        "dateRanges": date_ranges,
+                        "dimensions": [{"name": "date"}, {"name": "eventName"}],
+                        "metrics": [{"name": "eventCount"}],
+                        "dimensionFilter": EVENT_FILTER,
+                        "limit": 100000,
+                    }
+                else:
+                    dimension = source.split("_", 1)[1]
+                    payload = {"startDate": start, "endDate": end, "dimensions": ["date", dimension]}
+                    tasks[name] = functools.partial(_collect_gsc_pages, site_url, token, payload)
+        # Users are not additive across days, so they come from one window-level report in the same batch.
+        ga4_reports["ga4_users"] = {
+            "dateRanges": [{"startDate": start_date, "endDate": end_date}],
+            "metrics": [{"name": "totalUsers"}, {"name": "newUsers"}],
+        }
+        tasks["ga4"] = functools.partial(_run_ga4_batch, property_id, token, ga4_reports)
+
+        responses = run_concurrently(tasks)
+        responses.update(responses.pop("ga4"))
+        users_row = (responses.pop("ga4_users").get("rows") or [{}])[0]
+        for name, response in responses.items():
+            source, start, end = name.split("|")
+            rows = response.get("rows", [])
+            if source == "ga4_sessions":
+                store.record_ga4_sessions(
+                    property_id,
+                    start,
+                    end,
+                    [
+                        (ga4_date(row["dimensionValues"][0]["value"]), *(_metric_value(row, i) for i in range(4)))
+                        for row in rows
+                    ],
+                )
+            elif source == "ga4_events":
+                store.record_ga4_events(
+                    property_id,
+                    start,
+                    end,
+                    [
+                        (
+                            ga4_date(row["dimensionValues"][0]["value"]),
+                            row["dimensionValues"][1]["value"],
+                            _metric_value(row, 0),
+                        )
+                        for row in rows
+                    ],
+                )
+            else:
+                store.record_gsc(
+                    site_url,
+                    source.split("_", 1)[1],
+                    start,
+                    end,
+                    [
+                        {
+                            "date": row["keys"][0],
+                            "key": row["keys"][1],
+                            "clicks": float(row.get("clicks", 0)),
+                            "impressions": float(row.get("impressions", 0)),
+                            "position": float(row.get("position", 0)),
+                        }
+                        for row in rows
+                    ],
+                )
+
+        fetched_days = sum(
+            (dt.date.fromisoformat(end) - dt.date.fromisoformat(start)).days + 1
+            for ranges in gaps.values()
+            for start, end in ranges
+        )
+        window_days = (dt.date.fromisoformat(end_date) - dt.date.fromisoformat(start_date)).days + 1
+        store_info = {
+            "path": str(store.path),
+            "fetched_ranges": {source: [list(item) for item in ranges] for source, ranges in gaps.items()},
+            "fetched_days": fetched_days,
+            "reused_days": window_days * len(gaps) - fetched_days,
+            "requests": len(tasks),
+        }
+        metrics = {
+            **store.ga4_totals(property_id, start_date, end_date),
+            "total_users": _metric_value(users_row, 0, 0),
+            "new_users": _metric_value(users_row, 1, 0),
+        }
+        return (
+            metrics,
+            store.event_counts(property_id, start_date, end_date),
+            store.gsc_top(site_url, "query", start_date, end_date),
+            store.gsc_top(site_url, "page", start_date, end_date),
+            store_info,
+        )
+    finally:
+        store.close()
+
+
+def _output_path(run_id: str, output: str) -> pathlib.Path:
+    return pathlib.Path(output).resolve() if output else RUNS_ROOT / run_id / "analysis.json"
+
+
+def run_step(
+    *,
+    window: str = "28d",
+    run_id: str = "",
+    output: str = "",
+    goal: str = "appointment_conversion",
+    incremental: str | bool = False,
+    gsc_paginate: str | bool = False,
+    gsc_shards: str | bool = False,
+) -> dict[str, Any]:
+    """Fetch GA4 + GSC data, write analysis.json and return the analysis payload.
+
+    With ``incremental`` the window is aggregated from the day-partitioned
+    analytics store and only missing or provisional days are fetched. With
+    ``gsc_paginate`` every GSC query/page row is streamed to
+    ``gsc-<dimension>.jsonl.gz`` in the run directory and analysis.json keeps
+    the top rows, totals and a pointer to the artifact. ``gsc_shards``
+    produces the same artifacts from day x device x country shards, which
+    recovers long-tail rows a single request truncates; finished shards are
+    checkpointed so rerunning with the same run ID resumes. ``incremental``
+    cannot be combined with either GSC option.
+    """
     try:
         env = env_required(
             [
@@ -80,96 +413,75 @@ def main() -> None:
             ]
         )
     except RuntimeError as exc:
-        fail(str(exc))
-
-    run_id = args.run_id.strip() or make_run_id()
-    run_dir = RUNS_ROOT / run_id
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "analysis.json"
-
-    try:
-        token_payload = refresh_access_token()
-        token = token_payload["access_token"]
-
-        start_date, end_date = date_window(args.window)
-
-        ga4_sessions = _run_ga4_report(
-            env["GA4_PROPERTY_ID"],
-            token,
-            {
-                "dateRanges": [{"startDate": start_date, "endDate": end_date}],
-                "metrics": [
-                    {"name": "sessions"},
-                    {"name": "totalUsers"},
-                    {"name": "newUsers"},
-                    {"name": "engagedSessions"},
-                    {"name": "engagementRate"},
-                ],
-            },
-        )
-
-        ga4_events = _run_ga4_report(
-            env["GA4_PROPERTY_ID"],
-            token,
-            {
-                "dateRanges": [{"startDate": start_date, "endDate": end_date}],
-                "dimensions": [{"name": "eventName"}],
-                "metrics": [{"name": "eventCount"}],
-                "dimensionFilter": {
-                    "filter": {
-                        "fieldName": "eventName",
-                        "inListFilter": {
-                            "values": [
-                                "phone_click",
-                                "whatsapp_click",
-                                "form_submit",
-                                "contact_click",
-                            ]
-                        },
-                    }
-                },
-            },
-        )
-
-        gsc_queries = _query_gsc(
-            env["GSC_SITE_URL"],
-            token,
-            {
-                "startDate": start_date,
-                "endDate": end_date,
-                "dimensions": ["query"],
-                "rowLimit": 25,
-            },
-        )
-
-        gsc_pages = _query_gsc(
-            env["GSC_SITE_URL"],
-            token,
-            {
-                "startDate": start_date,
-                "endDate": end_date,
-                "dimensions": ["page"],
-                "rowLimit": 25,
-            },
+        raise StepError(str(exc)) from exc
+
+    run_id = run_id.strip() or make_run_id()
+    output_path = _output_path(run_id, output)
+    cache = ResponseCache.from_env()
+    incremental = parse_bool(incremental)
+    gsc_paginate = parse_bool(gsc_paginate)
+    gsc_shards = parse_bool(gsc_shards)
+    if incremental and (gsc_paginate or gsc_shards):
+        raise StepError(
+            "--incremental reads GSC rows from the analytics store and writes no gsc-*.jsonl.gz artifacts.",
+            {"hint": "Drop --gsc-paginate/--gsc-shards, or run without --incremental."},
         )
+    store_info: dict[str, Any] | None = None
+    gsc_artifacts: dict[str, Any] = {}
 
+    try:
+        token = access_token()
+
+        start_date, end_date = date_window(window)
+
+        if incremental:
+            metrics, raw_events, query_rows, page_rows, store_info = _fetch_incremental(
+                env, token, start_date, end_date
+            )
+        else:
+            tasks = _report_tasks(env, token, start_date, end_date, cache)
+            for name, dimension in (("gsc_queries", "query"), ("gsc_pages", "page")):
+                if gsc_shards:
+                    tasks[name] = functools.partial(
+                        fetch_sharded,
+                        dimension,
+                        start_date,
+                        end_date,
+                        functools.partial(_gsc_rows, env["GSC_SITE_URL"], token),
+                        output_path.parent,
+                    )
+                elif gsc_paginate:
+                    tasks[name] = functools.partial(
+                        _stream_gsc,
+                        env["GSC_SITE_URL"],
+                        token,
+                        {"startDate": start_date, "endDate": end_date, "dimensions": [dimension]},
+                        output_path.parent / f"gsc-{dimension}.jsonl.gz",
+                    )
+            responses = run_concurrently(tasks)
+            responses.update(responses.pop("ga4"))
+            metrics = _session_metrics(responses["ga4_sessions"])
+            raw_events = _event_totals(responses["ga4_events"])
+            if gsc_shards or gsc_paginate:
+                query_rows = responses["gsc_queries"].pop("top")
+                page_rows = responses["gsc_pages"].pop("top")
+                gsc_artifacts = {"query": responses["gsc_queries"], "page": responses["gsc_pages"]}
+            else:
+                query_rows = _extract_rows(responses["gsc_queries"].get("rows", []))
+                page_rows = _extract_rows(responses["gsc_pages"].get("rows", []))
+
+    except ConcurrentRequestError as exc:
+        raise StepError("Failed to fetch GA4/GSC data.", {"reason": str(exc), "errors": exc.errors}) from exc
     except Exception as exc:  # noqa: BLE001
-        fail("Failed to fetch GA4/GSC data.", {"reason": str(exc)})
+        raise StepError("Failed to fetch GA4/GSC data.", {"reason": str(exc)}) from exc
 
-    session_row = (ga4_sessions.get("rows") or [{}])[0]
-    sessions = int(_metric_value(session_row, 0, 0))
-    total_users = int(_metric_value(session_row, 1, 0))
-    new_users = int(_metric_value(session_row, 2, 0))
-    engaged_sessions = int(_metric_value(session_row, 3, 0))
-    engagement_rate = _metric_value(session_row, 4, 0.0)
+    sessions = int(metrics["sessions"])
+    total_users = int(metrics["total_users"])
+    new_users = int(metrics["new_users"])
+    engaged_sessions = int(metrics["engaged_sessions"])
+    engagement_rate = metrics["engagement_rate"]
 
-    event_counts: dict[str, int] = {"phone_click": 0, "whatsapp_click": 0, "form_submit": 0, "contact_click": 0}
-    for row in ga4_events.get("rows", []):
-        keys = row.get("dimensionValues", [])
-        if not keys:
-            continue
-        name = keys[0].get("value", "")
-        if name in event_counts:
-            event_counts[name] = int(_metric_value(row, 0, 0))
+    event_counts: dict[str, int] = {name: int(raw_events.get(name, 0)) for name in APPOINTMENT_EVENTS}
 
     # KPI contract: appointment_conversion_rate = (phone_click + whatsapp_click + form_submit) / sessions
     appointment_events = (
@@ -182,26 +494,23 @@ def main() -> None:
 
     appointment_conversion_rate = round(appointment_events / sessions, 6) if sessions > 0 else 0.0
 
-    query_rows = _extract_rows(gsc_queries.get("rows", []))
-    page_rows = _extract_rows(gsc_pages.get("rows", []))
-
     top_queries = [row["keys"][0] for row in query_rows[:10] if row.get("keys")]
     top_pages = [row["keys"][0] for row in page_rows[:10] if row.get("keys")]
 
     tr_summary = (
-        f"Son {args.window} donemde GA4 oturum: {sessions}, randevu olaylari: {appointment_events}, "
+        f"Son {window} donemde GA4 oturum: {sessions}, randevu olaylari: {appointment_events}, "
         f"donusum orani: {appointment_conversion_rate:.2%}. Search Console en iyi sorgulari ve sayfalari toplandi."
     )
     en_summary = (
-        f"For the last {args.window}, GA4 sessions: {sessions}, appointment events: {appointment_events}, "
+        f"For the last {window}, GA4 sessions: {sessions}, appointment events: {appointment_events}, "
         f"conversion rate: {appointment_conversion_rate:.2%}. Top Search Console queries and pages were collected."
     )
 
     analysis = {
         "run_id": run_id,
         "generated_at": utc_now_iso(),
-        "window": args.window,
-        "goal": args.goal,
+        "window": window,
+        "goal": goal,
         "summary": {"tr": tr_summary, "en": en_summary},
         "ga4": {
             "property_id": env["GA4_PROPERTY_ID"],
@@ -219,16 +528,49 @@ def main() -> None:
             "top_pages": top_pages,
             "queries": query_rows,
             "pages": page_rows,
+            "artifacts": gsc_artifacts,
         },
         "kpi": {
             "appointment_events": appointment_events,
             "appointment_conversion_rate": appointment_conversion_rate,
             "formula": "(phone_click + whatsapp_click + form_submit) / sessions",
         },
+        "cache": cache.stats(),
     }
+    if store_info is not None:
+        analysis["store"] = store_info
 
     write_json(output_path, analysis)
-    success({"run_id": run_id, "analysis": str(output_path)})
+    return analysis
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch GA4 + GSC and write analysis JSON.")
+    parser.add_argument("--window", choices=["28d", "90d"], default="28d")
+    parser.add_argument("--run-id", default="")
+    parser.add_argument("--output", default="")
+    parser.add_argument("--goal", default="appointment_conversion")
+    parser.add_argument("--incremental", default="false", help="Aggregate from the day-partitioned local store.")
+    parser.add_argument("--gsc-paginate", default="false", help="Stream all GSC rows to gsc-*.jsonl.gz artifacts.")
+    parser.add_argument(
+        "--gsc-shards",
+        default="false",
+        help="Fetch GSC per day x device x country shard and merge; resumable with the same --run-id.",
+    )
+    args = parser.parse_args()
+
+    analysis = run_cli_step(
+        run_step,
+        window=args.window,
+        run_id=args.run_id,
+        output=args.output,
+        goal=args.goal,
+        incremental=args.incremental,
+        gsc_paginate=args.gsc_paginate,
+        gsc_shards=args.gsc_shards,
+    )
+    run_id = analysis["run_id"]
+    success({"run_id": run_id, "analysis": str(_output_path(run_id, args.output))})
 
 
 if __name__ == "__main__":
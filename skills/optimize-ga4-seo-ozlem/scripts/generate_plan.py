@@ -7,7 +7,16 @@ import argparse
 import pathlib
 from typing import Any
 
-from common import RUNS_ROOT, load_json, slugify_queries, success, utc_now_iso, write_json
+from common import (
+    RUNS_ROOT,
+    StepError,
+    load_json,
+    run_cli_step,
+    slugify_queries,
+    success,
+    utc_now_iso,
+    write_json,
+)
 
 FALLBACK_KEYWORDS = [
     "atasehir cocuk doktoru",
@@ -43,27 +52,31 @@ def _build_descriptions() -> dict[str, str]:
     }
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate 90-day plan from analysis.json")
-    parser.add_argument("--analysis", required=True)
-    parser.add_argument("--output", default="")
-    parser.add_argument("--lang", choices=["tr", "en", "both"], default="both")
-    args = parser.parse_args()
+def _output_path(run_id: str, output: str) -> pathlib.Path:
+    return pathlib.Path(output).resolve() if output else RUNS_ROOT / run_id / "plan-90d.json"
 
-    analysis_path = pathlib.Path(args.analysis).resolve()
-    analysis = load_json(analysis_path)
 
-    run_id = analysis.get("run_id", "")
+def run_step(
+    *,
+    analysis: str = "",
+    output: str = "",
+    lang: str = "both",
+    analysis_data: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Build plan-90d.json from an analysis file (or in-memory ``analysis_data``) and return the plan."""
+    if analysis_data is None:
+        analysis_data = load_json(pathlib.Path(analysis).resolve())
+
+    run_id = analysis_data.get("run_id", "")
     if not run_id:
-        raise SystemExit("analysis.json missing run_id")
+        raise StepError("analysis.json missing run_id")
 
-    run_dir = RUNS_ROOT / run_id
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "plan-90d.json"
+    output_path = _output_path(run_id, output)
 
-    conversion_rate = float(analysis.get("kpi", {}).get("appointment_conversion_rate", 0.0))
+    conversion_rate = float(analysis_data.get("kpi", {}).get("appointment_conversion_rate", 0.0))
     band = _performance_band(conversion_rate)
 
-    top_queries = analysis.get("gsc", {}).get("top_queries", [])
+    top_queries = analysis_data.get("gsc", {}).get("top_queries", [])
     keyword_block = slugify_queries(top_queries, FALLBACK_KEYWORDS, max_items=12)
     descriptions = _build_descriptions()
 
@@ -80,7 +93,7 @@ def main() -> None:
     plan = {
         "run_id": run_id,
         "generated_at": utc_now_iso(),
-        "window_used": analysis.get("window", "28d"),
+        "window_used": analysis_data.get("window", "28d"),
         "strategy_horizon": "90d",
         "goal": "appointment_conversion",
         "summary": {
@@ -149,13 +162,25 @@ def main() -> None:
         },
         "recommendations_only": {
             "note": "All non-whitelisted file changes are emitted as recommendations only.",
-            "top_pages": analysis.get("gsc", {}).get("top_pages", [])[:10],
+            "top_pages": analysis_data.get("gsc", {}).get("top_pages", [])[:10],
             "top_queries": top_queries[:15],
         },
     }
 
     write_json(output_path, plan)
-    success({"run_id": run_id, "plan": str(output_path), "language": args.lang})
+    return plan
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate 90-day plan from analysis.json")
+    parser.add_argument("--analysis", required=True)
+    parser.add_argument("--output", default="")
+    parser.add_argument("--lang", choices=["tr", "en", "both"], default="both")
+    args = parser.parse_args()
+
+    plan = run_cli_step(run_step, analysis=args.analysis, output=args.output, lang=args.lang)
+    run_id = plan["run_id"]
+    success({"run_id": run_id, "plan": str(_output_path(run_id, args.output)), "language": args.lang})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Sharded Search Console fetch across day, device and country with resumable checkpoints."""
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+import gzip
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Any, Callable, Iterable
+
+from common import ensure_dir, env_optional, load_json, run_concurrently, utc_now_iso, write_json_atomic
+
+DEVICES = ("DESKTOP", "MOBILE", "TABLET")
+DEFAULT_COUNTRIES = "tur"
+
+
+def shard_countries() -> list[str]:
+    raw = env_optional("AUTOPILOT_GSC_SHARD_COUNTRIES", DEFAULT_COUNTRIES)
+    return [item.strip().lower() for item in raw.split(",") if item.strip()]
+
+
+def plan_shards(dimension: str, start: str, end: str, countries: list[str]) -> list[dict[str, Any]]:
+    """Split a GSC query into one shard per day x device x country.
+
+    Listed countries get an ``equals`` shard each; a final ``other`` shard
+    excludes all of them, so the shards partition the data without overlap.
+    """
+    first = dt.date.fromisoformat(start)
+    last = dt.date.fromisoformat(end)
+    shards: list[dict[str, Any]] = []
+    for offset in range((last - first).days + 1):
+        day = (first + dt.timedelta(days=offset)).isoformat()
+        for device in DEVICES:
+            for country in [*countries, ""]:
+                filters = [{"dimension": "device", "operator": "equals", "expression": device}]
+                if country:
+                    filters.append({"dimension": "country", "operator": "equals", "expression": country})
+                else:
+                    filters.extend(
+                        {"dimension": "country", "operator": "notEquals", "expression": item} for item in countries
+                    )
+                shards.append(
+                    {
+                        "id": f"{dimension}-{day}-{device.lower()}-{country or 'other'}",
+                        "payload": {
+                            "startDate": day,
+                            "endDate": day,
+                            "dimensions": [dimension],
+                            "dimensionFilterGroups": [{"groupType": "and", "filters": filters}],
+                        },
+                    }
+                )
+    return shards
+
+
+class ShardCheckpoint:
+    """Thread-safe record of finished shards, persisted after every completion."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._state = load_json(path)
+        except (OSError, ValueError):
+            self._state = {"shards": {}}
+
+    def done(self, shard_id: str, shard_path: pathlib.Path) -> bool:
+        return shard_id in self._state["shards"] and shard_path.exists()
+
+    def complete(self, shard_id: str, rows: int) -> None:
+        with self._lock:
+            self._state["shards"][shard_id] = {"rows": rows, "completed_at": utc_now_iso()}
+            write_json_atomic(self.path, self._state)
+
+
+def _fetch_shard(
+    shard: dict[str, Any],
+    shard_path: pathlib.Path,
+    fetch_rows: Callable[[dict[str, Any]], Iterable[dict[str, Any]]],
+    checkpoint: ShardCheckpoint,
+) -> int:
+    tmp = shard_path.with_name(f".{shard_path.name}.{os.getpid()}.tmp")
+    rows = 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        for row in fetch_rows(shard["payload"]):
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+            rows += 1
+    os.replace(tmp, shard_path)
+    checkpoint.complete(shard["id"], rows)
+    return rows
+
+
+def _merge(shard_paths: list[pathlib.Path], output: pathlib.Path, top_n: int) -> dict[str, Any]:
+    """Sum clicks/impressions per key across shards with an impression-weighted position."""
+    db_path = output.with_suffix(".merge.sqlite3")
+    if db_path.exists():
+        db_path.unlink()
+    db = sqlite3.connect(str(db_path))
+    try:
+        db.execute(
+            "CREATE TABLE merged (key TEXT PRIMARY KEY, clicks REAL, impressions REAL, weighted_position REAL)"
+        )
+        for shard_path in shard_paths:
+            with gzip.open(shard_path, "rt", encoding="utf-8") as fh:
+                db.executemany(
+                    "INSERT INTO merged VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                    "clicks = clicks + excluded.clicks, impressions = impressions + excluded.impressions, "
+                    "weighted_position = weighted_position + excluded.weighted_position",
+                    (
+                        (
+                            json.dumps(row["keys"], ensure_ascii=False),
+                            row["clicks"],
+                            row["impressions"],
+                            row["position"] * row["impressions"],
+                        )
+                        for row in map(json.loads, fh)
+                    ),
+                )
+            db.commit()
+
+        summary: dict[str, Any] = {"path": str(output), "rows": 0, "clicks": 0.0, "impressions": 0.0, "top": []}
+        cursor = db.execute(
+            "SELECT key, clicks, impressions, weighted_position FROM merged ORDER BY clicks DESC, impressions DESC, key"
+        )
+        with gzip.open(output, "wt", encoding="utf-8") as fh:
+            for key, clicks, impressions, weighted in cursor:
+                row = {
+                    "keys": json.loads(key),
+                    "clicks": clicks,
+                    "impressions": impressions,
+                    "ctr": clicks / impressions if impressions else 0.0,
+                    "position": weighted / impressions if impressions else 0.0,
+                }
+                fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                summary["rows"] += 1
+                summary["clicks"] += clicks
+                summary["impressions"] += impressions
+                if len(summary["top"]) < top_n:
+                    summary["top"].append(row)
+        return summary
+    finally:
+        db.close()
+        db_path.unlink(missing_ok=True)
+
+
+def fetch_sharded(
+    dimension: str,
+    start: str,
+    end: str,
+    fetch_rows: Callable[[dict[str, Any]], Iterable[dict[str, Any]]],
+    run_dir: pathlib.Path,
+    top_n: int = 25,
+) -> dict[str, Any]:
+    """Fetch every shard not already checkpointed, then merge into ``gsc-<dimension>.jsonl.gz``.
+
+    Shards run concurrently, paced by the shared Search Console rate limit.
+    If any shard fails the finished ones stay checkpointed under
+    ``gsc-shards/``, so rerunning with the same run ID only fetches what is
+    left.
+    """
+    shard_dir = ensure_dir(run_dir / "gsc-shards")
+    checkpoint = ShardCheckpoint(shard_dir / f"{dimension}-checkpoint.json")
+    shards = plan_shards(dimension, start, end, shard_countries())
+    paths = {shard["id"]: shard_dir / f"{shard['id']}.jsonl.gz" for shard in shards}
+    pending = [shard for shard in shards if not checkpoint.done(shard["id"], paths[shard["id"]])]
+
+    run_concurrently(
+        {
+            shard["id"]: functools.partial(_fetch_shard, shard, paths[shard["id"]], fetch_rows, checkpoint)
+            for shard in pending
+        }
+    )
+
+    summary = _merge([paths[shard["id"]] for shard in shards], run_dir / f"gsc-{dimension}.jsonl.gz", top_n)
+    summary["shards"] = len(shards)
+    summary["shards_fetched"] = len(pending)
+    summary["shards_resumed"] = len(shards) - len(pending)
+    return summary
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Weight and page-view budget for a GTM workspace, estimated from its tags, triggers and variables."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from common import env_optional
+
+# Fields GTM stamps on each copy of an entity: they differ between workspace and version
+# without a real change and are not part of what the container ships.
+COPY_FIELDS = {"accountId", "containerId", "workspaceId", "containerVersionId", "path", "fingerprint", "tagManagerUrl"}
+# gtm.js runtime served with every container before any tag, trigger or variable (uncompressed).
+RUNTIME_BYTES = 80 * 1024
+PAGE_VIEW_TRIGGER_TYPES = {"consentInit", "init", "pageview", "domReady", "windowLoaded"}
+# Built-in triggers: All Pages, Consent Initialization - All Pages, Initialization - All Pages.
+BUILTIN_PAGE_VIEW_TRIGGERS = {"2147479553", "2147479572", "2147479573"}
+BUDGETS = {
+    # total: (env var, default, bytes per unit of the env value)
+    "script_bytes": ("AUTOPILOT_GTM_SCRIPT_BUDGET_KB", 200.0, 1024),
+    "custom_html_bytes": ("AUTOPILOT_GTM_HTML_BUDGET_KB", 30.0, 1024),
+    "page_view_tags": ("AUTOPILOT_GTM_PAGE_VIEW_TAG_BUDGET", 15.0, 1),
+}
+MODES = ("block", "warn", "off")
+TOP_GROWTH = 5
+
+
+def budgets_from_env() -> dict[str, float]:
+    """Budget per total; ``0`` disables one."""
+    budgets = {}
+    for name, (env, default, unit) in BUDGETS.items():
+        try:
+            value = float(env_optional(env, str(default)))
+        except ValueError:
+            value = default
+        budgets[name] = value * unit
+    return budgets
+
+
+def mode_from_env() -> str:
+    mode = env_optional("AUTOPILOT_GTM_BUDGET_MODE", "block").lower()
+    return mode if mode in MODES else "block"
+
+
+def entity_bytes(entity: dict[str, Any]) -> int:
+    content = {key: value for key, value in entity.items() if key not in COPY_FIELDS}
+    return len(json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def custom_html_bytes(tag: dict[str, Any]) -> int:
+    if tag.get("type") != "html":
+        return 0
+    for parameter in tag.get("parameter", []):
+        if parameter.get("key") == "html":
+            return len(str(parameter.get("value", "")).encode("utf-8"))
+    return 0
+
+
+def fires_on_page_view(tag: dict[str, Any], triggers: dict[str, dict[str, Any]]) -> bool:
+    if tag.get("paused"):
+        return False
+    for trigger_id in tag.get("firingTriggerId", []):
+        if trigger_id in BUILTIN_PAGE_VIEW_TRIGGERS:
+            return True
+        if triggers.get(trigger_id, {}).get("type") in PAGE_VIEW_TRIGGER_TYPES:
+            return True
+    return False
+
+
+def _totals(entities: dict[str, dict[str, dict[str, Any]]]) -> dict[str, int]:
+    tags = entities.get("tags", {})
+    triggers = entities.get("triggers", {})
+    return {
+        "script_bytes": RUNTIME_BYTES
+        + sum(entity_bytes(entity) for kind in entities.values() for entity in kind.values()),
+        "custom_html_bytes": sum(custom_html_bytes(tag) for tag in tags.values()),
+        "page_view_tags": sum(fires_on_page_view(tag, triggers) for tag in tags.values()),
+    }
+
+
+def analyze(
+    workspace: dict[str, dict[str, dict[str, Any]]], live: dict[str, dict[str, dict[str, Any]]]
+) -> dict[str, Any]:
+    """Estimated container totals for the workspace and the live version, plus a per-tag breakdown."""
+    live_tags = live.get("tags", {})
+    tags = []
+    for tag_id, tag in workspace.get("tags", {}).items():
+        size = entity_bytes(tag)
+        live_size = entity_bytes(live_tags[tag_id]) if tag_id in live_tags else 0
+        tags.append(
+            {
+                "id": tag_id,
+                "name": tag.get("name", ""),
+                "type": tag.get("type", ""),
+                "bytes": size,
+                "custom_html_bytes": custom_html_bytes(tag),
+                "page_view": fires_on_page_view(tag, workspace.get("triggers", {})),
+                "growth_bytes": size - live_size,
+            }
+        )
+    tags.sort(key=lambda item: item["bytes"], reverse=True)
+    return {"totals": _totals(workspace), "live_totals": _totals(live), "tags": tags}
+
+
+def over_budget(analysis: dict[str, Any], budgets: dict[str, float]) -> list[dict[str, Any]]:
+    """Totals over their budget, each with the tags that grew most since the live version.
+
+    ``grew`` is set when the total is above the live one or a tag counted in it grew.
+    """
+    grown = sorted(
+        (tag for tag in analysis["tags"] if tag["growth_bytes"] > 0), key=lambda tag: tag["growth_bytes"], reverse=True
+    )
+    found = []
+    for name, limit in budgets.items():
+        actual = analysis["totals"][name]
+        if limit <= 0 or actual <= limit:
+            continue
+        if name == "page_view_tags":
+            growth = [tag for tag in grown if tag["page_view"]]
+        elif name == "custom_html_bytes":
+            growth = [tag for tag in grown if tag["custom_html_bytes"]]
+        else:
+            growth = grown
+        found.append(
+            {
+                "budget": name,
+                "limit": limit,
+                "actual": actual,
+                "live": analysis["live_totals"][name],
+                "grew": actual > analysis["live_totals"][name] or bool(growth),
+                "top_growth": [
+                    {key: tag[key] for key in ("id", "name", "growth_bytes")} for tag in growth[:TOP_GROWTH]
+                ],
+            }
+        )
+    return found
+
+
+def evaluate(
+    workspace: dict[str, dict[str, dict[str, Any]]], live: dict[str, dict[str, dict[str, Any]]]
+) -> dict[str, Any]:
+    """Budget section for ``gtm-publish-report.json``; ``blocked`` is set when publishing must stop.
+
+    Totals over budget that did not grow since the live version are ``warnings``, not ``violations``.
+    """
+    mode = mode_from_env()
+    if mode == "off":
+        return {"mode": mode, "blocked": False}
+    budgets = budgets_from_env()
+    analysis = analyze(workspace, live)
+    found = over_budget(analysis, budgets)
+    # A container already over budget live must still accept changes that do not add to it.
+    violations = [item for item in found if item["grew"]]
+    return {
+        "mode": mode,
+        "budgets": budgets,
+        **analysis,
+        "violations": violations,
+        "warnings": [item for item in found if not item["grew"]],
+        "blocked": mode == "block" and bool(violations),
+    }
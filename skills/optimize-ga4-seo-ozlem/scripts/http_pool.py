@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Per-host keep-alive HTTP connection pool shared by autopilot scripts."""
+
+from __future__ import annotations
+
+import base64
+import contextlib
+import contextvars
+import http.client
+import os
+import select
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Iterator
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT_SECONDS = 60.0
+
+# Methods that are safe to resend after the server may already have received them.
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Errors that mean a kept-alive socket was closed by the server while idle.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+_SCOPE: contextvars.ContextVar[dict[str, int] | None] = contextvars.ContextVar("autopilot_http_scope", default=None)
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _proxy_for(scheme: str, host: str) -> tuple[str, int, dict[str, str]] | None:
+    """``(host, port, headers)`` of the ``HTTP(S)_PROXY`` proxy for ``host``, honouring ``NO_PROXY``."""
+    proxy = urllib.request.getproxies().get(scheme, "")
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    parsed = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers = {}
+    if parsed.username:
+        credentials = f"{urllib.parse.unquote(parsed.username)}:{urllib.parse.unquote(parsed.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+    return parsed.hostname or "", parsed.port or 80, headers
+
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    # An idle keep-alive socket is only readable once the server has closed it.
+    if conn.sock is None:
+        return True
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class ConnectionPool:
+    """Keep up to ``max_per_host`` idle connections per (scheme, host, port).
+
+    Connections are checked out exclusively, so the pool is safe to use from
+    worker threads. Concurrent callers beyond the idle capacity get fresh
+    connections that are closed instead of returned. Idle connections older
+    than ``idle_timeout``, or already closed by the server, are discarded on
+    checkout. ``HTTP_PROXY``/``HTTPS_PROXY``/``NO_PROXY`` are honoured.
+    """
+
+    def __init__(self, max_per_host: int = DEFAULT_POOL_SIZE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS) -> None:
+        self.max_per_host = max(max_per_host, 0)
+        self.idle_timeout = idle_timeout
+        self._idle: dict[tuple[str, str, int], list[tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "opened": 0, "reused": 0, "expired": 0, "stale_retries": 0}
+
+    def _count(self, name: str) -> None:
+        # Caller holds self._lock.
+        self._stats[name] += 1
+        scope = _SCOPE.get()
+        if scope is not None:
+            scope[name] = scope.get(name, 0) + 1
+
+    def _open(self, key: tuple[str, str, int], timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        proxy = _proxy_for(scheme, host)
+        if proxy is None:
+            if scheme == "https":
+                return http.client.HTTPSConnection(host, port, timeout=timeout)
+            return http.client.HTTPConnection(host, port, timeout=timeout)
+        proxy_host, proxy_port, proxy_headers = proxy
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=timeout)
+            conn.set_tunnel(host, port, headers=proxy_headers)
+            return conn
+        return http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout)
+
+    def _checkout(self, key: tuple[str, str, int], timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        with self._lock:
+            self._count("requests")
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used <= self.idle_timeout and not _dropped(conn):
+                    self._count("reused")
+                    conn.timeout = timeout
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    return conn, True
+                self._count("expired")
+                conn.close()
+            self._count("opened")
+        return self._open(key, timeout), False
+
+    def _checkin(self, key: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 60,
+    ) -> tuple[int, dict[str, str], bytes]:
+        """Send one request and return ``(status, headers, body)`` with the body fully read.
+
+        A reused connection that turns out to be stale is retried once on a fresh one, unless the
+        request was fully sent with a non-idempotent method: the server may already have acted on it.
+        """
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme.lower()
+        if scheme not in {"http", "https"}:
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        key = (scheme, parsed.hostname or "", parsed.port or (443 if scheme == "https" else 80))
+        target = parsed.path or "/"
+        if parsed.query:
+            target = f"{target}?{parsed.query}"
+        headers = dict(headers or {})
+        proxy = _proxy_for(scheme, key[1])
+        if proxy is not None and scheme == "http":
+            # Plain HTTP goes to the proxy with an absolute target; HTTPS is tunnelled in _open.
+            target = urllib.parse.urlunsplit((scheme, parsed.netloc, parsed.path or "/", parsed.query, ""))
+            headers.update(proxy[2])
+
+        for attempt in range(2):
+            conn, reused = self._checkout(key, timeout)
+            sent = False
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except _STALE_ERRORS:
+                conn.close()
+                retryable = not sent or method.upper() in _IDEMPOTENT_METHODS
+                if reused and attempt == 0 and retryable:
+                    with self._lock:
+                        self._count("stale_retries")
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            response_headers = {name.lower(): value for name, value in resp.getheaders()}
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+            return resp.status, response_headers, data
+        raise RuntimeError("unreachable")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            idle = sum(len(items) for items in self._idle.values())
+            return {
+                **self._stats,
+                "idle": idle,
+                "max_per_host": self.max_per_host,
+                "idle_timeout_seconds": self.idle_timeout,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for items in self._idle.values():
+                for conn, _ in items:
+                    conn.close()
+            self._idle.clear()
+
+
+_POOL: ConnectionPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def shared_pool() -> ConnectionPool:
+    """Process-wide pool sized by ``AUTOPILOT_HTTP_POOL_SIZE`` / ``AUTOPILOT_HTTP_IDLE_TIMEOUT``."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ConnectionPool(
+                max_per_host=int(_env_number("AUTOPILOT_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                idle_timeout=_env_number("AUTOPILOT_HTTP_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT_SECONDS),
+            )
+        return _POOL
+
+
+@contextlib.contextmanager
+def stats_scope() -> Iterator[dict[str, int]]:
+    """Collect connection counters for requests made in this context (and tasks copied from it)."""
+    counters = {"requests": 0, "opened": 0, "reused": 0, "expired": 0, "stale_retries": 0}
+    token = _SCOPE.set(counters)
+    try:
+        yield counters
+    finally:
+        _SCOPE.reset(token)
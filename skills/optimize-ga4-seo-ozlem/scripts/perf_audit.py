@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Post-deploy delivery audit: compression, Cache-Control against firebase.json, and page weight budgets."""
+
+from __future__ import annotations
+
+import functools
+import gzip
+import pathlib
+import re
+import urllib.parse
+import zlib
+from html.parser import HTMLParser
+from typing import Any
+
+from common import REPO_ROOT, env_optional, load_json, run_concurrently
+from http_pool import shared_pool
+
+# Advertise only encodings the standard library can decode, so decoded sizes are always known.
+REQUEST_HEADERS = {"Accept-Encoding": "gzip, deflate", "User-Agent": "autopilot-postcheck"}
+TEXT_TYPES = ("text/", "javascript", "json", "xml", "svg")
+# Smaller text responses are not worth compressing.
+COMPRESS_MIN_BYTES = 1024
+FONT_URL = re.compile(r"url\(\s*['\"]?([^'\")]+\.(?:woff2?|ttf|otf)(?:\?[^'\")]*)?)['\"]?\s*\)", re.IGNORECASE)
+# Angular/esbuild output names: main-FFHMD2TL.js, chunk-5XKQ4ZBT.js, styles-4JMRRV5N.css.
+HASHED_NAME = re.compile(r"[-.](?=[A-Za-z0-9]*\d)[A-Za-z0-9]{8,}\.\w+$")
+BUDGETS = {
+    # total per page: (env var, default, bytes per unit of the env value)
+    "transfer_bytes": ("AUTOPILOT_PERF_TRANSFER_BUDGET_KB", 1500.0, 1024),
+    "decoded_bytes": ("AUTOPILOT_PERF_DECODED_BUDGET_KB", 5000.0, 1024),
+    "requests": ("AUTOPILOT_PERF_REQUEST_BUDGET", 60.0, 1),
+}
+
+
+def budgets_from_env() -> dict[str, float]:
+    """Budget per page total; ``0`` disables one."""
+    budgets = {}
+    for name, (env, default, unit) in BUDGETS.items():
+        try:
+            value = float(env_optional(env, str(default)))
+        except ValueError:
+            value = default
+        budgets[name] = value * unit
+    return budgets
+
+
+class AssetParser(HTMLParser):
+    """Collect the scripts, stylesheets, preloads, icons and images a page links to."""
+
+    def __init__(self, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.assets: dict[str, str] = {}
+
+    def _add(self, href: str, kind: str) -> None:
+        url = urllib.parse.urljoin(self.base_url, href.strip())
+        if href.strip() and urllib.parse.urlsplit(url).scheme in {"http", "https"}:
+            self.assets.setdefault(urllib.parse.urldefrag(url)[0], kind)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        values = {name: value or "" for name, value in attrs}
+        if tag == "script" and values.get("src"):
+            self._add(values["src"], "script")
+        elif tag == "img" and values.get("src"):
+            self._add(values["src"], "image")
+        elif tag == "link" and values.get("href"):
+            rel = values.get("rel", "").lower().split()
+            if "stylesheet" in rel:
+                self._add(values["href"], "style")
+            elif "modulepreload" in rel:
+                self._add(values["href"], "script")
+            elif "preload" in rel:
+                self._add(values["href"], values.get("as", "other") or "other")
+            elif "icon" in rel or "apple-touch-icon" in rel:
+                self._add(values["href"], "image")
+
+
+def _glob_regex(source: str) -> re.Pattern[str]:
+    """Firebase Hosting glob: ``**`` spans directories, ``*`` and ``?`` stay within one."""
+    pattern = ""
+    index = 0
+    while index < len(source):
+        if source.startswith("**/", index):
+            pattern += "(?:.*/)?"
+            index += 3
+        elif source.startswith("**", index):
+            pattern += ".*"
+            index += 2
+        elif source[index] == "*":
+            pattern += "[^/]*"
+            index += 1
+        elif source[index] == "?":
+            pattern += "[^/]"
+            index += 1
+        else:
+            pattern += re.escape(source[index])
+            index += 1
+    return re.compile(pattern + r"\Z")
+
+
+def cache_rules(root: pathlib.Path = REPO_ROOT) -> list[tuple[re.Pattern[str], str, str]]:
+    """``(pattern, source, Cache-Control)`` for every hosting header rule that sets Cache-Control, in order."""
+    try:
+        headers = load_json(root / "firebase.json").get("hosting", {}).get("headers", [])
+    except (OSError, ValueError):
+        return []
+    rules = []
+    for rule in headers:
+        for header in rule.get("headers", []):
+            if header.get("key", "").lower() == "cache-control":
+                source = rule.get("source", "").lstrip("/")
+                rules.append((_glob_regex(source), source, header.get("value", "")))
+    return rules
+
+
+def expected_cache_control(path: str, rules: list[tuple[re.Pattern[str], str, str]]) -> tuple[str, str]:
+    """Cache-Control firebase.json assigns to ``path`` and the rule source; the last matching rule wins."""
+    expected = ("", "")
+    for pattern, source, value in rules:
+        if pattern.match(path.lstrip("/")):
+            expected = (value, source)
+    return expected
+
+
+def _directives(value: str) -> set[str]:
+    return {item.strip().lower() for item in value.split(",") if item.strip()}
+
+
+def _decode(body: bytes, encoding: str) -> bytes | None:
+    try:
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+    except (OSError, EOFError, zlib.error):
+        return None
+    return body if encoding in {"", "identity"} else None
+
+
+def _fetch(url: str) -> dict[str, Any]:
+    try:
+        status, headers, body = shared_pool().request("GET", url, headers=REQUEST_HEADERS, timeout=30)
+    except Exception as exc:  # noqa: BLE001
+        return {"url": url, "status": 0, "error": str(exc), "transfer_bytes": 0, "decoded_bytes": 0}
+    encoding = headers.get("content-encoding", "").strip().lower()
+    decoded = _decode(body, encoding)
+    return {
+        "url": url,
+        "status": status,
+        "content_type": headers.get("content-type", "").split(";")[0].strip().lower(),
+        "content_encoding": encoding,
+        "cache_control": headers.get("cache-control", ""),
+        "transfer_bytes": len(body),
+        "decoded_bytes": len(decoded) if decoded is not None else None,
+        "body": decoded or b"",
+    }
+
+
+def _fetch_all(urls: set[str] | list[str], concurrency: int) -> dict[str, dict[str, Any]]:
+    return run_concurrently({url: functools.partial(_fetch, url) for url in urls}, max_workers=max(concurrency, 1))
+
+
+def _issues(resource: dict[str, Any], kind: str, site: str, rules: list[tuple[re.Pattern[str], str, str]]) -> None:
+    """Annotate a resource with ``issues`` (fail the audit) and ``warnings``; first-party ones are fully checked."""
+    parts = urllib.parse.urlsplit(resource["url"])
+    resource["first_party"] = f"{parts.scheme}://{parts.netloc}" == site
+    resource["issues"], resource["warnings"] = [], []
+    # Third-party hosts are outside this deploy: their failures are reported, not failed on.
+    failures = resource["issues"] if resource["first_party"] else resource["warnings"]
+    if resource.get("error"):
+        failures.append(f"request failed: {resource['error']}")
+        return
+    if resource["status"] >= 400:
+        failures.append(f"status {resource['status']}")
+    if not resource["first_party"] or resource["status"] != 200:
+        return
+
+    text = any(marker in resource["content_type"] for marker in TEXT_TYPES)
+    size = resource["decoded_bytes"] or 0
+    if text and size >= COMPRESS_MIN_BYTES and resource["content_encoding"] in {"", "identity"}:
+        resource["issues"].append(f"uncompressed {resource['content_type']} ({size} bytes)")
+
+    # Documents are served through the SPA rewrite, so their rule is the one for the requested path.
+    expected, source = expected_cache_control(parts.path, rules)
+    resource["expected_cache_control"] = expected
+    if expected and _directives(expected) != _directives(resource["cache_control"]):
+        resource["issues"].append(
+            f"Cache-Control {resource['cache_control']!r}, firebase.json {source!r} sets {expected!r}"
+        )
+    directives = _directives(resource["cache_control"])
+    if "immutable" in directives and (kind == "document" or not HASHED_NAME.search(parts.path)):
+        resource["warnings"].append("immutable but the URL has no content hash")
+    if kind == "document" and "no-cache" not in directives and "no-store" not in directives:
+        resource["issues"].append("HTML is cacheable without revalidation")
+
+
+def _unique(pages: list[dict[str, Any]], field: str) -> list[dict[str, str]]:
+    # Pages share most assets; report each problem once.
+    found = dict.fromkeys(
+        (item["url"], message) for page in pages for item in page["resources"] for message in item[field]
+    )
+    return [{"url": url, field[:-1]: message} for url, message in found]
+
+
+def audit(page_urls: list[str], concurrency: int) -> dict[str, Any]:
+    """Fetch each page and everything it links (fonts via its stylesheets) and total them per page."""
+    rules = cache_rules()
+    budgets = budgets_from_env()
+
+    documents = _fetch_all(page_urls, concurrency)
+    linked: dict[str, dict[str, str]] = {}
+    for url, document in documents.items():
+        parser = AssetParser(url)
+        if "html" in document.get("content_type", ""):
+            parser.feed(document["body"].decode("utf-8", errors="replace"))
+        linked[url] = parser.assets
+    assets = _fetch_all({asset for page in linked.values() for asset in page} - set(documents), concurrency)
+    for page in linked.values():
+        for style in [asset for asset, kind in page.items() if kind == "style"]:
+            css = assets.get(style, {}).get("body", b"").decode("utf-8", errors="replace")
+            for match in FONT_URL.finditer(css):
+                page.setdefault(urllib.parse.urljoin(style, match.group(1)), "font")
+    fonts = {asset for page in linked.values() for asset in page} - set(assets) - set(documents)
+    assets.update(_fetch_all(fonts, concurrency))
+
+    pages = []
+    for url in page_urls:
+        parts = urllib.parse.urlsplit(url)
+        site = f"{parts.scheme}://{parts.netloc}"
+        resources = []
+        for resource_url, kind in [(url, "document"), *linked[url].items()]:
+            fetched = documents.get(resource_url) or assets[resource_url]
+            resource = {key: value for key, value in fetched.items() if key != "body"}
+            resource["kind"] = kind
+            _issues(resource, kind, site, rules)
+            resources.append(resource)
+        totals = {
+            "requests": len(resources),
+            "transfer_bytes": sum(item["transfer_bytes"] for item in resources),
+            "decoded_bytes": sum(item["decoded_bytes"] or 0 for item in resources),
+        }
+        violations = [
+            {"budget": name, "limit": limit, "actual": totals[name]}
+            for name, limit in budgets.items()
+            if limit > 0 and totals[name] > limit
+        ]
+        heaviest = sorted(resources, key=lambda item: item["transfer_bytes"], reverse=True)[:5]
+        pages.append(
+            {
+                "url": url,
+                **totals,
+                "violations": violations,
+                "heaviest": [{key: item[key] for key in ("url", "kind", "transfer_bytes")} for item in heaviest],
+                "resources": resources,
+            }
+        )
+
+    issues = _unique(pages, "issues")
+    return {
+        "budgets": budgets,
+        "pages": pages,
+        "issues": issues,
+        "warnings": _unique(pages, "warnings"),
+        "ok": not issues and not any(page["violations"] for page in pages),
+    }
@@ -4,81 +4,383 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+import functools
+import math
 import pathlib
 import re
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import Any
 
-from common import RUNS_ROOT, env_optional, env_required, fail, success, utc_now_iso, write_json
+import cassette
+import perf_audit
+from common import (
+    REPO_ROOT,
+    RUNS_ROOT,
+    StepError,
+    env_optional,
+    env_required,
+    parse_bool,
+    run_cli_step,
+    run_concurrently,
+    success,
+    utc_now_iso,
+    write_json,
+)
+
+DEFAULT_CONCURRENCY = 8
+# Deployed as /sitemap.xml; used when the live sitemap cannot be fetched.
+LOCAL_SITEMAP = REPO_ROOT / "public" / "sitemap.xml"
+PERCENTILES = (50, 95, 99)
+CHUNK_BYTES = 8192
+GTM_ID = re.compile(r"GTM-[A-Z0-9]+")
+
+
+class HeadParser(HTMLParser):
+    """Collect the SEO and GTM tags of ``<head>`` from HTML fed in chunks.
+
+    ``done`` turns true at ``</head>`` (or ``<body>``), so callers can stop
+    reading the document there.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.done = False
+        self.bytes_fed = 0
+        self.description = ""
+        self.keywords = ""
+        self.canonical = ""
+        self.hreflang: list[dict[str, str]] = []
+        self.gtm_ids: list[str] = []
+
+    def feed_bytes(self, chunk: bytes) -> None:
+        self.bytes_fed += len(chunk)
+        self.feed(self._decoder.decode(chunk))
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self.done:
+            return
+        if tag == "body":
+            self.done = True
+            return
+        values = {name: value or "" for name, value in attrs}
+        for value in values.values():
+            self._find_gtm(value)
+        if tag == "meta":
+            name = values.get("name", "").lower()
+            if name == "description":
+                self.description = values.get("content", "")
+            elif name == "keywords":
+                self.keywords = values.get("content", "")
+        elif tag == "link":
+            rel = values.get("rel", "").lower().split()
+            if "canonical" in rel:
+                self.canonical = values.get("href", "")
+            elif "alternate" in rel and values.get("hreflang"):
+                self.hreflang.append({"hreflang": values["hreflang"], "href": values.get("href", "")})
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "head":
+            self.done = True
+
+    def handle_data(self, data: str) -> None:
+        # The GTM snippet is an inline script; its container ID may also sit in a src or plain text.
+        if not self.done:
+            self._find_gtm(data)
+
+    def _find_gtm(self, text: str) -> None:
+        for container_id in GTM_ID.findall(text):
+            if container_id not in self.gtm_ids:
+                self.gtm_ids.append(container_id)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "description": self.description,
+            "keywords": self.keywords,
+            "canonical": self.canonical,
+            "hreflang": self.hreflang,
+            "gtm_ids": self.gtm_ids,
+            "complete": self.done,
+        }
 
 
 def _check(condition: bool, name: str, details: str) -> dict[str, str | bool]:
     return {"name": name, "ok": condition, "details": details}
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Run smoke checks on live site")
-    parser.add_argument("--run-id", required=True)
-    parser.add_argument("--url", default="")
-    parser.add_argument("--output", default="")
-    args = parser.parse_args()
+def _fetch(
+    url: str, timing: dict[str, float] | None = None, head: HeadParser | None = None
+) -> tuple[int, dict[str, str], bytes]:
+    """GET ``url``; with ``head``, read in chunks fed to it only until the end of ``<head>``."""
+    started = time.perf_counter()
+    try:
+        response = urllib.request.urlopen(url, timeout=30)
+    except urllib.error.HTTPError as exc:
+        response = exc
+    with response:
+        if timing is not None:
+            timing["ttfb"] = time.perf_counter() - started
+        headers = {name.lower(): value for name, value in response.getheaders()}
+        if head is None:
+            return response.status, headers, response.read()
+        chunks = []
+        while not head.done:
+            chunk = response.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            head.feed_bytes(chunk)
+        return response.status, headers, b"".join(chunks)
+
+
+def _get(url: str, head: HeadParser | None = None) -> tuple[int, dict[str, str], bytes, dict[str, float]]:
+    """GET ``url`` through the active cassette, if any; timings are in milliseconds.
+
+    A cassette records only what was read, so with ``head`` it holds the
+    document up to ``</head>``; on replay that prefix is fed to ``head``.
+    """
+    timing: dict[str, float] = {}
+    started = time.perf_counter()
+    tape = cassette.active()
+    if tape is None:
+        status, headers, body = _fetch(url, timing, head)
+    else:
+        status, headers, body = tape.request("GET", url, None, lambda: _fetch(url, timing, head))
+        if head is not None and not head.bytes_fed:
+            head.feed_bytes(body)
+    total = time.perf_counter() - started
+    # A replayed response has no first byte of its own.
+    ttfb = timing.get("ttfb", total)
+    return status, headers, body, {"ttfb_ms": round(ttfb * 1000, 1), "total_ms": round(total * 1000, 1)}
+
+
+def _page_checks(status: int, head: HeadParser, container_id: str) -> list[dict[str, str | bool]]:
+    return [
+        _check(status == 200, "http_status", f"status={status}"),
+        _check(container_id in head.gtm_ids, "gtm_container_present", f"container={container_id}"),
+        _check(bool(head.description.strip()), "meta_description_present", "description tag exists"),
+        _check(bool(head.keywords.strip()), "meta_keywords_present", "keywords tag exists"),
+    ]
+
+
+def _read_page(url: str) -> tuple[int, HeadParser, dict[str, Any]]:
+    """Fetch ``url`` up to ``</head>``; the stats hold timings and bytes read versus the document size."""
+    head = HeadParser()
+    status, headers, body, timing = _get(url, head)
+    length = headers.get("content-length", "")
+    stats = {**timing, "bytes_read": len(body), "bytes_available": int(length) if length.isdigit() else None}
+    return status, head, stats
 
-    run_dir = RUNS_ROOT / args.run_id
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "postcheck-report.json"
 
+def _percentiles(values: list[float]) -> dict[str, float]:
+    """Nearest-rank p50/p95/p99 of ``values``."""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {f"p{p}": ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)] for p in PERCENTILES}
+
+
+def _sitemap_locs(document: bytes) -> tuple[list[str], bool]:
+    """``<loc>`` values of a sitemap, and whether it is a sitemap index."""
+    root = ET.fromstring(document)
+    locs = [(element.text or "").strip() for element in root.iter() if element.tag.rsplit("}", 1)[-1] == "loc"]
+    return [loc for loc in locs if loc], root.tag.endswith("sitemapindex")
+
+
+def _on_site(base_url: str, loc: str) -> str:
+    """Move a sitemap URL (absolute or root-relative) onto ``base_url``, which may be a staging host."""
+    parts = urllib.parse.urlsplit(loc)
+    path = parts.path or "/"
+    return base_url.rstrip("/") + path + (f"?{parts.query}" if parts.query else "")
+
+
+def _discover(base_url: str) -> tuple[list[str], dict[str, Any]]:
+    """Page URLs from the live sitemap (following one level of sitemap index), else the local one."""
+    sitemap_url = _on_site(base_url, "/sitemap.xml")
+    source: dict[str, Any] = {"url": sitemap_url, "source": "live"}
     try:
-        env = env_required(["GTM_CONTAINER_ID"])
-    except RuntimeError as exc:
-        fail(str(exc))
+        status, _, body, _ = _get(sitemap_url)
+        if status != 200:
+            raise RuntimeError(f"status={status}")
+        locs, is_index = _sitemap_locs(body)
+        if is_index:
+            nested = [_sitemap_locs(_get(_on_site(base_url, loc))[2])[0] for loc in locs]
+            locs = [loc for group in nested for loc in group]
+    except Exception as exc:  # noqa: BLE001
+        source = {"url": str(LOCAL_SITEMAP), "source": "local", "live_error": str(exc)}
+        locs, _ = _sitemap_locs(LOCAL_SITEMAP.read_bytes())
+    urls = list(dict.fromkeys(_on_site(base_url, loc) for loc in locs))
+    return urls, source
 
-    target_url = args.url.strip() or env_optional("SITE_URL", "https://ozlemmurzoglu.com")
 
+def _crawl_page(url: str, container_id: str) -> dict[str, Any]:
     try:
-        with urllib.request.urlopen(target_url, timeout=30) as response:
-            status = response.status
-            html = response.read().decode("utf-8", errors="replace")
+        status, head, stats = _read_page(url)
     except Exception as exc:  # noqa: BLE001
-        fail("Postcheck request failed.", {"reason": str(exc), "url": target_url})
+        return {"url": url, "status": 0, "ok": False, "error": str(exc)}
+    failed = [item["name"] for item in _page_checks(status, head, container_id) if not item["ok"]]
+    return {"url": url, "status": status, **stats, "ok": not failed, "failed_checks": failed, "head": head.summary()}
 
-    checks = []
-    checks.append(_check(status == 200, "http_status", f"status={status}"))
-    checks.append(
-        _check(
-            env["GTM_CONTAINER_ID"] in html,
-            "gtm_container_present",
-            f"container={env['GTM_CONTAINER_ID']}",
-        )
-    )
-    checks.append(
-        _check(
-            bool(re.search(r'<meta name="description" content="[^"]+">', html)),
-            "meta_description_present",
-            "description tag exists",
-        )
+
+def _crawl(base_url: str, container_id: str, concurrency: int, max_pages: int) -> dict[str, Any]:
+    urls, sitemap = _discover(base_url)
+    if max_pages > 0:
+        urls = urls[:max_pages]
+    results = run_concurrently(
+        {url: functools.partial(_crawl_page, url, container_id) for url in urls}, max_workers=max(concurrency, 1)
     )
-    checks.append(
-        _check(
-            bool(re.search(r'<meta name="keywords" content="[^"]+">', html)),
-            "meta_keywords_present",
-            "keywords tag exists",
-        )
+    pages = [results[url] for url in urls]
+
+    status_codes: dict[str, int] = {}
+    for page in pages:
+        status_codes[str(page["status"])] = status_codes.get(str(page["status"]), 0) + 1
+    fetched = [page for page in pages if "ttfb_ms" in page]
+    checks = []
+    for name in ("http_status", "gtm_container_present", "meta_description_present", "meta_keywords_present"):
+        passed = sum(1 for page in pages if "error" not in page and name not in page["failed_checks"])
+        checks.append(_check(passed == len(pages), name, f"{passed}/{len(pages)} pages"))
+    return {
+        "sitemap": {**sitemap, "pages": len(urls)},
+        "concurrency": concurrency,
+        "summary": {
+            "pages": len(pages),
+            "ok_pages": sum(1 for page in pages if page["ok"]),
+            "status_codes": dict(sorted(status_codes.items())),
+            "ttfb_ms": _percentiles([page["ttfb_ms"] for page in fetched]),
+            "total_ms": _percentiles([page["total_ms"] for page in fetched]),
+            "bytes_read": sum(page["bytes_read"] for page in fetched),
+            "bytes_available": sum(page["bytes_available"] or 0 for page in fetched),
+        },
+        "failures": [
+            {key: page[key] for key in ("url", "status", "failed_checks", "error") if key in page}
+            for page in pages
+            if not page["ok"]
+        ],
+        "checks": checks if pages else [_check(False, "pages_discovered", "sitemap lists no pages")],
+        "pages": pages,
+    }
+
+
+def _perf_checks(report: dict[str, Any], pages: list[str], concurrency: int) -> None:
+    if cassette.active() is not None:
+        # Cassettes keep neither binary bodies nor delivery headers, so there is nothing to audit.
+        report["performance"] = {"skipped": "cassette"}
+        return
+    performance = perf_audit.audit(pages, concurrency)
+    violations = [item for page in performance["pages"] for item in page["violations"]]
+    report["performance"] = performance
+    report["checks"].append(
+        _check(not performance["issues"], "perf_delivery", f"{len(performance['issues'])} compression/caching issues")
     )
+    report["checks"].append(_check(not violations, "perf_budget", f"{len(violations)} page budget violations"))
 
-    ok = all(bool(item["ok"]) for item in checks)
 
-    report = {
-        "run_id": args.run_id,
-        "generated_at": utc_now_iso(),
-        "url": target_url,
-        "checks": checks,
-        "ok": ok,
-    }
+def _output_path(run_id: str, output: str) -> pathlib.Path:
+    return pathlib.Path(output).resolve() if output else RUNS_ROOT / run_id / "postcheck-report.json"
+
+
+def run_step(
+    *,
+    run_id: str,
+    url: str = "",
+    output: str = "",
+    crawl: str | bool = False,
+    concurrency: int | str = DEFAULT_CONCURRENCY,
+    max_pages: int | str = 0,
+    perf: str | bool = False,
+) -> dict[str, Any]:
+    """Run smoke checks against the live site and return the postcheck report.
+
+    With ``crawl`` every page in the sitemap is fetched, ``concurrency`` at a
+    time, and checked; the report adds TTFB/total-time percentiles, status
+    codes and per-page failures. With ``perf`` the same pages also get the
+    ``perf_audit`` delivery checks and weight budgets.
+    """
+    output_path = _output_path(run_id, output)
+
+    try:
+        env = env_required(["GTM_CONTAINER_ID"])
+    except RuntimeError as exc:
+        raise StepError(str(exc)) from exc
+
+    target_url = url.strip() or env_optional("SITE_URL", "https://ozlemmurzoglu.com")
+
+    if parse_bool(crawl):
+        try:
+            crawled = _crawl(target_url, env["GTM_CONTAINER_ID"], int(concurrency), int(max_pages))
+        except Exception as exc:  # noqa: BLE001
+            raise StepError("Postcheck crawl failed.", {"reason": str(exc), "url": target_url}) from exc
+        report = {
+            "run_id": run_id,
+            "generated_at": utc_now_iso(),
+            "url": target_url,
+            "mode": "crawl",
+            **crawled,
+        }
+        pages = [page["url"] for page in crawled["pages"] if page["status"] == 200]
+    else:
+        try:
+            status, head, stats = _read_page(target_url)
+        except Exception as exc:  # noqa: BLE001
+            raise StepError("Postcheck request failed.", {"reason": str(exc), "url": target_url}) from exc
+
+        checks = _page_checks(status, head, env["GTM_CONTAINER_ID"])
+        report = {
+            "run_id": run_id,
+            "generated_at": utc_now_iso(),
+            "url": target_url,
+            **stats,
+            "head": head.summary(),
+            "checks": checks,
+        }
+        pages = [target_url] if status == 200 else []
+
+    if parse_bool(perf):
+        _perf_checks(report, pages, int(concurrency))
+    report["ok"] = all(bool(item["ok"]) for item in report["checks"])
 
     write_json(output_path, report)
 
-    if not ok:
-        fail("Postcheck failed.", {"report": str(output_path)}, exit_code=2)
+    if not report["ok"]:
+        raise StepError("Postcheck failed.", {"report": str(output_path)}, exit_code=2)
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run smoke checks on live site")
+    parser.add_argument("--run-id", required=True)
+    parser.add_argument("--url", default="")
+    parser.add_argument("--output", default="")
+    parser.add_argument("--crawl", default="false", help="Check every page listed in the sitemap.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Pages fetched at once.")
+    parser.add_argument("--max-pages", type=int, default=0, help="Crawl at most this many pages (0 = all).")
+    parser.add_argument("--perf", default="false", help="Audit compression, caching and page weight.")
+    args = parser.parse_args()
 
-    success({"run_id": args.run_id, "postcheck_report": str(output_path), "url": target_url})
+    report = run_cli_step(
+        run_step,
+        run_id=args.run_id,
+        url=args.url,
+        output=args.output,
+        crawl=args.crawl,
+        concurrency=args.concurrency,
+        max_pages=args.max_pages,
+        perf=args.perf,
+    )
+    success(
+        {
+            "run_id": args.run_id,
+            "postcheck_report": str(_output_path(args.run_id, args.output)),
+            "url": report["url"],
+        }
+    )
 
 
 if __name__ == "__main__":
@@ -4,10 +4,38 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import pathlib
+import urllib.parse
 from typing import Any
 
-from common import RUNS_ROOT, env_required, fail, google_api_request, refresh_access_token, success, utc_now_iso, write_json
+import cassette
+import gtm_budget
+from common import (
+    RUNS_ROOT,
+    SKILL_ROOT,
+    ConcurrentRequestError,
+    StepError,
+    access_token,
+    env_optional,
+    env_required,
+    file_lock,
+    google_api_request,
+    load_json,
+    parse_bool,
+    run_cli_step,
+    run_concurrently,
+    success,
+    utc_now_iso,
+    write_json,
+    write_json_atomic,
+)
+
+CONTAINER_CACHE_PATH = SKILL_ROOT / ".cache" / "gtm" / "containers.json"
+# Workspace list endpoint -> key of the entity list in its response and in a container version.
+ENTITY_KINDS = {"tags": "tag", "triggers": "trigger", "variables": "variable"}
+# Keys of a workspaceChange entry that are not the changed entity itself.
+CHANGE_META_FIELDS = {"changeStatus"}
 
 
 def _api_path(path: str) -> str:
@@ -21,21 +49,37 @@ def _api_get(token: str, path: str) -> dict[str, Any]:
     return google_api_request(_api_path(path), token=token)
 
 
+def _api_list(token: str, path: str, key: str) -> dict[str, Any]:
+    """GET a list endpoint, following ``nextPageToken``, as one payload holding every ``key`` item."""
+    items: list[dict[str, Any]] = []
+    page_token = ""
+    while True:
+        query = f"?pageToken={urllib.parse.quote(page_token, safe='')}" if page_token else ""
+        payload = _api_get(token, f"{path}{query}")
+        items.extend(payload.get(key, []))
+        page_token = payload.get("nextPageToken", "")
+        if not page_token:
+            return {key: items}
+
+
 def _api_post(token: str, path: str, payload: dict[str, Any] | None = None) -> dict[str, Any]:
     return google_api_request(_api_path(path), method="POST", token=token, payload=payload or {})
 
 
+def _list_containers(token: str, account_id: str) -> list[dict[str, Any]]:
+    return _api_get(token, f"accounts/{account_id}/containers").get("container", [])
+
+
 def _discover_container(token: str, public_id: str) -> dict[str, str]:
+    """Find ``public_id`` by listing the containers of every account concurrently."""
     accounts_payload = _api_get(token, "accounts")
-    accounts = accounts_payload.get("account", [])
-
-    for account in accounts:
-        account_id = account.get("accountId", "")
-        if not account_id:
-            continue
-        containers_payload = _api_get(token, f"accounts/{account_id}/containers")
-        containers = containers_payload.get("container", [])
-        for container in containers:
+    account_ids = [account.get("accountId", "") for account in accounts_payload.get("account", [])]
+    listings = run_concurrently(
+        {account_id: functools.partial(_list_containers, token, account_id) for account_id in account_ids if account_id}
+    )
+
+    for account_id in account_ids:
+        for container in listings.get(account_id, []):
             if container.get("publicId") == public_id:
                 return {
                     "account_id": account_id,
@@ -84,53 +128,289 @@ def _current_live_version(token: str, account_id: str, container_id: str) -> dic
     }
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Publish GTM workspace")
-    parser.add_argument("--run-id", required=True)
-    parser.add_argument("--output", default="")
-    parser.add_argument("--dry-run", default="false")
-    args = parser.parse_args()
+def _entities(payload: dict[str, Any], kind: str) -> dict[str, dict[str, Any]]:
+    singular = ENTITY_KINDS[kind]
+    return {item.get(f"{singular}Id", ""): item for item in payload.get(singular, [])}
+
+
+def _content(entity: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in entity.items() if key not in gtm_budget.COPY_FIELDS}
+
+
+def _entity_changed(before: dict[str, Any], after: dict[str, Any]) -> bool:
+    if before.get("fingerprint") and before.get("fingerprint") == after.get("fingerprint"):
+        return False
+    return _content(before) != _content(after)
 
-    run_dir = RUNS_ROOT / args.run_id
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "gtm-publish-report.json"
 
+def _label(entity_id: str, entities: dict[str, dict[str, Any]]) -> dict[str, str]:
+    return {"id": entity_id, "name": entities[entity_id].get("name", "")}
+
+
+def _entity_diff(live: dict[str, dict[str, Any]], workspace: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Tags, triggers and variables added, removed or changed in the workspace relative to the live version."""
+    diff: dict[str, Any] = {}
+    for kind in ENTITY_KINDS:
+        before, after = live.get(kind, {}), workspace.get(kind, {})
+        diff[kind] = {
+            "added": [_label(entity_id, after) for entity_id in sorted(after.keys() - before.keys())],
+            "removed": [_label(entity_id, before) for entity_id in sorted(before.keys() - after.keys())],
+            "changed": [
+                _label(entity_id, after)
+                for entity_id in sorted(after.keys() & before.keys())
+                if _entity_changed(before[entity_id], after[entity_id])
+            ],
+        }
+    return diff
+
+
+def _diff_size(diff: dict[str, Any]) -> int:
+    return sum(len(entries) for kind in diff.values() for entries in kind.values())
+
+
+def _uncovered_changes(changes: list[dict[str, Any]]) -> list[dict[str, str]]:
+    """Workspace changes to entities the diff does not compare (built-in variables, templates, clients, ...)."""
+    uncovered = []
+    for change in changes:
+        for kind, entity in change.items():
+            if kind in CHANGE_META_FIELDS or kind in ENTITY_KINDS.values():
+                continue
+            uncovered.append(
+                {
+                    "kind": kind,
+                    "name": entity.get("name", "") if isinstance(entity, dict) else "",
+                    "change_status": change.get("changeStatus", ""),
+                }
+            )
+    return uncovered
+
+
+def _state_path(account_id: str, container_id: str) -> pathlib.Path:
+    return CONTAINER_CACHE_PATH.parent / f"state-{account_id}-{container_id}.json"
+
+
+def _workspace_state(token: str, report: dict[str, Any], use_cache: bool) -> dict[str, Any]:
+    """Workspace status, entities and their diff against the live version.
+
+    Cached per container: the workspace entities are reused while the
+    workspace fingerprint is unchanged and the live entities while the live
+    version is, so an untouched workspace costs one GET.
+    """
+    container_path = f"accounts/{report['account_id']}/containers/{report['container_id']}"
+    workspace_path = f"{container_path}/workspaces/{report['workspace_id']}"
+    live_version_id = report.get("live_before", {}).get("container_version_id", "")
+    state_path = _state_path(report["account_id"], report["container_id"])
+    try:
+        cached = load_json(state_path) if use_cache else {}
+    except (OSError, ValueError):
+        cached = {}
+
+    fingerprint = _api_get(token, workspace_path).get("fingerprint", "")
+    fresh_workspace = not (fingerprint and cached.get("workspace_fingerprint") == fingerprint)
+    fresh_live = cached.get("live_version_id") != live_version_id or "live" not in cached
+    if not fresh_workspace and not fresh_live:
+        return {**cached, "source": "cache"}
+
+    tasks = {}
+    if fresh_workspace:
+        tasks["status"] = functools.partial(_api_get, token, f"{workspace_path}/status")
+        tasks.update(
+            {
+                kind: functools.partial(_api_list, token, f"{workspace_path}/{kind}", singular)
+                for kind, singular in ENTITY_KINDS.items()
+            }
+        )
+    if fresh_live and live_version_id:
+        tasks["live"] = functools.partial(_api_get, token, report["live_before"]["version_path"])
+    payloads = run_concurrently(tasks)
+
+    if fresh_workspace:
+        workspace = {kind: _entities(payloads[kind], kind) for kind in ENTITY_KINDS}
+        changes = payloads["status"].get("workspaceChange", [])
+    else:
+        workspace, changes = cached["workspace"], cached["workspace_changes"]
+    if fresh_live:
+        live = {kind: _entities(payloads.get("live", {}), kind) for kind in ENTITY_KINDS}
+    else:
+        live = cached["live"]
+
+    state = {
+        "workspace_fingerprint": fingerprint,
+        "live_version_id": live_version_id,
+        "workspace_changes": changes,
+        "workspace": workspace,
+        "live": live,
+        "diff": _entity_diff(live, workspace),
+        "fetched_at": utc_now_iso(),
+    }
+    if use_cache:
+        write_json_atomic(state_path, state)
+    return {**state, "source": "api"}
+
+
+def _output_path(run_id: str, output: str, snapshot_only: bool = False) -> pathlib.Path:
+    if output:
+        return pathlib.Path(output).resolve()
+    return RUNS_ROOT / run_id / ("gtm-snapshot.json" if snapshot_only else "gtm-publish-report.json")
+
+
+def _container_cache_enabled() -> bool:
+    # Under a cassette every discovery request must reach the recorder/replayer.
+    return parse_bool(env_optional("AUTOPILOT_GTM_CACHE", "true")) and cassette.active() is None
+
+
+def _load_container_cache() -> dict[str, Any]:
+    try:
+        return load_json(CONTAINER_CACHE_PATH)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_container(public_id: str, located: dict[str, str]) -> None:
+    with file_lock(CONTAINER_CACHE_PATH.with_suffix(".lock")):
+        cache = _load_container_cache()
+        cache[public_id] = {**located, "discovered_at": utc_now_iso()}
+        write_json_atomic(CONTAINER_CACHE_PATH, cache)
+
+
+def _cached_container(token: str, public_id: str) -> dict[str, str] | None:
+    """Cached container/workspace for ``public_id``, confirmed with one GET of each; None on a miss."""
+    entry = _load_container_cache().get(public_id)
+    if not entry:
+        return None
+    container_path = f"accounts/{entry['account_id']}/containers/{entry['container_id']}"
+    try:
+        checks = run_concurrently(
+            {
+                "container": functools.partial(_api_get, token, container_path),
+                "workspace": functools.partial(_api_get, token, f"{container_path}/workspaces/{entry['workspace_id']}"),
+            }
+        )
+    except ConcurrentRequestError:
+        return None
+    if checks["container"].get("publicId") != public_id:
+        return None
+    return {
+        "account_id": entry["account_id"],
+        "container_id": entry["container_id"],
+        "container_name": checks["container"].get("name", entry.get("container_name", "")),
+        "workspace_id": entry["workspace_id"],
+        "workspace_name": checks["workspace"].get("name", entry.get("workspace_name", "")),
+    }
+
+
+def _snapshot_container(token: str, public_id: str) -> dict[str, Any]:
+    use_cache = _container_cache_enabled()
+    located = _cached_container(token, public_id) if use_cache else None
+    discovery = "cache"
+    if located is None:
+        discovery = "scan"
+        discovered = _discover_container(token, public_id)
+        workspace = _select_workspace(token, discovered["account_id"], discovered["container_id"])
+        located = {**discovered, **workspace}
+        if use_cache:
+            _store_container(public_id, located)
+    live_before = _current_live_version(token, located["account_id"], located["container_id"])
+    return {
+        "container_public_id": public_id,
+        **located,
+        "discovery": discovery,
+        "live_before": live_before,
+    }
+
+
+def run_step(
+    *,
+    run_id: str,
+    output: str = "",
+    dry_run: str | bool = False,
+    snapshot: str = "",
+    snapshot_only: str | bool = False,
+    snapshot_data: dict[str, Any] | None = None,
+    force: str | bool = False,
+) -> dict[str, Any]:
+    """Create and publish a GTM version (unless dry-run) and return the publish report.
+
+    With ``snapshot_only`` the step stops after container discovery and the
+    live-version lookup, writing that snapshot to ``output``. A later publish
+    can reuse it via ``snapshot`` (path) or ``snapshot_data`` (in memory).
+    A workspace whose tags, triggers and variables match the live version,
+    with no pending change to other entity kinds (``uncovered_changes``), is
+    not published unless ``force``; the entity diff goes in the report.
+    Before publishing, the workspace is checked against the container weight
+    budgets in ``gtm_budget`` and, in ``block`` mode, not published when over.
+    A dry run computes the same diff and budget but never creates a version.
+    """
     try:
         env = env_required(["GTM_CONTAINER_ID", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "GOOGLE_REFRESH_TOKEN"])
     except RuntimeError as exc:
-        fail(str(exc))
+        raise StepError(str(exc)) from exc
 
-    dry_run = args.dry_run.strip().lower() == "true"
+    dry_run = dry_run if isinstance(dry_run, bool) else dry_run.strip().lower() == "true"
+    snapshot_only = parse_bool(snapshot_only)
+    force = parse_bool(force)
+    output_path = _output_path(run_id, output, snapshot_only)
 
     try:
-        token_payload = refresh_access_token()
-        token = token_payload["access_token"]
+        token = access_token()
 
-        discovered = _discover_container(token, env["GTM_CONTAINER_ID"])
-        workspace = _select_workspace(token, discovered["account_id"], discovered["container_id"])
-        live_before = _current_live_version(token, discovered["account_id"], discovered["container_id"])
+        if snapshot_data is None and snapshot and not snapshot_only:
+            snapshot_data = load_json(pathlib.Path(snapshot).resolve())
+        if snapshot_data is None or snapshot_data.get("container_public_id") != env["GTM_CONTAINER_ID"]:
+            snapshot_data = _snapshot_container(token, env["GTM_CONTAINER_ID"])
 
         report: dict[str, Any] = {
-            "run_id": args.run_id,
+            "run_id": run_id,
             "generated_at": utc_now_iso(),
             "dry_run": dry_run,
-            "container_public_id": env["GTM_CONTAINER_ID"],
-            "account_id": discovered["account_id"],
-            "container_id": discovered["container_id"],
-            "container_name": discovered["container_name"],
-            "workspace_id": workspace["workspace_id"],
-            "workspace_name": workspace["workspace_name"],
-            "live_before": live_before,
+            **{key: value for key, value in snapshot_data.items() if key not in {"run_id", "generated_at", "dry_run"}},
         }
 
-        if not dry_run:
+        if snapshot_only:
+            write_json(output_path, report)
+            return report
+
+        account_id = report["account_id"]
+        container_id = report["container_id"]
+
+        state = _workspace_state(token, report, _container_cache_enabled())
+        uncovered = _uncovered_changes(state["workspace_changes"])
+        # Changes the entity diff cannot see still have to be published.
+        changed = _diff_size(state["diff"]) + len(uncovered)
+        report["workspace_changes"] = len(state["workspace_changes"])
+        report["uncovered_changes"] = uncovered
+        report["workspace_state"] = {
+            "source": state["source"],
+            "workspace_fingerprint": state["workspace_fingerprint"],
+            "live_version_id": state["live_version_id"],
+        }
+        report["entity_diff"] = state["diff"]
+        if changed or force:
+            report["budget"] = gtm_budget.evaluate(state["workspace"], state["live"])
+
+        blocked = report.get("budget", {}).get("blocked", False)
+        if not changed and not force:
+            report["skipped"] = {
+                "reason": "workspace_unchanged",
+                "detail": (
+                    f"Workspace {report['workspace_name']} has the same tags, triggers and variables "
+                    "as the live version and no other pending changes; no version created."
+                ),
+            }
+            report["created_version_path"] = ""
+            report["publish_response"] = {"skipped": True}
+        elif blocked:
+            report["created_version_path"] = ""
+            report["publish_response"] = {"skipped": True}
+        elif not dry_run:
             create_payload = _api_post(
                 token,
                 (
-                    f"accounts/{discovered['account_id']}/containers/{discovered['container_id']}"
-                    f"/workspaces/{workspace['workspace_id']}:create_version"
+                    f"accounts/{account_id}/containers/{container_id}"
+                    f"/workspaces/{report['workspace_id']}:create_version"
                 ),
                 {
-                    "name": f"autopilot-{args.run_id}",
+                    "name": f"autopilot-{run_id}",
                     "notes": "GA4+SEO autopilot publish",
                 },
             )
@@ -147,10 +427,43 @@ def main() -> None:
             report["publish_response"] = {"skipped": True}
 
     except Exception as exc:  # noqa: BLE001
-        fail("GTM publish failed.", {"reason": str(exc)})
+        raise StepError("GTM publish failed.", {"reason": str(exc)}) from exc
 
     write_json(output_path, report)
-    success({"run_id": args.run_id, "gtm_publish_report": str(output_path), "dry_run": dry_run})
+    if blocked and not dry_run:
+        raise StepError(
+            "GTM workspace is over its weight budget; no version created.",
+            {"violations": report["budget"]["violations"], "report": str(output_path)},
+        )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Publish GTM workspace")
+    parser.add_argument("--run-id", required=True)
+    parser.add_argument("--output", default="")
+    parser.add_argument("--dry-run", default="false")
+    parser.add_argument("--snapshot", default="", help="Reuse a gtm-snapshot.json written by --snapshot-only.")
+    parser.add_argument("--snapshot-only", default="false")
+    parser.add_argument("--force", default="false", help="Publish even when the workspace has no changes.")
+    args = parser.parse_args()
+
+    report = run_cli_step(
+        run_step,
+        run_id=args.run_id,
+        output=args.output,
+        dry_run=args.dry_run,
+        snapshot=args.snapshot,
+        snapshot_only=args.snapshot_only,
+        force=args.force,
+    )
+    success(
+        {
+            "run_id": args.run_id,
+            "gtm_publish_report": str(_output_path(args.run_id, args.output, parse_bool(args.snapshot_only))),
+            "dry_run": report["dry_run"],
+        }
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Per-API token buckets and retry backoff shared by every Google API caller."""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import email.utils
+import json
+import os
+import pathlib
+import random
+import threading
+import time
+import urllib.parse
+from typing import Any, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts share buckets between threads only
+    fcntl = None  # type: ignore[assignment]
+
+STATE_ROOT = pathlib.Path(__file__).resolve().parents[1] / ".cache" / "ratelimit"
+
+# API name -> (hosts, requests-per-minute env var, default requests per minute).
+APIS = {
+    "ga4": (("analyticsdata.googleapis.com",), "AUTOPILOT_GA4_QPM", 600),
+    "gsc": (("searchconsole.googleapis.com", "www.googleapis.com"), "AUTOPILOT_GSC_QPM", 1200),
+    "gtm": (("tagmanager.googleapis.com",), "AUTOPILOT_GTM_QPM", 15),
+}
+
+# GA4 Data and Search Console queries are read-only, so 5xx and transport errors are safe to retry.
+READ_ONLY_APIS = {"ga4", "gsc"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 32.0
+# Seconds of traffic a bucket may send as a burst; never less than MIN_BURST requests.
+BURST_SECONDS = 10.0
+MIN_BURST = 5.0
+
+_COUNTERS = ("requests", "retries", "rate_limited", "throttled_seconds")
+_SCOPE: contextvars.ContextVar[dict[str, dict[str, float]] | None] = contextvars.ContextVar(
+    "autopilot_rate_limit_scope", default=None
+)
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def api_for_url(url: str) -> str | None:
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    for name, (hosts, _, _) in APIS.items():
+        if host in hosts:
+            return name
+    return None
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Parse a ``Retry-After`` header given either as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(moment.timestamp() - time.time(), 0.0)
+
+
+def backoff_seconds(attempt: int, jitter: bool = True) -> float:
+    """Full-jitter exponential backoff for retry ``attempt`` (0-based); its upper bound without ``jitter``."""
+    ceiling = min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, ceiling) if jitter else ceiling
+
+
+class RateLimiter:
+    """Token bucket per API whose state lives in a small JSON file under ``state_root``.
+
+    Each acquire takes an exclusive lock on the bucket file, refills it,
+    reserves one token (letting the balance go negative) and then sleeps
+    outside the lock until the reservation matures, so threads and
+    processes queue fairly behind one shared rate. A 429 pauses the whole
+    bucket until its ``Retry-After`` has passed.
+    """
+
+    def __init__(self, state_root: pathlib.Path = STATE_ROOT, rates: dict[str, float] | None = None) -> None:
+        self.state_root = state_root
+        self.rates = rates or {name: _env_number(env, default) for name, (_, env, default) in APIS.items()}
+        self.max_retries = int(_env_number("AUTOPILOT_API_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self._locks = {name: threading.Lock() for name in APIS}
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, dict[str, float]] = {name: dict.fromkeys(_COUNTERS, 0) for name in APIS}
+
+    def _count(self, api: str, name: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[api][name] += amount
+            scope = _SCOPE.get()
+            if scope is not None:
+                counters = scope.setdefault(api, dict.fromkeys(_COUNTERS, 0))
+                counters[name] += amount
+
+    @contextlib.contextmanager
+    def _bucket(self, api: str) -> Iterator[dict[str, float]]:
+        path = self.state_root / f"{api}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locks[api], path.open("a+") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                try:
+                    state = json.loads(fh.read() or "{}")
+                except ValueError:
+                    state = {}
+                yield state
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps(state))
+                fh.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def acquire(self, api: str) -> float:
+        """Wait for a token from ``api``'s bucket; returns the seconds spent waiting."""
+        per_minute = self.rates.get(api, 0)
+        self._count(api, "requests")
+        if per_minute <= 0:
+            return 0.0
+        rate = per_minute / 60.0
+        capacity = max(rate * BURST_SECONDS, MIN_BURST)
+        with self._bucket(api) as state:
+            now = time.time()
+            tokens = float(state.get("tokens", capacity))
+            updated = float(state.get("updated", now))
+            tokens = min(capacity, tokens + max(now - updated, 0.0) * rate) - 1
+            state["tokens"] = tokens
+            state["updated"] = now
+            wait = max(-tokens / rate, float(state.get("blocked_until", 0)) - now, 0.0)
+        if wait > 0:
+            self._count(api, "throttled_seconds", wait)
+            time.sleep(wait)
+        return wait
+
+    def block(self, api: str, seconds: float, shared: bool = True) -> None:
+        """Pause every caller of ``api`` for ``seconds`` (a 429 with ``Retry-After``).
+
+        Without ``shared`` the 429 is only counted: the bucket file other runs read is left alone.
+        """
+        self._count(api, "rate_limited")
+        if not shared:
+            return
+        with self._bucket(api) as state:
+            state["blocked_until"] = max(float(state.get("blocked_until", 0)), time.time() + seconds)
+
+    def backoff(self, api: str, attempt: int, retry_after: float | None = None, jitter: bool = True) -> float:
+        """Sleep before retry ``attempt``: jittered exponential, but never less than ``retry_after``.
+
+        Without ``jitter`` the delay is deterministic: ``retry_after`` when given, else the exponential bound.
+        """
+        if jitter:
+            delay = max(backoff_seconds(attempt), retry_after or 0.0)
+        else:
+            delay = retry_after if retry_after is not None else backoff_seconds(attempt, jitter=False)
+        self._count(api, "retries")
+        self._count(api, "throttled_seconds", delay)
+        time.sleep(delay)
+        return delay
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                api: {**counters, "throttled_seconds": round(counters["throttled_seconds"], 3), "qpm": self.rates[api]}
+                for api, counters in self._stats.items()
+            }
+
+
+_LIMITER: RateLimiter | None = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """Process-wide limiter; rates come from ``AUTOPILOT_{GA4,GSC,GTM}_QPM``."""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = RateLimiter()
+        return _LIMITER
+
+
+@contextlib.contextmanager
+def stats_scope() -> Iterator[dict[str, dict[str, float]]]:
+    """Collect per-API retry/throttle counters for calls made in this context."""
+    counters: dict[str, dict[str, float]] = {}
+    token = _SCOPE.set(counters)
+    try:
+        yield counters
+    finally:
+        _SCOPE.reset(token)
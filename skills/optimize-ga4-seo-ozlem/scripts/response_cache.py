@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Local cache for GA4 Data / Search Console report responses."""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Callable
+
+import cassette
+from common import SKILL_ROOT, env_optional, file_lock, load_json, parse_bool, write_json_atomic
+
+CACHE_ROOT = SKILL_ROOT / ".cache" / "responses"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_FRESH_TTL_SECONDS = 3600
+# GA4 and GSC keep revising the most recent days; ranges touching them are provisional.
+PROVISIONAL_DAYS = 3
+
+
+def _range_end(payload: dict[str, Any]) -> str:
+    ends = [item.get("endDate", "") for item in payload.get("dateRanges", [])]
+    if payload.get("endDate"):
+        ends.append(payload["endDate"])
+    # GA4 batchRunReports nests one report request per entry.
+    ends.extend(_range_end(request) for request in payload.get("requests", []))
+    return max(ends) if ends else ""
+
+
+def is_provisional(end_date: str, today: dt.date | None = None) -> bool:
+    """True when ``end_date`` is relative (``today``, ``7daysAgo``) or within the last few days."""
+    try:
+        end = dt.date.fromisoformat(end_date)
+    except ValueError:
+        return True
+    today = today or dt.date.today()
+    return end >= today - dt.timedelta(days=PROVISIONAL_DAYS)
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of JSON responses keyed by namespace + normalized payload.
+
+    Closed historical date ranges never expire; ranges touching the last
+    ``PROVISIONAL_DAYS`` days live for ``fresh_ttl`` seconds. File mtimes
+    track recency, so eviction drops the least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        root: pathlib.Path = CACHE_ROOT,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fresh_ttl: float = DEFAULT_FRESH_TTL_SECONDS,
+        enabled: bool = True,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fresh_ttl = fresh_ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        try:
+            max_mb = float(env_optional("AUTOPILOT_RESPONSE_CACHE_MAX_MB", str(DEFAULT_MAX_BYTES // (1024 * 1024))))
+            fresh_ttl = float(env_optional("AUTOPILOT_RESPONSE_CACHE_TTL", str(DEFAULT_FRESH_TTL_SECONDS)))
+        except ValueError:
+            max_mb, fresh_ttl = DEFAULT_MAX_BYTES / (1024 * 1024), DEFAULT_FRESH_TTL_SECONDS
+        return cls(
+            max_bytes=int(max_mb * 1024 * 1024),
+            fresh_ttl=fresh_ttl,
+            # Under a cassette every request must reach the recorder/replayer.
+            enabled=parse_bool(env_optional("AUTOPILOT_RESPONSE_CACHE", "true")) and cassette.active() is None,
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def key(self, namespace: str, payload: dict[str, Any]) -> str:
+        normalized = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(f"{namespace}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get_or_fetch(
+        self,
+        namespace: str,
+        payload: dict[str, Any],
+        fetch: Callable[[], dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Return the cached response for ``(namespace, payload)`` or call ``fetch`` and store it."""
+        if not self.enabled:
+            return fetch()
+
+        path = self.root / f"{self.key(namespace, payload)}.json"
+        try:
+            entry = load_json(path)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None:
+            expires_at = entry.get("expires_at")
+            if expires_at is None or time.time() < float(expires_at):
+                self._count("hits")
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return entry["response"]
+            self._count("expired")
+        self._count("misses")
+
+        response = fetch()
+        provisional = is_provisional(_range_end(payload))
+        write_json_atomic(
+            path,
+            {
+                "namespace": namespace,
+                "stored_at": time.time(),
+                "expires_at": time.time() + self.fresh_ttl if provisional else None,
+                "payload": payload,
+                "response": response,
+            },
+        )
+        self._count("stores")
+        self._evict()
+        return response
+
+    def _evict(self) -> None:
+        with file_lock(self.root / ".evict.lock"):
+            entries = []
+            total = 0
+            for path in self.root.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                self._count("evictions")
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
@@ -7,15 +7,16 @@ import argparse
 import pathlib
 from typing import Any
 
+import build_cache
+import deploy_hosting
 from common import (
-    REPO_ROOT,
     RUNS_ROOT,
-    env_optional,
+    StepError,
+    access_token,
     google_api_request,
     load_json,
-    refresh_access_token,
     restore_file,
-    run_command,
+    run_cli_step,
     success,
     utc_now_iso,
     write_json,
@@ -27,25 +28,41 @@ def _publish_version(token: str, version_path: str) -> dict[str, Any]:
     return google_api_request(url, method="POST", token=token, payload={})
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Rollback autopilot run using rollback-manifest.json")
-    parser.add_argument("--run-id", required=True)
-    parser.add_argument("--output", default="")
-    parser.add_argument("--skip-gtm", default="false")
-    parser.add_argument("--skip-deploy", default="false")
-    args = parser.parse_args()
+def _failed_deploy_snapshot(run_dir: pathlib.Path) -> dict[str, Any]:
+    """Pre-deploy snapshot from a deploy report the manifest never recorded (the deploy step failed)."""
+    try:
+        return load_json(run_dir / "deploy-report.json").get("previous_snapshot", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _output_path(run_id: str, output: str) -> pathlib.Path:
+    return pathlib.Path(output).resolve() if output else RUNS_ROOT / run_id / "rollback-report.json"
+
+
+def _flag(value: str | bool) -> bool:
+    return value if isinstance(value, bool) else value.strip().lower() == "true"
+
 
-    run_dir = RUNS_ROOT / args.run_id
+def run_step(
+    *,
+    run_id: str,
+    output: str = "",
+    skip_gtm: str | bool = False,
+    skip_deploy: str | bool = False,
+) -> dict[str, Any]:
+    """Restore backups, re-publish GTM and redeploy hosting per the manifest; return the rollback report."""
+    run_dir = RUNS_ROOT / run_id
     manifest_path = run_dir / "rollback-manifest.json"
-    output_path = pathlib.Path(args.output).resolve() if args.output else run_dir / "rollback-report.json"
+    output_path = _output_path(run_id, output)
 
     manifest = load_json(manifest_path)
 
-    skip_gtm = args.skip_gtm.strip().lower() == "true"
-    skip_deploy = args.skip_deploy.strip().lower() == "true"
+    skip_gtm = _flag(skip_gtm)
+    skip_deploy = _flag(skip_deploy)
 
     report: dict[str, Any] = {
-        "run_id": args.run_id,
+        "run_id": run_id,
         "generated_at": utc_now_iso(),
         "restored_files": [],
         "gtm": {"attempted": False, "skipped": skip_gtm},
@@ -62,8 +79,7 @@ def main() -> None:
     if previous_version and not skip_gtm:
         report["gtm"]["attempted"] = True
         try:
-            token_payload = refresh_access_token()
-            publish_response = _publish_version(token_payload["access_token"], previous_version)
+            publish_response = _publish_version(access_token(), previous_version)
             report["gtm"]["ok"] = True
             report["gtm"]["response"] = publish_response
             report["gtm"]["version_path"] = previous_version
@@ -75,16 +91,48 @@ def main() -> None:
 
     if manifest.get("deploy", {}).get("enabled") and not skip_deploy:
         report["deploy"]["attempted"] = True
-        script = run_dir.parents[1] / "scripts" / "deploy_hosting.py"
-        cmd = ["python3", str(script), "--run-id", args.run_id, "--dry-run", "false"]
-        deploy_res = run_command(cmd, cwd=REPO_ROOT)
-        report["deploy"]["return_code"] = deploy_res.returncode
-        report["deploy"]["stdout"] = deploy_res.stdout
-        report["deploy"]["stderr"] = deploy_res.stderr
-        report["deploy"]["ok"] = deploy_res.returncode == 0
+        # Redeploy the tree that was live before the run; rebuild only when no snapshot is available.
+        previous = manifest["deploy"].get("previous_snapshot") or _failed_deploy_snapshot(run_dir)
+        snapshot = previous.get("digest", "")
+        if snapshot and not build_cache.DeploySnapshots.from_env().has(snapshot):
+            report["deploy"]["missing_snapshot"] = snapshot
+            snapshot = ""
+        report["deploy"]["mode"] = "snapshot" if snapshot else "rebuild"
+        report["deploy"]["snapshot"] = snapshot
+        try:
+            # The live snapshot already points at this run's deploy, so the no-op checks must not apply.
+            deploy_report = deploy_hosting.run_step(run_id=run_id, dry_run=False, snapshot=snapshot, force=True)
+            report["deploy"]["return_code"] = 0
+            report["deploy"]["steps"] = deploy_report["steps"]
+            if deploy_report.get("skipped"):
+                report["deploy"]["skipped"] = deploy_report["skipped"]
+            report["deploy"]["ok"] = not deploy_report.get("skipped")
+        except StepError as exc:
+            report["deploy"]["return_code"] = exc.exit_code
+            report["deploy"]["error"] = str(exc)
+            report["deploy"]["details"] = exc.details
+            report["deploy"]["ok"] = False
 
     write_json(output_path, report)
-    success({"run_id": args.run_id, "rollback_report": str(output_path)})
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rollback autopilot run using rollback-manifest.json")
+    parser.add_argument("--run-id", required=True)
+    parser.add_argument("--output", default="")
+    parser.add_argument("--skip-gtm", default="false")
+    parser.add_argument("--skip-deploy", default="false")
+    args = parser.parse_args()
+
+    run_cli_step(
+        run_step,
+        run_id=args.run_id,
+        output=args.output,
+        skip_gtm=args.skip_gtm,
+        skip_deploy=args.skip_deploy,
+    )
+    success({"run_id": args.run_id, "rollback_report": str(_output_path(args.run_id, args.output))})
 
 
 if __name__ == "__main__":
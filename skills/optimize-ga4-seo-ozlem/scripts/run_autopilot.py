@@ -4,58 +4,490 @@
 from __future__ import annotations
 
 import argparse
+import contextvars
+import datetime as dt
+import hashlib
+import importlib
+import json
+import os
 import pathlib
-from typing import Any
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
 
 from common import (
     RUNS_ROOT,
+    StepError,
+    date_window,
     env_required,
     fail,
+    file_digest,
+    http_pool_stats,
+    http_stats_scope,
     load_json,
     make_run_id,
     parse_bool,
+    parse_json_output,
+    profiled,
+    rate_limit_scope,
+    rate_limit_stats,
     run_command,
+    span,
     success,
     utc_now_iso,
     write_json,
+    write_json_atomic,
 )
 
+# Options a resumed run inherits from its checkpoint unless given again on the command line.
+RESUME_OPTIONS = (
+    "window",
+    "lang",
+    "goal",
+    "mode",
+    "publish",
+    "dry_run",
+    "incremental",
+    "gsc_paginate",
+    "gsc_shards",
+    "postcheck_crawl",
+    "postcheck_concurrency",
+    "postcheck_perf",
+)
+
+# Steps whose effects a rollback undoes; a resume after rollback must run them again.
+REVERTED_BY_ROLLBACK = ("apply_seo", "deploy_hosting", "publish_gtm")
+
+# Environment each step reads beyond OAuth credentials; values feed the step fingerprint.
+STEP_ENV = {
+    "fetch_ga4_gsc": ("GA4_PROPERTY_ID", "GSC_SITE_URL", "AUTOPILOT_GSC_SHARD_COUNTRIES"),
+    "generate_plan": (),
+    "apply_seo": ("GA4_MEASUREMENT_ID", "GTM_CONTAINER_ID", "GOOGLE_SITE_VERIFICATION"),
+    "deploy_hosting": ("FIREBASE_PROJECT_ID",),
+    "publish_gtm": ("GTM_CONTAINER_ID",),
+    "postcheck": ("GTM_CONTAINER_ID", "SITE_URL"),
+}
+
 
 def _script_path(name: str) -> pathlib.Path:
     return pathlib.Path(__file__).resolve().parent / f"{name}.py"
 
 
-def _run_python(script: str, args: list[str]) -> dict[str, Any]:
+def _cli_args(params: dict[str, Any]) -> list[str]:
+    args: list[str] = []
+    for key, value in params.items():
+        args.append("--" + key.replace("_", "-"))
+        args.append(str(value).lower() if isinstance(value, bool) else str(value))
+    return args
+
+
+def _run_python(script: str, args: list[str], log_path: pathlib.Path | None = None) -> dict[str, Any]:
+    """Run ``script`` as a child process; its ``success``/``fail`` JSON becomes ``result``/``error`` fields."""
     cmd = ["python3", str(_script_path(script)), *args]
-    res = run_command(cmd)
-    return {
-        "script": script,
-        "command": cmd,
-        "return_code": res.returncode,
-        "stdout": res.stdout,
-        "stderr": res.stderr,
+    started = time.monotonic()
+    res = run_command(cmd, log_path=log_path)
+    record: dict[str, Any] = {"script": script, "mode": "subprocess", "command": cmd, **res.record()}
+    result = parse_json_output(res.stdout)
+    if isinstance(result, dict):
+        record["result"] = result
+        del record["stdout"]
+    elif not res.stdout:
+        del record["stdout"]
+    error = parse_json_output(res.stderr)
+    if isinstance(error, dict) and "error" in error:
+        record["error"] = error["error"]
+        record["details"] = error.get("details", {})
+        del record["stderr"]
+    elif not res.stderr:
+        del record["stderr"]
+    record["duration_seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def _run_inprocess(
+    script: str,
+    params: dict[str, Any],
+    inputs: dict[str, Any] | None = None,
+) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    """Call ``<script>.run_step`` in this interpreter; returns the step record and its report."""
+    module = importlib.import_module(script)
+    record: dict[str, Any] = {"script": script, "mode": "inprocess", "params": params}
+    started = time.monotonic()
+    report: dict[str, Any] | None = None
+    with http_stats_scope() as http_counters, rate_limit_scope() as api_counters, profiled(script) as profile:
+        try:
+            report = module.run_step(**params, **(inputs or {}))
+            record["return_code"] = 0
+        except StepError as exc:
+            record["return_code"] = exc.exit_code
+            record["error"] = str(exc)
+            record["details"] = exc.details
+        except Exception as exc:  # noqa: BLE001
+            record["return_code"] = 1
+            record["error"] = f"{type(exc).__name__}: {exc}"
+    record["http"] = dict(http_counters)
+    if profile:
+        record["profile"] = profile
+    if api_counters:
+        record["api"] = {
+            name: {**counters, "throttled_seconds": round(counters["throttled_seconds"], 3)}
+            for name, counters in api_counters.items()
+        }
+    record["duration_seconds"] = round(time.monotonic() - started, 3)
+    return record, report
+
+
+def _run_step(
+    runner: str,
+    script: str,
+    params: dict[str, Any],
+    inputs: dict[str, Any] | None = None,
+    log_path: pathlib.Path | None = None,
+) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    """Run one pipeline step with the selected runner.
+
+    In-process steps receive upstream reports through ``inputs`` and hand back
+    their own report; the subprocess runner only exchanges artifact paths, so
+    callers re-read outputs from disk when the report comes back as ``None``.
+    Subprocess output is streamed to ``log_path``.
+    """
+    if runner == "inprocess":
+        return _run_inprocess(script, params, inputs)
+    return _run_python(script, _cli_args(params), log_path), None
+
+
+def _precise_now_iso() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _run_node(
+    runner: str,
+    node: dict[str, Any],
+    inputs: dict[str, Any],
+    clock_start: float,
+) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    started_at = _precise_now_iso()
+    start_offset = time.monotonic() - clock_start
+    with span(node["name"], "step", script=node["script"], runner=runner) as current:
+        log_path = pathlib.Path(node["log"]) if node.get("log") else None
+        record, report = _run_step(runner, node["script"], node["params"], inputs, log_path)
+        current.set(return_code=record["return_code"])
+    record = {
+        "step": node["name"],
+        **record,
+        "started_at": started_at,
+        "finished_at": _precise_now_iso(),
+        "start_offset_seconds": round(start_offset, 3),
+        "end_offset_seconds": round(time.monotonic() - clock_start, 3),
     }
+    return record, report
 
 
-def _run_or_fail(script: str, args: list[str], steps: list[dict[str, Any]]) -> None:
-    result = _run_python(script, args)
-    steps.append(result)
-    if result["return_code"] != 0:
-        fail(
-            f"Pipeline step failed: {script}",
-            {
-                "command": result["command"],
-                "stdout": result["stdout"],
-                "stderr": result["stderr"],
+def _fingerprint(node: dict[str, Any]) -> str:
+    """Hash what a step's output depends on: script source, params, input artifacts, env and date window."""
+    material = {
+        "script": node["script"],
+        "source": file_digest(_script_path(node["script"])),
+        "params": node["params"],
+        "inputs": {path: file_digest(pathlib.Path(path)) for path in node["inputs"]},
+        "env": {name: os.getenv(name, "") for name in STEP_ENV.get(node["script"], ())},
+    }
+    if "window" in node["params"]:
+        # A relative window such as 28d covers different dates on a later day.
+        material["dates"] = date_window(node["params"]["window"])
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class StepCheckpoint:
+    """Fingerprints of completed steps, persisted to ``checkpoint.json`` after every change.
+
+    A step is up to date when its fingerprint matches the recorded one and
+    its output artifact still has the recorded digest.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        try:
+            self.state = load_json(path)
+        except (OSError, ValueError):
+            self.state = {"options": {}, "steps": {}}
+
+    def _save(self) -> None:
+        write_json_atomic(self.path, self.state)
+
+    def set_options(self, options: dict[str, Any]) -> None:
+        self.state["options"] = options
+        self._save()
+
+    def up_to_date(self, node: dict[str, Any], fingerprint: str) -> bool:
+        entry = self.state["steps"].get(node["name"])
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        return entry.get("output_digest") == file_digest(pathlib.Path(node["output"]))
+
+    def complete(self, node: dict[str, Any], fingerprint: str) -> None:
+        self.state["steps"][node["name"]] = {
+            "fingerprint": fingerprint,
+            "output_digest": file_digest(pathlib.Path(node["output"])),
+            "completed_at": utc_now_iso(),
+        }
+        self._save()
+
+    def invalidate(self, names: list[str]) -> None:
+        for name in names:
+            self.state["steps"].pop(name, None)
+        self._save()
+
+
+def _ready(pending: list[dict[str, Any]], reports: dict[str, Any]) -> list[dict[str, Any]]:
+    return [node for node in pending if all(artifact in reports for artifact in node["needs"])]
+
+
+def _critical_path(nodes: list[dict[str, Any]], steps: list[dict[str, Any]]) -> list[str]:
+    """Walk back from the last node to finish through its latest-finishing dependency."""
+    ends = {step["step"]: step["end_offset_seconds"] for step in steps if "end_offset_seconds" in step}
+    if not ends:
+        return []
+    producers = {node["produces"]: node for node in nodes}
+    by_name = {node["name"]: node for node in nodes}
+    current = max(ends, key=ends.__getitem__)
+    path = [current]
+    while True:
+        upstream = [
+            producers[artifact]["name"]
+            for artifact in by_name[current]["needs"]
+            if artifact in producers and producers[artifact]["name"] in ends
+        ]
+        if not upstream:
+            break
+        current = max(upstream, key=ends.__getitem__)
+        path.append(current)
+    return list(reversed(path))
+
+
+def _run_pipeline(
+    runner: str,
+    nodes: list[dict[str, Any]],
+    steps: list[dict[str, Any]],
+    *,
+    workers: int,
+    on_complete: Callable[[dict[str, Any], dict[str, Any] | None], None],
+    checkpoint: StepCheckpoint | None = None,
+    resume: bool = False,
+) -> None:
+    """Run ``nodes`` as a DAG on a small worker pool.
+
+    A node starts once every artifact in its ``needs`` has been produced.
+    After the first failure no new nodes are started; in-flight nodes are
+    allowed to finish before the pipeline fails, so rollback sees a settled
+    tree. ``on_complete`` runs on the scheduling thread for each success.
+    Successes are recorded in ``checkpoint``; with ``resume``, a node whose
+    fingerprint and output are unchanged is skipped.
+    """
+    producers = {node["produces"] for node in nodes}
+    missing = sorted({artifact for node in nodes for artifact in node["needs"]} - producers)
+    if missing:
+        fail("Pipeline graph has inputs no step produces.", {"missing": missing})
+
+    reports: dict[str, dict[str, Any] | None] = {}
+    pending = list(nodes)
+    running: dict[Future[tuple[dict[str, Any], dict[str, Any] | None]], dict[str, Any]] = {}
+    failed: dict[str, Any] | None = None
+    fingerprints: dict[str, str] = {}
+    clock_start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="autopilot") as pool:
+        while pending or running:
+            ready = _ready(pending, reports) if failed is None else []
+            while ready:
+                node = ready.pop(0)
+                pending.remove(node)
+                fingerprint = fingerprints[node["name"]] = _fingerprint(node)
+                if resume and checkpoint is not None and checkpoint.up_to_date(node, fingerprint):
+                    steps.append(
+                        {
+                            "step": node["name"],
+                            "script": node["script"],
+                            "return_code": 0,
+                            "skipped": True,
+                            "skip_reason": "unchanged",
+                            "completed_at": checkpoint.state["steps"][node["name"]]["completed_at"],
+                        }
+                    )
+                    # Downstream steps read the skipped step's artifact from disk.
+                    reports[node["produces"]] = None
+                    on_complete(node, None)
+                    ready = _ready(pending, reports)
+                    continue
+                inputs = {
+                    kwarg: reports[artifact]
+                    for artifact, kwarg in node.get("pass_as", {}).items()
+                    if reports.get(artifact) is not None
+                }
+                # Copy the context so step spans nest under the pipeline span.
+                future = pool.submit(contextvars.copy_context().run, _run_node, runner, node, inputs, clock_start)
+                running[future] = node
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                record, report = future.result()
+                steps.append(record)
+                if record["return_code"] != 0:
+                    failed = failed or record
+                    continue
+                reports[node["produces"]] = report
+                if checkpoint is not None:
+                    checkpoint.complete(node, fingerprints[node["name"]])
+                on_complete(node, report)
+
+    if failed is not None:
+        keys = ("command", "stdout", "stderr", "error", "details", "log")
+        details = {key: failed[key] for key in keys if key in failed}
+        fail(f"Pipeline step failed: {failed['step']}", details)
+    if pending:
+        fail("Pipeline graph has a dependency cycle.", {"blocked": [node["name"] for node in pending]})
+
+
+def _pipeline_nodes(
+    args: argparse.Namespace,
+    run_id: str,
+    paths: dict[str, pathlib.Path],
+    *,
+    publish: bool,
+    dry_run: bool,
+    force_publish: bool = False,
+) -> list[dict[str, Any]]:
+    """Declare pipeline steps with the artifacts they consume and produce.
+
+    ``pass_as`` maps an upstream artifact to the ``run_step`` keyword that
+    receives its report in memory when running in-process.
+    """
+    nodes: list[dict[str, Any]] = [
+        {
+            "name": "fetch_ga4_gsc",
+            "script": "fetch_ga4_gsc",
+            "params": {
+                "window": args.window,
+                "run_id": run_id,
+                "goal": args.goal,
+                "incremental": parse_bool(args.incremental),
+                "gsc_paginate": parse_bool(args.gsc_paginate),
+                "gsc_shards": parse_bool(args.gsc_shards),
+                "output": str(paths["analysis"]),
             },
-        )
+            "needs": [],
+            "produces": "analysis",
+        },
+        {
+            "name": "generate_plan",
+            "script": "generate_plan",
+            "params": {"analysis": str(paths["analysis"]), "lang": args.lang, "output": str(paths["plan"])},
+            "needs": ["analysis"],
+            "produces": "plan",
+            "pass_as": {"analysis": "analysis_data"},
+        },
+        {
+            "name": "apply_seo",
+            "script": "apply_seo",
+            "params": {
+                "plan": str(paths["plan"]),
+                "run_id": run_id,
+                "dry_run": dry_run,
+                "output": str(paths["execution_report"]),
+            },
+            "needs": ["plan"],
+            "produces": "execution_report",
+            "pass_as": {"plan": "plan_data"},
+        },
+    ]
+    postcheck_needs = ["execution_report"]
 
+    if publish:
+        nodes.extend(
+            [
+                {
+                    "name": "deploy_hosting",
+                    "script": "deploy_hosting",
+                    "params": {
+                        "run_id": run_id,
+                        "dry_run": dry_run,
+                        "force": force_publish,
+                        "output": str(paths["deploy_report"]),
+                    },
+                    "needs": ["execution_report"],
+                    "produces": "deploy_report",
+                },
+                {
+                    "name": "gtm_snapshot",
+                    "script": "publish_gtm",
+                    "params": {"run_id": run_id, "snapshot_only": True, "output": str(paths["gtm_snapshot"])},
+                    "needs": [],
+                    "produces": "gtm_snapshot",
+                },
+                {
+                    "name": "publish_gtm",
+                    "script": "publish_gtm",
+                    "params": {
+                        "run_id": run_id,
+                        "dry_run": dry_run,
+                        "force": force_publish,
+                        "snapshot": str(paths["gtm_snapshot"]),
+                        "output": str(paths["gtm_report"]),
+                    },
+                    "needs": ["deploy_report", "gtm_snapshot"],
+                    "produces": "gtm_report",
+                    "pass_as": {"gtm_snapshot": "snapshot_data"},
+                },
+            ]
+        )
+        postcheck_needs.extend(["deploy_report", "gtm_report"])
 
-def _auto_rollback(run_id: str, reason: str, steps: list[dict[str, Any]]) -> None:
-    rollback_result = _run_python(
-        "rollback",
-        ["--run-id", run_id, "--skip-deploy", "true"],
+    nodes.append(
+        {
+            "name": "postcheck",
+            "script": "postcheck",
+            "params": {
+                "run_id": run_id,
+                "output": str(paths["postcheck_report"]),
+                "crawl": parse_bool(args.postcheck_crawl),
+                "concurrency": args.postcheck_concurrency,
+                "perf": parse_bool(args.postcheck_perf),
+            },
+            "needs": postcheck_needs,
+            "produces": "postcheck_report",
+        }
     )
+    for node in nodes:
+        node["inputs"] = [str(paths[artifact]) for artifact in node["needs"]]
+        node["output"] = str(paths[node["produces"]])
+        node["log"] = str(paths["logs"] / f"{node['name']}.log.gz")
+    return nodes
+
+
+def _change_summary(paths: dict[str, pathlib.Path], *, publish: bool) -> dict[str, Any]:
+    """What the run actually shipped: apply_seo file changes, hosting deploy and GTM publish."""
+    execution = load_json(paths["execution_report"])
+    summary: dict[str, Any] = {"apply_seo_changes": len(execution.get("changes", []))}
+    shipped = False
+    if publish:
+        for name, artifact in (("deploy", "deploy_report"), ("gtm", "gtm_report")):
+            report = load_json(paths[artifact]) if paths[artifact].exists() else {}
+            reason = "dry_run" if report.get("dry_run") else report.get("skipped", {}).get("reason", "")
+            summary[name] = {"shipped": not reason, "skip_reason": reason}
+            if report.get("skipped"):
+                summary[name]["detail"] = report["skipped"]["detail"]
+            shipped = shipped or not reason
+    summary["no_op"] = not shipped
+    return summary
+
+
+def _auto_rollback(runner: str, run_id: str, reason: str, steps: list[dict[str, Any]]) -> None:
+    params = {"run_id": run_id, "skip_deploy": True}
+    log_path = RUNS_ROOT / run_id / "logs" / "rollback.log.gz"
+    rollback_result, _ = _run_step(runner, "rollback", params, log_path=log_path)
     rollback_result["auto_reason"] = reason
     steps.append(rollback_result)
 
@@ -68,14 +500,73 @@ def main() -> None:
     parser.add_argument("--mode", default="full-auto")
     parser.add_argument("--publish", default="false")
     parser.add_argument("--dry-run", default="true")
+    parser.add_argument(
+        "--force-publish",
+        default="false",
+        help="Deploy and publish GTM even when nothing changed since the live versions.",
+    )
     parser.add_argument("--rollback", default="")
+    parser.add_argument(
+        "--resume",
+        default="",
+        help="Continue an earlier run ID, skipping steps whose inputs and outputs are unchanged.",
+    )
+    parser.add_argument(
+        "--runner",
+        choices=["inprocess", "subprocess"],
+        default="inprocess",
+        help="Run steps in this interpreter (default) or as one python3 process per step.",
+    )
+    parser.add_argument(
+        "--incremental",
+        default="false",
+        help="Aggregate GA4/GSC windows from the day-partitioned store, fetching only missing days.",
+    )
+    parser.add_argument("--gsc-paginate", default="false", help="Fetch every GSC row into streamed JSONL artifacts.")
+    parser.add_argument("--gsc-shards", default="false", help="Fetch GSC as day x device x country shards.")
+    parser.add_argument("--postcheck-crawl", default="false", help="Postcheck every page listed in the sitemap.")
+    parser.add_argument("--postcheck-concurrency", type=int, default=8, help="Pages the crawl fetches at once.")
+    parser.add_argument("--postcheck-perf", default="false", help="Audit compression, caching and page weight.")
+    parser.add_argument("--workers", type=int, default=3, help="Maximum number of steps running at once.")
+    parser.add_argument(
+        "--cassette",
+        choices=["off", "record", "replay"],
+        default="off",
+        help="Record Google API/OAuth traffic to a cassette, or serve it back offline.",
+    )
+    parser.add_argument(
+        "--cassette-path",
+        default="",
+        help="Cassette file; defaults to runs/<run_id>/cassette.jsonl when recording, required for replay.",
+    )
+    parser.add_argument(
+        "--profile",
+        default="false",
+        help="Dump cProfile stats and tracemalloc peak memory per step under runs/<run_id>/profile/.",
+    )
     args = parser.parse_args()
+    resume_id = args.resume.strip()
+    checkpoint: StepCheckpoint | None = None
+    if resume_id:
+        checkpoint = StepCheckpoint(RUNS_ROOT / resume_id / "checkpoint.json")
+        if not checkpoint.path.exists():
+            fail(f"No checkpoint to resume for run {resume_id}.", {"checkpoint": str(checkpoint.path)})
+        # Options given again on the command line override the ones the run started with.
+        parser.set_defaults(**checkpoint.state["options"])
+        args = parser.parse_args()
+    runner = args.runner
 
     if args.rollback.strip():
-        rollback_result = _run_python("rollback", ["--run-id", args.rollback.strip()])
+        rollback_id = args.rollback.strip()
+        rollback_result, _ = _run_step(
+            runner, "rollback", {"run_id": rollback_id}, log_path=RUNS_ROOT / rollback_id / "logs" / "rollback.log.gz"
+        )
         if rollback_result["return_code"] != 0:
             fail("Rollback execution failed.", rollback_result)
-        success({"rollback_run_id": args.rollback.strip(), "details": rollback_result})
+        rolled_back = StepCheckpoint(RUNS_ROOT / rollback_id / "checkpoint.json")
+        if rolled_back.path.exists():
+            rolled_back.invalidate(list(REVERTED_BY_ROLLBACK))
+        success({"rollback_run_id": rollback_id, "details": rollback_result})
         return
 
     if args.mode != "full-auto":
@@ -102,16 +593,45 @@ def main() -> None:
     except RuntimeError as exc:
         fail(str(exc))
 
-    run_id = make_run_id()
+    if parse_bool(args.incremental) and (parse_bool(args.gsc_paginate) or parse_bool(args.gsc_shards)):
+        fail("--incremental cannot be combined with --gsc-paginate or --gsc-shards.")
+    if args.cassette == "replay" and not args.cassette_path.strip():
+        fail("--cassette replay needs --cassette-path pointing at a recorded cassette.")
+
+    run_id = resume_id or make_run_id()
     run_dir = RUNS_ROOT / run_id
     run_dir.mkdir(parents=True, exist_ok=True)
-
-    analysis_path = run_dir / "analysis.json"
-    plan_path = run_dir / "plan-90d.json"
-    execution_path = run_dir / "execution-report.json"
-    deploy_path = run_dir / "deploy-report.json"
-    gtm_path = run_dir / "gtm-publish-report.json"
-    postcheck_path = run_dir / "postcheck-report.json"
+    if checkpoint is None:
+        checkpoint = StepCheckpoint(run_dir / "checkpoint.json")
+        checkpoint.set_options({name: getattr(args, name) for name in RESUME_OPTIONS})
+
+    cassette_path = ""
+    if args.cassette != "off":
+        path = pathlib.Path(args.cassette_path).resolve() if args.cassette_path.strip() else run_dir / "cassette.jsonl"
+        if args.cassette == "record":
+            path.unlink(missing_ok=True)
+        cassette_path = str(path)
+        # Environment, so subprocess steps pick up the same cassette.
+        os.environ["AUTOPILOT_CASSETTE_MODE"] = args.cassette
+        os.environ["AUTOPILOT_CASSETTE"] = cassette_path
+
+    # Set through the environment so subprocess steps share the trace file and profile directory.
+    trace_path = run_dir / "trace.jsonl"
+    os.environ["AUTOPILOT_TRACE"] = str(trace_path)
+    profile = parse_bool(args.profile)
+    if profile:
+        os.environ["AUTOPILOT_PROFILE_DIR"] = str(run_dir / "profile")
+
+    paths = {
+        "analysis": run_dir / "analysis.json",
+        "plan": run_dir / "plan-90d.json",
+        "execution_report": run_dir / "execution-report.json",
+        "deploy_report": run_dir / "deploy-report.json",
+        "gtm_snapshot": run_dir / "gtm-snapshot.json",
+        "gtm_report": run_dir / "gtm-publish-report.json",
+        "postcheck_report": run_dir / "postcheck-report.json",
+        "logs": run_dir / "logs",
+    }
     manifest_path = run_dir / "rollback-manifest.json"
     run_report_path = run_dir / "run-report.json"
 
@@ -123,104 +643,52 @@ def main() -> None:
         "deploy": {"enabled": publish and not dry_run},
         "gtm": {"previous_live_version_path": ""},
     }
-
-    try:
-        _run_or_fail(
-            "fetch_ga4_gsc",
-            [
-                "--window",
-                args.window,
-                "--run-id",
-                run_id,
-                "--goal",
-                args.goal,
-                "--output",
-                str(analysis_path),
-            ],
-            steps,
-        )
-
-        _run_or_fail(
-            "generate_plan",
-            [
-                "--analysis",
-                str(analysis_path),
-                "--lang",
-                args.lang,
-                "--output",
-                str(plan_path),
-            ],
-            steps,
-        )
-
-        _run_or_fail(
-            "apply_seo",
-            [
-                "--plan",
-                str(plan_path),
-                "--run-id",
-                run_id,
-                "--dry-run",
-                str(dry_run).lower(),
-                "--output",
-                str(execution_path),
-            ],
-            steps,
-        )
-
-        execution_report = load_json(execution_path)
-        manifest["file_backups"] = execution_report.get("backups", [])
-        write_json(manifest_path, manifest)
-
-        if publish:
-            _run_or_fail(
-                "deploy_hosting",
-                [
-                    "--run-id",
-                    run_id,
-                    "--dry-run",
-                    str(dry_run).lower(),
-                    "--output",
-                    str(deploy_path),
-                ],
-                steps,
-            )
-
-            _run_or_fail(
-                "publish_gtm",
-                [
-                    "--run-id",
-                    run_id,
-                    "--dry-run",
-                    str(dry_run).lower(),
-                    "--output",
-                    str(gtm_path),
-                ],
+    if resume_id and manifest_path.exists():
+        # Skipped steps do not re-record their rollback state.
+        manifest.update(load_json(manifest_path))
+
+    def _record_rollback_state(node: dict[str, Any], report: dict[str, Any] | None) -> None:
+        output_path = paths[node["produces"]]
+        if node["produces"] == "execution_report":
+            report = report if report is not None else load_json(output_path)
+            manifest["file_backups"] = report.get("backups", [])
+            write_json(manifest_path, manifest)
+        elif node["produces"] == "deploy_report" and (report is not None or output_path.exists()):
+            report = report if report is not None else load_json(output_path)
+            if report.get("skipped"):
+                # Nothing was uploaded, so there is no hosting deploy to undo.
+                manifest["deploy"]["enabled"] = False
+                write_json(manifest_path, manifest)
+            elif "snapshot" in report:
+                manifest["deploy"]["previous_snapshot"] = report.get("previous_snapshot", {})
+                manifest["deploy"]["snapshot"] = report["snapshot"]
+                write_json(manifest_path, manifest)
+        elif node["produces"] == "gtm_report" and (report is not None or output_path.exists()):
+            report = report if report is not None else load_json(output_path)
+            published = not report.get("skipped")
+            live_before = report.get("live_before", {}).get("version_path", "")
+            manifest["gtm"]["previous_live_version_path"] = live_before if published else ""
+            write_json(manifest_path, manifest)
+
+    force_publish = parse_bool(args.force_publish)
+    nodes = _pipeline_nodes(args, run_id, paths, publish=publish, dry_run=dry_run, force_publish=force_publish)
+
+    with span("run_autopilot", "pipeline", run_id=run_id, runner=runner, workers=args.workers):
+        try:
+            _run_pipeline(
+                runner,
+                nodes,
                 steps,
+                workers=args.workers,
+                on_complete=_record_rollback_state,
+                checkpoint=checkpoint,
+                resume=bool(resume_id),
             )
-
-            if gtm_path.exists():
-                gtm_report = load_json(gtm_path)
-                manifest["gtm"]["previous_live_version_path"] = (
-                    gtm_report.get("live_before", {}).get("version_path", "")
-                )
-                write_json(manifest_path, manifest)
-
-        _run_or_fail(
-            "postcheck",
-            [
-                "--run-id",
-                run_id,
-                "--output",
-                str(postcheck_path),
-            ],
-            steps,
-        )
-
-    except SystemExit:
-        if manifest_path.exists() and not dry_run:
-            _auto_rollback(run_id, "pipeline_failed", steps)
-        raise
+        except SystemExit:
+            if manifest_path.exists() and not dry_run:
+                _auto_rollback(runner, run_id, "pipeline_failed", steps)
+                checkpoint.invalidate(list(REVERTED_BY_ROLLBACK))
+            raise
 
     run_report = {
         "run_id": run_id,
@@ -232,16 +700,32 @@ def main() -> None:
             "mode": args.mode,
             "publish": publish,
             "dry_run": dry_run,
+            "force_publish": force_publish,
+            "runner": runner,
+            "workers": args.workers,
+            "cassette": args.cassette,
+            "profile": profile,
+            "resumed": bool(resume_id),
         },
         "artifacts": {
-            "analysis": str(analysis_path),
-            "plan": str(plan_path),
-            "execution_report": str(execution_path),
+            "analysis": str(paths["analysis"]),
+            "plan": str(paths["plan"]),
+            "execution_report": str(paths["execution_report"]),
             "rollback_manifest": str(manifest_path),
-            "deploy_report": str(deploy_path) if deploy_path.exists() else "",
-            "gtm_publish_report": str(gtm_path) if gtm_path.exists() else "",
-            "postcheck_report": str(postcheck_path),
+            "deploy_report": str(paths["deploy_report"]) if paths["deploy_report"].exists() else "",
+            "gtm_publish_report": str(paths["gtm_report"]) if paths["gtm_report"].exists() else "",
+            "postcheck_report": str(paths["postcheck_report"]),
+            "cassette": cassette_path,
+            "trace": str(trace_path),
+            "checkpoint": str(checkpoint.path),
         },
+        "graph": [
+            {"step": node["name"], "needs": node["needs"], "produces": node["produces"]} for node in nodes
+        ],
+        "critical_path": _critical_path(nodes, steps),
+        "changes": _change_summary(paths, publish=publish),
+        "http_pool": http_pool_stats(),
+        "rate_limit": rate_limit_stats(),
         "steps": steps,
     }
     write_json(run_report_path, run_report)
@@ -250,9 +734,9 @@ def main() -> None:
         {
             "run_id": run_id,
             "run_report": str(run_report_path),
-            "analysis": str(analysis_path),
-            "plan": str(plan_path),
-            "execution_report": str(execution_path),
+            "analysis": str(paths["analysis"]),
+            "plan": str(paths["plan"]),
+            "execution_report": str(paths["execution_report"]),
             "rollback_manifest": str(manifest_path),
         }
     )
@@ -13,16 +13,7 @@ import urllib.request
 import webbrowser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 
-from common import SKILL_ROOT, env_required, fail, success
-
-SCOPES = [
-    "https://www.googleapis.com/auth/analytics.readonly",
-    "https://www.googleapis.com/auth/webmasters.readonly",
-    "https://www.googleapis.com/auth/tagmanager.edit.containers",
-    "https://www.googleapis.com/auth/tagmanager.publish",
-    "https://www.googleapis.com/auth/firebase",
-    "https://www.googleapis.com/auth/cloud-platform",
-]
+from common import OAUTH_SCOPES, TOKENS_ROOT, env_required, fail, success
 
 
 class CallbackHandler(BaseHTTPRequestHandler):
@@ -81,7 +72,7 @@ def main() -> None:
     parser.add_argument("--port", type=int, default=8765)
     parser.add_argument(
         "--save",
-        default=str(SKILL_ROOT / ".tokens" / "oauth-token.json"),
+        default=str(TOKENS_ROOT / "oauth-token.json"),
         help="Path to save token payload.",
     )
     args = parser.parse_args()
@@ -97,7 +88,7 @@ def main() -> None:
             "client_id": creds["GOOGLE_CLIENT_ID"],
             "redirect_uri": redirect_uri,
             "response_type": "code",
-            "scope": " ".join(SCOPES),
+            "scope": " ".join(OAUTH_SCOPES),
             "access_type": "offline",
             "prompt": "consent",
         }
@@ -0,0 +1,89 @@
+"""Shard planning and merging for the sharded Search Console fetch."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+
+from gsc_shards import DEVICES, _merge, plan_shards  # noqa: E402
+
+
+def _filters(shard: dict) -> list[dict]:
+    return shard["payload"]["dimensionFilterGroups"][0]["filters"]
+
+
+class PlanShardsTest(unittest.TestCase):
+    def test_one_shard_per_day_device_and_country_plus_other(self) -> None:
+        shards = plan_shards("query", "2026-01-01", "2026-01-02", ["tur", "deu"])
+        self.assertEqual(len(shards), 2 * len(DEVICES) * 3)
+        self.assertEqual(len({shard["id"] for shard in shards}), len(shards))
+        self.assertEqual({shard["payload"]["startDate"] for shard in shards}, {"2026-01-01", "2026-01-02"})
+
+    def test_other_shard_excludes_every_listed_country(self) -> None:
+        shards = plan_shards("page", "2026-01-01", "2026-01-01", ["tur", "deu"])
+        other = next(shard for shard in shards if shard["id"] == "page-2026-01-01-mobile-other")
+        self.assertEqual(
+            _filters(other),
+            [
+                {"dimension": "device", "operator": "equals", "expression": "MOBILE"},
+                {"dimension": "country", "operator": "notEquals", "expression": "tur"},
+                {"dimension": "country", "operator": "notEquals", "expression": "deu"},
+            ],
+        )
+        listed = next(shard for shard in shards if shard["id"] == "page-2026-01-01-mobile-tur")
+        self.assertEqual(_filters(listed)[1:], [{"dimension": "country", "operator": "equals", "expression": "tur"}])
+
+    def test_without_countries_the_other_shard_has_no_country_filter(self) -> None:
+        shards = plan_shards("query", "2026-01-01", "2026-01-01", [])
+        self.assertEqual(len(shards), len(DEVICES))
+        self.assertTrue(all(len(_filters(shard)) == 1 for shard in shards))
+
+
+class MergeTest(unittest.TestCase):
+    def _shard(self, root: pathlib.Path, name: str, rows: list[dict]) -> pathlib.Path:
+        path = root / name
+        with gzip.open(path, "wt", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps(row) + "\n")
+        return path
+
+    def test_sums_counts_and_weights_position_by_impressions(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = pathlib.Path(tmp)
+            shards = [
+                self._shard(
+                    root,
+                    "a.jsonl.gz",
+                    [
+                        {"keys": ["pediatri"], "clicks": 3, "impressions": 10, "position": 2.0},
+                        {"keys": ["asi"], "clicks": 1, "impressions": 4, "position": 5.0},
+                    ],
+                ),
+                self._shard(
+                    root, "b.jsonl.gz", [{"keys": ["pediatri"], "clicks": 1, "impressions": 30, "position": 6.0}]
+                ),
+            ]
+            output = root / "merged.jsonl.gz"
+            summary = _merge(shards, output, top_n=1)
+            with gzip.open(output, "rt", encoding="utf-8") as fh:
+                rows = [json.loads(line) for line in fh]
+
+        self.assertEqual([row["keys"] for row in rows], [["pediatri"], ["asi"]])
+        merged = rows[0]
+        self.assertEqual((merged["clicks"], merged["impressions"]), (4, 40))
+        # (2 * 10 + 6 * 30) / 40, not the plain mean of 2 and 6.
+        self.assertAlmostEqual(merged["position"], 5.0)
+        self.assertAlmostEqual(merged["ctr"], 0.1)
+        self.assertEqual(rows[1]["position"], 5.0)
+        self.assertEqual((summary["rows"], summary["clicks"], summary["impressions"]), (2, 5, 44))
+        self.assertEqual(summary["top"], rows[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
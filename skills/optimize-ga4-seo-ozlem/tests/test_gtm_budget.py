@@ -0,0 +1,73 @@
+"""GTM container budget: only totals that grew since the live version block a publish."""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+
+import gtm_budget  # noqa: E402
+
+# Custom HTML budget of 100 bytes; the other budgets disabled.
+BUDGET_ENV = {
+    "AUTOPILOT_GTM_BUDGET_MODE": "block",
+    "AUTOPILOT_GTM_SCRIPT_BUDGET_KB": "0",
+    "AUTOPILOT_GTM_HTML_BUDGET_KB": str(100 / 1024),
+    "AUTOPILOT_GTM_PAGE_VIEW_TAG_BUDGET": "0",
+}
+
+
+def _tag(tag_id: str, html_bytes: int) -> dict:
+    return {
+        "tagId": tag_id,
+        "name": f"tag {tag_id}",
+        "type": "html",
+        "parameter": [{"type": "template", "key": "html", "value": "x" * html_bytes}],
+        "firingTriggerId": ["2147479553"],
+    }
+
+
+def _container(*tags: dict) -> dict:
+    return {"tags": {tag["tagId"]: tag for tag in tags}, "triggers": {}, "variables": {}}
+
+
+@mock.patch.dict(os.environ, BUDGET_ENV)
+class EvaluateTest(unittest.TestCase):
+    def test_within_budget(self) -> None:
+        result = gtm_budget.evaluate(_container(_tag("1", 60)), _container(_tag("1", 40)))
+        self.assertEqual((result["violations"], result["warnings"], result["blocked"]), ([], [], False))
+
+    def test_growth_over_budget_blocks(self) -> None:
+        result = gtm_budget.evaluate(_container(_tag("1", 150)), _container(_tag("1", 40)))
+        self.assertTrue(result["blocked"])
+        [violation] = result["violations"]
+        self.assertEqual((violation["budget"], violation["actual"], violation["live"]), ("custom_html_bytes", 150, 40))
+        self.assertEqual([tag["id"] for tag in violation["top_growth"]], ["1"])
+
+    def test_shrinking_a_container_already_over_budget_only_warns(self) -> None:
+        result = gtm_budget.evaluate(_container(_tag("1", 150)), _container(_tag("1", 200)))
+        self.assertFalse(result["blocked"])
+        self.assertEqual(result["violations"], [])
+        [warning] = result["warnings"]
+        self.assertEqual((warning["budget"], warning["grew"]), ("custom_html_bytes", False))
+
+    def test_a_grown_tag_blocks_even_when_the_total_shrank(self) -> None:
+        workspace = _container(_tag("1", 150), _tag("2", 10))
+        live = _container(_tag("1", 100), _tag("2", 100))
+        result = gtm_budget.evaluate(workspace, live)
+        self.assertTrue(result["blocked"])
+        self.assertEqual([tag["id"] for tag in result["violations"][0]["top_growth"]], ["1"])
+
+    def test_warn_mode_never_blocks(self) -> None:
+        with mock.patch.dict(os.environ, {"AUTOPILOT_GTM_BUDGET_MODE": "warn"}):
+            result = gtm_budget.evaluate(_container(_tag("1", 150)), _container(_tag("1", 40)))
+        self.assertEqual(len(result["violations"]), 1)
+        self.assertFalse(result["blocked"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Firebase Hosting glob matching and Cache-Control rule precedence in the delivery audit."""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+
+from perf_audit import _glob_regex, cache_rules, expected_cache_control  # noqa: E402
+
+REVALIDATE = "no-cache, must-revalidate"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class GlobRegexTest(unittest.TestCase):
+    def assertMatches(self, source: str, matching: list[str], other: list[str]) -> None:
+        pattern = _glob_regex(source)
+        for path in matching:
+            self.assertTrue(pattern.match(path), f"{source!r} should match {path!r}")
+        for path in other:
+            self.assertFalse(pattern.match(path), f"{source!r} should not match {path!r}")
+
+    def test_double_star_slash_spans_zero_or_more_directories(self) -> None:
+        self.assertMatches("**/*.js", ["main-ABC.js", "assets/js/chunk.js"], ["main.js.map", "style.css"])
+
+    def test_double_star_matches_everything(self) -> None:
+        self.assertMatches("**", ["", "index.html", "a/b/c"], [])
+        self.assertMatches("assets/i18n/**", ["assets/i18n/tr.json", "assets/i18n/x/en.json"], ["assets/tr.json"])
+
+    def test_single_star_and_question_mark_stay_within_one_directory(self) -> None:
+        self.assertMatches("*.css", ["styles.css"], ["assets/styles.css"])
+        self.assertMatches("img/?.png", ["img/a.png"], ["img/ab.png", "img/a/b.png"])
+
+    def test_other_characters_are_literal(self) -> None:
+        self.assertMatches("a+b.(x).js", ["a+b.(x).js"], ["aab.(x).js", "a+b.x.js"])
+
+
+class ExpectedCacheControlTest(unittest.TestCase):
+    def setUp(self) -> None:
+        headers = [
+            {"source": "**", "headers": [{"key": "Cache-Control", "value": REVALIDATE}]},
+            {"source": "**/*.js", "headers": [{"key": "Cache-Control", "value": IMMUTABLE}]},
+            {"source": "**/*.json", "headers": [{"key": "X-Content-Type-Options", "value": "nosniff"}]},
+            {"source": "assets/i18n/**", "headers": [{"key": "cache-control", "value": REVALIDATE}]},
+            {"source": "**/*.json", "headers": [{"key": "Cache-Control", "value": IMMUTABLE}]},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            root = pathlib.Path(tmp)
+            (root / "firebase.json").write_text(json.dumps({"hosting": {"headers": headers}}), encoding="utf-8")
+            self.rules = cache_rules(root)
+
+    def test_only_cache_control_rules_are_kept_in_order(self) -> None:
+        self.assertEqual([source for _, source, _ in self.rules], ["**", "**/*.js", "assets/i18n/**", "**/*.json"])
+
+    def test_last_matching_rule_wins(self) -> None:
+        self.assertEqual(expected_cache_control("/main-ABC.js", self.rules), (IMMUTABLE, "**/*.js"))
+        self.assertEqual(expected_cache_control("/assets/i18n/tr.json", self.rules), (IMMUTABLE, "**/*.json"))
+        self.assertEqual(expected_cache_control("/assets/i18n/tr.txt", self.rules), (REVALIDATE, "assets/i18n/**"))
+        self.assertEqual(expected_cache_control("/hakkimizda", self.rules), (REVALIDATE, "**"))
+
+    def test_no_rule_and_missing_config(self) -> None:
+        self.assertEqual(expected_cache_control("/x.js", []), ("", ""))
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(cache_rules(pathlib.Path(tmp)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()